@@ -0,0 +1,125 @@
+"""
+API Capture
+Same-origin JSON responses a page loads while it renders (the Angular tariff
+pages of orange.eg fetch their plans from JSON endpoints after load), read
+from Selenium's performance log or from crawl4ai's network capture
+"""
+import json
+from urllib.parse import urlparse
+
+
+# Content types of JSON API responses
+JSON_CONTENT_TYPES = ("application/json", "text/json", "+json")
+
+# Request types of API calls made by the page's scripts (Chrome DevTools and Playwright names)
+API_RESOURCE_TYPES = ("xhr", "fetch")
+
+# Anti-JSON-hijacking prefix Angular strips from JSON responses
+XSSI_PREFIX = ")]}'"
+
+# Larger bodies are skipped; tariff payloads are a few hundred KB at most
+MAX_BODY_CHARS = 5_000_000
+
+
+def _site(host):
+    host = host.lower().split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def same_site(url, page_url):
+    """True if url is served by the page's host or a sub-domain of it (shop.orange.eg for www.orange.eg)"""
+    host, page_host = _site(urlparse(url).netloc), _site(urlparse(page_url).netloc)
+    return host == page_host or host.endswith("." + page_host) or page_host.endswith("." + host)
+
+
+def is_api_response(url, page_url, resource_type=None, content_type=None):
+    """True for a same-origin JSON response to a script request (XHR/fetch) of the page"""
+    if resource_type is not None and resource_type.lower() not in API_RESOURCE_TYPES:
+        return False
+    if not any(marker in (content_type or "").lower() for marker in JSON_CONTENT_TYPES):
+        return False
+    return same_site(url, page_url)
+
+
+def parse_json_body(body):
+    """JSON of a response body (None if it isn't JSON)"""
+    if not body or len(body) > MAX_BODY_CHARS:
+        return None
+    body = body.lstrip()
+    if body.startswith(XSSI_PREFIX):
+        body = body.split("\n", 1)[1] if "\n" in body else ""
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _api_response(url, status, body):
+    data = parse_json_body(body) if status == 200 else None
+    return {"url": url, "status": status, "data": data} if data is not None else None
+
+
+def enable_performance_log(chrome_options):
+    """Make Chrome record network events in Selenium's performance log (read by selenium_api_responses)"""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return chrome_options
+
+
+def selenium_api_responses(driver, page_url):
+    """
+    JSON API responses of the pages the driver loaded since the performance
+    log was last read (the log is emptied by reading it). The driver must
+    have been created with enable_performance_log; returns [] otherwise.
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return []
+
+    received, finished = {}, set()
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        params = message.get("params", {})
+        if message.get("method") == "Network.responseReceived":
+            response = params.get("response", {})
+            if is_api_response(response.get("url", ""), page_url, params.get("type"), response.get("mimeType")):
+                received[params["requestId"]] = response
+        elif message.get("method") == "Network.loadingFinished":
+            finished.add(params.get("requestId"))
+
+    responses = []
+    for request_id, response in received.items():
+        if request_id not in finished:
+            continue
+        try:
+            # Bodies of a page that was navigated away from are gone
+            body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            continue
+        if body.get("base64Encoded"):
+            continue
+        api_response = _api_response(response["url"], response.get("status"), body.get("body"))
+        if api_response:
+            responses.append(api_response)
+    return responses
+
+
+def crawl4ai_api_responses(network_requests, page_url):
+    """JSON API responses in a CrawlResult.network_requests (a run with capture_network_requests=True)"""
+    resource_types = {}
+    responses = []
+    for event in network_requests or []:
+        if event.get("event_type") == "request":
+            resource_types[event["url"]] = event.get("resource_type")
+        elif event.get("event_type") == "response":
+            headers = {key.lower(): value for key, value in (event.get("headers") or {}).items()}
+            if not is_api_response(event["url"], page_url, resource_types.get(event["url"]),
+                                   headers.get("content-type")):
+                continue
+            api_response = _api_response(event["url"], event.get("status"), (event.get("body") or {}).get("text"))
+            if api_response:
+                responses.append(api_response)
+    return responses
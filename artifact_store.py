@@ -0,0 +1,255 @@
+"""
+Artifact Store
+Compressed, content-addressed storage for the HTML and JSON each run produces
+"""
+import gzip
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+try:
+    import zstandard
+except ImportError:  # gzip is used instead
+    zstandard = None
+
+
+ARTIFACTS_DIR = "./data/artifacts"
+
+# Compressed blob suffix per codec
+CODEC_SUFFIX = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def url_key(url):
+    """(host, path) identifying a page; two hosts with the same last path segment don't collide"""
+    parsed = urlparse(url)
+    path = parsed.path.rstrip("/") or "/"
+    if parsed.query:
+        path += "?" + parsed.query
+    return parsed.netloc.lower(), path
+
+
+def _compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class ArtifactStore:
+    """
+    Blobs are stored once per sha256 of their content under
+    <root>/blobs/<2 hex>/<sha256>.zst|.gz (zstd if the zstandard package is
+    installed, gzip otherwise), so an unchanged page costs no extra disk on
+    the next run. A SQLite index maps (host, path, run, kind) to blobs.
+
+    Usage:
+        store = ArtifactStore()
+        store.put(html, url, run_id, "html_all")
+        html = store.latest(url, "html_all")
+        store.gc(keep_runs=5, max_age_days=30)
+    """
+
+    def __init__(self, root=ARTIFACTS_DIR, codec=None):
+        self.root = root
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+        if self.codec == "zstd" and zstandard is None:
+            raise ValueError("zstd compression needs the zstandard package (pip install zstandard)")
+        os.makedirs(os.path.join(root, "blobs"), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artifacts (
+                    host TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    run_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (host, path, run_id, kind)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_blob ON artifacts (sha256)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(os.path.join(self.root, "index.db"))
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, sha256, codec):
+        return os.path.join(self.root, "blobs", sha256[:2], sha256 + CODEC_SUFFIX[codec])
+
+    def put(self, data, url, run_id, kind):
+        """
+        Store data (str or bytes) as artifact `kind` of url in run_id.
+
+        Returns:
+            {"sha256", "size", "stored_size", "deduplicated"}; stored_size is 0
+            when an identical blob already existed.
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        host, path = url_key(url)
+        now = datetime.now().isoformat(timespec="seconds")
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT codec FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            deduplicated = row is not None and os.path.exists(self._blob_path(sha256, row["codec"]))
+            stored_size = 0
+            if not deduplicated:
+                compressed = _compress(data, self.codec)
+                blob_path = self._blob_path(sha256, self.codec)
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                # Write then rename, so a crash never leaves a truncated blob under its hash
+                tmp_path = f"{blob_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, blob_path)
+                stored_size = len(compressed)
+                conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?)",
+                             (sha256, self.codec, len(data), stored_size, now))
+            conn.execute("INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?)",
+                         (host, path, run_id, kind, sha256, now))
+
+        return {"sha256": sha256, "size": len(data), "stored_size": stored_size, "deduplicated": deduplicated}
+
+    def put_file(self, file_path, url, run_id, kind):
+        """put() the content of a file written by a pipeline stage"""
+        with open(file_path, "rb") as f:
+            return self.put(f.read(), url, run_id, kind)
+
+    def get(self, sha256):
+        """Decompressed content of a blob as bytes"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT codec FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        if row is None:
+            raise KeyError(sha256)
+        with open(self._blob_path(sha256, row["codec"]), "rb") as f:
+            return _decompress(f.read(), row["codec"])
+
+    def history(self, url, kind=None):
+        """Index rows of a page, newest first"""
+        host, path = url_key(url)
+        query = "SELECT * FROM artifacts WHERE host = ? AND path = ?"
+        params = [host, path]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY created_at DESC, rowid DESC", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest(self, url, kind):
+        """Most recent artifact of a page as text, None if never stored"""
+        rows = self.history(url, kind)
+        return self.get(rows[0]["sha256"]).decode("utf-8") if rows else None
+
+    def stats(self):
+        """Artifact/blob counts and raw vs stored bytes"""
+        with self._connect() as conn:
+            artifacts = conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+            referenced = conn.execute(
+                "SELECT COALESCE(SUM(b.size), 0) FROM artifacts a JOIN blobs b ON a.sha256 = b.sha256"
+            ).fetchone()[0]
+            blobs, size, stored_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "artifacts": artifacts,
+            "blobs": blobs,
+            "referenced_bytes": referenced,
+            "unique_bytes": size,
+            "stored_bytes": stored_size,
+        }
+
+    def gc(self, keep_runs=5, max_age_days=None):
+        """
+        Retention: keep the newest keep_runs runs of every (host, path) and,
+        if max_age_days is set, drop anything older than that (the newest run
+        of a page is always kept). Blobs no longer referenced are deleted.
+
+        Returns:
+            {"artifacts_removed", "blobs_removed", "bytes_freed"}
+        """
+        cutoff = None
+        if max_age_days is not None:
+            cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat(timespec="seconds")
+
+        with self._connect() as conn:
+            runs = conn.execute("""
+                SELECT host, path, run_id, MAX(created_at) AS created_at
+                FROM artifacts GROUP BY host, path, run_id
+                ORDER BY host, path, MAX(created_at) DESC
+            """).fetchall()
+
+            expired = []
+            rank = {}
+            for run in runs:
+                page = (run["host"], run["path"])
+                rank[page] = rank.get(page, 0) + 1
+                if rank[page] == 1:
+                    continue
+                if rank[page] > keep_runs or (cutoff and run["created_at"] < cutoff):
+                    expired.append((run["host"], run["path"], run["run_id"]))
+
+            artifacts_removed = 0
+            for host, path, run_id in expired:
+                artifacts_removed += conn.execute(
+                    "DELETE FROM artifacts WHERE host = ? AND path = ? AND run_id = ?", (host, path, run_id)
+                ).rowcount
+
+            orphans = conn.execute("""
+                SELECT sha256, codec, stored_size FROM blobs
+                WHERE sha256 NOT IN (SELECT DISTINCT sha256 FROM artifacts)
+            """).fetchall()
+            for blob in orphans:
+                try:
+                    os.remove(self._blob_path(blob["sha256"], blob["codec"]))
+                except FileNotFoundError:
+                    pass
+                conn.execute("DELETE FROM blobs WHERE sha256 = ?", (blob["sha256"],))
+
+        return {
+            "artifacts_removed": artifacts_removed,
+            "blobs_removed": len(orphans),
+            "bytes_freed": sum(blob["stored_size"] for blob in orphans),
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Inspect or garbage-collect the artifact store")
+    parser.add_argument("--root", default=ARTIFACTS_DIR)
+    parser.add_argument("--gc", action="store_true", help="Apply the retention policy")
+    parser.add_argument("--keep-runs", type=int, default=5)
+    parser.add_argument("--max-age-days", type=int, default=None)
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.root)
+    if args.gc:
+        print(json.dumps(store.gc(args.keep_runs, args.max_age_days), indent=2))
+    print(json.dumps(store.stats(), indent=2))
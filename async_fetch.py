@@ -0,0 +1,171 @@
+"""
+Async Fetch
+Fetch backend for the website pipeline on crawl4ai's AsyncWebCrawler: one
+shared Playwright browser renders many tariff pages at once on an event loop,
+instead of a blocking Selenium Chrome per page
+"""
+import asyncio
+import threading
+import time
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig
+
+from tools.api_capture import crawl4ai_api_responses
+from tools.host_limiter import HOST_LIMITER
+from tools.scraper_1_all_pro import save_full_html
+
+
+# Pages rendered at once in the shared browser
+DEFAULT_CONCURRENCY = 4
+
+# Seconds a page may keep running scripts after load, like the time.sleep(5) of get_full_html
+SETTLE_S = 5.0
+
+
+class AsyncPageFetcher:
+    """
+    Async counterpart of get_full_html. Every fetch opens a page in the same
+    browser, goes through the per-host limiter (aslot, so waiting for a host
+    doesn't block the other fetches) and saves the HTML with save_full_html.
+
+    There is no cloudscraper pre-request: the browser runs with crawl4ai's
+    stealth mode and the "magic" anti-bot handling instead, and a challenge
+    page is retried after the host's backoff like in get_full_html.
+
+    Usage:
+        async with AsyncPageFetcher(concurrency=4) as fetcher:
+            soups = await fetcher.fetch_many(links, bakat_names)
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, limiter=None, headless=True, settle_s=SETTLE_S,
+                 challenge_retries=2):
+        self.concurrency = concurrency
+        self.limiter = limiter or HOST_LIMITER
+        self.headless = headless
+        self.settle_s = settle_s
+        self.challenge_retries = challenge_retries
+        self._crawler = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        # The first fetches may arrive together; only one of them launches the browser
+        async with self._start_lock:
+            if self._crawler is not None:
+                return self
+            browser_config = BrowserConfig(
+                headless=self.headless,
+                viewport_width=1366,
+                viewport_height=768,
+                enable_stealth=True,
+                verbose=False
+            )
+            crawler = AsyncWebCrawler(config=browser_config)
+            await crawler.start()
+            self._crawler = crawler
+        return self
+
+    async def close(self):
+        if self._crawler is not None:
+            await self._crawler.close()
+            self._crawler = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _run_config(self, capture_api=False):
+        return CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            wait_until="load",
+            page_timeout=60000,
+            delay_before_return_html=self.settle_s,
+            magic=True,
+            capture_network_requests=capture_api,
+            verbose=False
+        )
+
+    async def fetch(self, url, bakat_name, prettify=True, stats=None, api_responses=None):
+        """
+        Render url, save it to data/html_all/{bakat_name}_all_pro.html and
+        return its soup (like get_full_html). stats, if given, is filled
+        with wall_time_s, queued_s (waiting for a free page), attempts and html_chars.
+        api_responses, if given, is extended with the page's same-origin JSON responses.
+        """
+        if self._crawler is None:
+            await self.start()
+        start = time.perf_counter()
+        async with self._semaphore:
+            queued_s = time.perf_counter() - start
+            for attempt in range(self.challenge_retries + 1):
+                async with self.limiter.aslot(url):
+                    result = await self._crawler.arun(url=url, config=self._run_config(api_responses is not None))
+                if not result.success:
+                    raise RuntimeError(f"Failed to fetch {url}: {result.error_message}")
+                if not self.limiter.report(url, result.status_code, result.html, result.response_headers):
+                    break
+                print(f"⚠️ Challenge page from {self.limiter.host(url)} (attempt {attempt + 1}), backing off")
+
+        if api_responses is not None:
+            api_responses += crawl4ai_api_responses(result.network_requests, url)
+
+        # Parsing and writing the page is CPU/disk work; keep it off the event loop
+        soup = await asyncio.to_thread(save_full_html, result.html, bakat_name, prettify)
+        if stats is not None:
+            stats.update(
+                wall_time_s=round(time.perf_counter() - start, 4),
+                queued_s=round(queued_s, 4),
+                attempts=attempt + 1,
+                html_chars=len(result.html)
+            )
+        return soup
+
+    async def fetch_many(self, urls, bakat_names, prettify=True):
+        """Fetch all pages concurrently; soups in the order of urls (an exception in place of a failed page)"""
+        return await asyncio.gather(
+            *(self.fetch(url, name, prettify) for url, name in zip(urls, bakat_names)),
+            return_exceptions=True
+        )
+
+
+class ThreadedPageFetcher:
+    """
+    AsyncPageFetcher on an event loop of its own thread, for the synchronous
+    pipeline code: submit() returns a concurrent.futures.Future right away,
+    so callers can queue many pages and go on (cleaning, LLM calls) while
+    the browser renders them.
+
+    Usage:
+        with ThreadedPageFetcher(concurrency=4) as fetcher:
+            futures = [fetcher.submit(url, name) for url, name in zip(links, bakat_names)]
+            soups = [future.result() for future in futures]
+    """
+
+    def __init__(self, **kwargs):
+        self.fetcher = AsyncPageFetcher(**kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-fetch", daemon=True)
+        self._thread.start()
+
+    def submit(self, url, bakat_name, prettify=True, stats=None, api_responses=None):
+        return asyncio.run_coroutine_threadsafe(self.fetcher.fetch(url, bakat_name, prettify, stats, api_responses),
+                                                self._loop)
+
+    def fetch(self, url, bakat_name, prettify=True, stats=None, api_responses=None):
+        return self.submit(url, bakat_name, prettify, stats, api_responses).result()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self.fetcher.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
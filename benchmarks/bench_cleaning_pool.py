@@ -0,0 +1,65 @@
+"""
+Cleaning Pool Benchmark
+Serial clean_page vs HtmlCleaningPool on a batch of synthetic carrier pages.
+
+Usage (from the project root):
+    python -m tools.benchmarks.bench_cleaning_pool
+    python -m tools.benchmarks.bench_cleaning_pool --pages 64 --size 1000 --workers 4
+"""
+import argparse
+import sys
+import time
+
+from tools.html_cleaning_pool import HtmlCleaningPool, clean_page
+from tools.benchmarks.website_fixtures import CARRIERS, build_page
+
+
+def run_pool_benchmark(pages=32, size_kb=500, workers=None):
+    """Time the same batch serially and through the pool; returns the measurements"""
+    carriers = list(CARRIERS)
+    batch = [build_page(carriers[i % len(carriers)], size_kb * 1000, seed=i) for i in range(pages)]
+    batch_mb = sum(len(page.encode("utf-8")) for page in batch) / 1e6
+
+    start = time.perf_counter()
+    serial = [clean_page(page)["important_html"] for page in batch]
+    serial_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with HtmlCleaningPool(workers) as pool:
+        warm_up_s = time.perf_counter() - start
+        start = time.perf_counter()
+        pooled = [result["important_html"] for result in pool.clean(batch)]
+        pool_s = time.perf_counter() - start
+        used_workers, chunksize = pool.workers, pool.chunksize(len(batch))
+
+    return {
+        "pages": pages,
+        "batch_mb": round(batch_mb, 2),
+        "workers": used_workers,
+        "chunksize": chunksize,
+        "serial_s": round(serial_s, 3),
+        "pool_warm_up_s": round(warm_up_s, 3),
+        "pool_s": round(pool_s, 3),
+        "speedup": round(serial_s / pool_s, 2) if pool_s else 0.0,
+        "identical_output": serial == pooled,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serial vs process-pool HTML cleaning")
+    parser.add_argument("--pages", type=int, default=32)
+    parser.add_argument("--size", type=int, default=500, help="Page size in KB")
+    parser.add_argument("--workers", type=int, default=None, help="Default: one per core")
+    args = parser.parse_args(argv)
+
+    results = run_pool_benchmark(args.pages, args.size, args.workers)
+    print(f"\n🏁 Cleaning {results['pages']} pages ({results['batch_mb']} MB)")
+    print(f"   Serial:  {results['serial_s']:.2f}s")
+    print(f"   Pool:    {results['pool_s']:.2f}s with {results['workers']} workers, chunksize "
+          f"{results['chunksize']} (+{results['pool_warm_up_s']:.2f}s start-up) → {results['speedup']}x")
+    print(f"   Same output: {'✅' if results['identical_output'] else '❌'}")
+    return 0 if results["identical_output"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Facebook Scroll Benchmark
+Runs facebook_stream_posts against the local fake feed and measures posts per
+minute, time per scroll step, time to first post and extraction accuracy
+against the feed's ground truth.
+
+By default posts are extracted by FakeFeedExtractionStrategy, a deterministic
+parser for the fake feed's markup, so the numbers isolate the browser side
+(scrolling, See More clicking, DOM size). Pass --llm to use the real Gemini
+extraction and measure its accuracy instead.
+
+Usage (from the project root, needs crawl4ai + Playwright browsers):
+    python -m tools.benchmarks.bench_facebook_scroll
+    python -m tools.benchmarks.bench_facebook_scroll --scroll-count 30 --prune-dom
+    python -m tools.benchmarks.bench_facebook_scroll --llm --scroll-count 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+from crawl4ai.extraction_strategy import ExtractionStrategy
+
+from tools.facebook_basic_scroll import facebook_stream_posts
+from tools.facebook_post_store import normalize_text
+from tools.pipeline_metrics import load_runs
+from tools.benchmarks.fake_facebook_feed import FakeFacebookFeed
+
+
+def _own(article, selector):
+    """Elements matching selector that belong to article itself, not to a nested comment"""
+    return [
+        element for element in article.select(selector)
+        if element.find_parent("div", attrs={"role": "article"}) is article
+    ]
+
+
+def _label_number(article, prefix="", suffix=""):
+    for span in _own(article, "span[aria-label]"):
+        label = span["aria-label"]
+        if label.startswith(prefix) and label.endswith(suffix):
+            return label[len(prefix):len(label) - len(suffix)].strip()
+    return None
+
+
+class FakeFeedExtractionStrategy(ExtractionStrategy):
+    """Deterministic extractor for the fake feed markup (works on pruned copies too)"""
+
+    def __init__(self):
+        super().__init__(input_format="html")
+
+    def extract(self, url, html, *q, **kwargs):
+        soup = BeautifulSoup(html, "lxml")
+        posts = []
+        for article in soup.select('div[role="article"]'):
+            if article.find_parent("div", attrs={"role": "article"}) is not None:
+                continue
+            texts = _own(article, 'div[dir="auto"]')
+            times = [link for link in _own(article, "a[aria-label]") if link.get("href", "").startswith("/posts/")]
+            posts.append({
+                "post_time": times[0].get_text(strip=True) if times else None,
+                "content": normalize_text(texts[0].get_text(" ")) if texts else "",
+                "likes_number": _label_number(article, prefix="All reactions:"),
+                "comments_number": _label_number(article, suffix="comments"),
+                "shares_number": _label_number(article, suffix="shares"),
+                "comments": [
+                    {
+                        "author": comment.a.get_text(strip=True) if comment.a else "",
+                        "text": comment.select_one('div[dir="auto"]').get_text(strip=True)
+                        if comment.select_one('div[dir="auto"]') else "",
+                    }
+                    for comment in article.select('div[role="article"]')
+                ],
+            })
+        return [{"posts": posts, "error": False}]
+
+    def run(self, url, sections, *q, **kwargs):
+        return [block for section in sections for block in self.extract(url, section)]
+
+
+def score_posts(extracted, ground_truth):
+    """
+    Match extracted posts to the ground truth by post number and compare fields.
+    Returns recall, precision, per-field accuracy and the share of fully
+    expanded (not truncated) texts among matched posts.
+    """
+    truth_by_tag = {normalize_text(post["content"]).rsplit("#", 1)[-1]: post for post in ground_truth}
+    matched = []
+    for post in extracted:
+        tag = normalize_text(post["content"]).rsplit("#", 1)[-1] if "#" in post["content"] else None
+        if tag in truth_by_tag:
+            matched.append((post, truth_by_tag.pop(tag)))
+
+    # Truncated texts lose the "#<index>" tag, so match those by prefix
+    for post in extracted:
+        if "#" in post["content"]:
+            continue
+        prefix = normalize_text(post["content"]).rstrip("…")[:100]
+        for tag, truth in list(truth_by_tag.items()):
+            if prefix and normalize_text(truth["content"]).startswith(prefix):
+                matched.append((post, truth_by_tag.pop(tag)))
+                break
+
+    def accuracy(field):
+        if not matched:
+            return 0.0
+        return round(sum(1 for post, truth in matched if post.get(field) == truth[field]) / len(matched), 3)
+
+    return {
+        "extracted": len(extracted),
+        "ground_truth": len(ground_truth),
+        "matched": len(matched),
+        "recall": round(len(matched) / len(ground_truth), 3) if ground_truth else 0.0,
+        "precision": round(len(matched) / len(extracted), 3) if extracted else 0.0,
+        "expanded_rate": round(sum(1 for post, truth in matched
+                                   if normalize_text(post["content"]) == normalize_text(truth["content"]))
+                               / len(matched), 3) if matched else 0.0,
+        "post_time_accuracy": accuracy("post_time"),
+        "likes_accuracy": accuracy("likes_number"),
+        "comments_number_accuracy": accuracy("comments_number"),
+        "shares_accuracy": accuracy("shares_number"),
+    }
+
+
+async def run_scroll_benchmark(scroll_count=10, scroll_wait=3, prune_dom=False, use_llm=False,
+                               headless=True, feed_latency=0.2):
+    """One streaming run against a fresh fake feed; returns the measurements"""
+    workdir = tempfile.mkdtemp(prefix="bench_fb_")
+    metrics_path = os.path.join(workdir, "metrics.jsonl")
+    posts = []
+    first_post_s = None
+
+    with FakeFacebookFeed(latency_s=feed_latency) as feed:
+        start = time.perf_counter()
+        async for post in facebook_stream_posts(
+            page_url=feed.url,
+            scroll_count=scroll_count,
+            scroll_wait=scroll_wait,
+            headless=headless,
+            session_dir=os.path.join(workdir, "session"),
+            session_id="fake_feed_benchmark",
+            prune_dom=prune_dom,
+            extraction_strategy=None if use_llm else FakeFeedExtractionStrategy(),
+            metrics_path=metrics_path,
+        ):
+            posts.append(post.model_dump())
+            if first_post_s is None:
+                first_post_s = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        ground_truth = feed.ground_truth()
+
+    runs = load_runs(metrics_path)
+    shutil.rmtree(workdir, ignore_errors=True)
+    step_times = [stage["wall_time_s"] for stage in (runs[-1]["stages"] if runs else [])
+                  if stage["stage"].startswith("scroll_step_")]
+
+    return {
+        "scroll_count": scroll_count,
+        "prune_dom": prune_dom,
+        "extractor": "llm" if use_llm else "fake_feed",
+        "elapsed_s": round(elapsed, 2),
+        "posts": len(posts),
+        "posts_per_minute": round(len(posts) / elapsed * 60, 2) if elapsed else 0.0,
+        "first_post_s": round(first_post_s, 2) if first_post_s is not None else None,
+        "step_times_s": step_times,
+        "accuracy": score_posts(posts, ground_truth),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Facebook scroll loop against a local fake feed")
+    parser.add_argument("--scroll-count", type=int, default=10)
+    parser.add_argument("--scroll-wait", type=int, default=3)
+    parser.add_argument("--prune-dom", action="store_true")
+    parser.add_argument("--llm", action="store_true", help="Use the Gemini extraction instead of the fake parser")
+    parser.add_argument("--show-browser", action="store_true")
+    parser.add_argument("--feed-latency", type=float, default=0.2, help="Seconds per infinite-scroll request")
+    parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_scroll_benchmark(
+        args.scroll_count, args.scroll_wait, args.prune_dom, args.llm,
+        headless=not args.show_browser, feed_latency=args.feed_latency
+    ))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+
+    step_times = results["step_times_s"]
+    print(f"\n🏁 Fake feed benchmark ({results['extractor']}, prune_dom={results['prune_dom']})")
+    print(f"   Posts: {results['posts']} in {results['elapsed_s']}s → {results['posts_per_minute']} posts/min")
+    print(f"   First post after: {results['first_post_s']}s")
+    if step_times:
+        print(f"   Scroll step: first {step_times[0]:.2f}s, last {step_times[-1]:.2f}s, "
+              f"mean {sum(step_times) / len(step_times):.2f}s")
+    for key, value in results["accuracy"].items():
+        print(f"   {key:<26} {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
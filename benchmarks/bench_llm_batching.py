@@ -0,0 +1,128 @@
+"""
+LLM Batching Benchmark
+Runs stage 4 (get_json_insights) on many small important-HTML pages with a
+stub LLM, once with one request per page and once with small pages packed
+into shared requests (get_json_insights_batch), and compares round trips,
+prompt tokens and total latency. Both runs must find the same plans per page.
+
+The stub LLM charges a fixed latency per request plus a latency per 1,000
+prompt tokens, so packing only wins what it saves on round trips and on the
+repeated instruction preamble.
+
+Usage (from the project root):
+    python -m tools.benchmarks.bench_llm_batching
+    python -m tools.benchmarks.bench_llm_batching --pages 200 --llm-latency 0.5 --llm-latency-per-1k 0.05
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from tools.scraper_4_gemeni_json_gen import (
+    BATCH_TOKEN_BUDGET,
+    SMALL_PAGE_TOKENS,
+    get_json_insights,
+    get_json_insights_batch,
+)
+from tools.benchmarks.stub_llm import StubLLM
+from tools.benchmarks.website_fixtures import build_imp_pages
+
+
+def _run(mode, pages, llm, token_budget, small_page_tokens):
+    """One pass over the pages in a fresh working directory; returns (seconds, plans per page)"""
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix=f"bench_batching_{mode}_")
+    os.chdir(workdir)
+    try:
+        os.makedirs("data/html_only_imp", exist_ok=True)
+        for name, html in pages:
+            with open(f"data/html_only_imp/{name}_imp_pro.html", "w", encoding="utf-8") as f:
+                f.write(html)
+
+        names = [name for name, _ in pages]
+        metrics = [{} for _ in names]
+        start = time.perf_counter()
+        # The stage prints a line per page; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            if mode == "batched":
+                get_json_insights_batch(names, metrics, model=llm, token_budget=token_budget,
+                                        small_page_tokens=small_page_tokens)
+            else:
+                for name, page_metrics in zip(names, metrics):
+                    get_json_insights(name, page_metrics, model=llm)
+        elapsed = time.perf_counter() - start
+
+        plans = []
+        for page_metrics in metrics:
+            with open(page_metrics["output_file"], "r", encoding="utf-8") as f:
+                plans.append(json.load(f))
+        return elapsed, plans
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_benchmark(page_count=200, llm_latency=0.05, llm_latency_per_1k=0.02, token_budget=BATCH_TOKEN_BUDGET,
+                  small_page_tokens=SMALL_PAGE_TOKENS, seed=0):
+    """Returns ({mode: stats}, pages whose plans differ between the two modes)"""
+    pages = build_imp_pages(page_count, seed=seed)
+    results, outputs = {}, {}
+    for mode in ("per_page", "batched"):
+        llm = StubLLM(latency_s=llm_latency, latency_per_1k_tokens=llm_latency_per_1k)
+        elapsed, outputs[mode] = _run(mode, pages, llm, token_budget, small_page_tokens)
+        results[mode] = {
+            "pages": page_count,
+            "round_trips": llm.calls,
+            "prompt_tokens": llm.prompt_tokens,
+            "total_s": round(elapsed, 3),
+            "pages_per_s": round(page_count / elapsed, 2) if elapsed else 0.0,
+        }
+    mismatches = [pages[i][0] for i, (single, batched) in enumerate(zip(outputs["per_page"], outputs["batched"]))
+                  if single != batched]
+    return results, mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-page and packed LLM requests for stage 4")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub LLM latency per request in seconds")
+    parser.add_argument("--llm-latency-per-1k", type=float, default=0.02,
+                        help="Stub LLM latency per 1,000 prompt tokens in seconds")
+    parser.add_argument("--token-budget", type=int, default=BATCH_TOKEN_BUDGET)
+    parser.add_argument("--small-page-tokens", type=int, default=SMALL_PAGE_TOKENS)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results, mismatches = run_benchmark(args.pages, args.llm_latency, args.llm_latency_per_1k,
+                                        args.token_budget, args.small_page_tokens)
+
+    if args.json:
+        print(json.dumps({"results": results, "mismatches": mismatches}, indent=2))
+    else:
+        print(f"\n🏁 Stage 4 on {args.pages} small pages (stub LLM: {args.llm_latency}s per request"
+              f" + {args.llm_latency_per_1k}s per 1k tokens)")
+        print(f"\n{'mode':<10} {'requests':>9} {'prompt tokens':>14} {'total (s)':>10} {'pages/s':>9}")
+        for mode, stats in results.items():
+            print(f"{mode:<10} {stats['round_trips']:>9} {stats['prompt_tokens']:>14,} {stats['total_s']:>10.2f}"
+                  f" {stats['pages_per_s']:>9.2f}")
+        single, batched = results["per_page"], results["batched"]
+        print(f"\n   Round trips: {single['round_trips']} → {batched['round_trips']}"
+              f" ({1 - batched['round_trips'] / single['round_trips']:.0%} fewer)")
+        print(f"   Total latency: {single['total_s']:.2f}s → {batched['total_s']:.2f}s"
+              f" ({1 - batched['total_s'] / single['total_s']:.0%} less)")
+        for name in mismatches:
+            print(f"   ❌ {name}: plans differ between per-page and batched requests")
+        print(f"\n{'✅ Same plans for every page' if not mismatches else '❌ Outputs differ'}")
+
+    if mismatches or results["batched"]["round_trips"] >= results["per_page"]["round_trips"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Parser Backend Benchmark
+Checks that the lxml backend (raw page_source, one parse shared by stages
+1-3) produces the same important HTML as the legacy path (prettified page,
+re-parsed from disk with html.parser by each stage), and compares their
+throughput and disk usage.
+
+Outputs are compared by visible text and by the sequence of tags with their
+attributes; prettify() only adds whitespace, so byte equality is not expected.
+
+Usage (from the project root):
+    python -m tools.benchmarks.bench_parser_backends
+    python -m tools.benchmarks.bench_parser_backends --sizes 100 1000 4000 --repeats 5
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+
+from tools.scraper_1_all_pro import save_full_html
+from tools.scraper_2_all_pro_html_only import get_specific_html
+from tools.scraper_3_imp_pro import get_imp_html
+from tools.benchmarks.website_fixtures import load_fixtures
+
+
+def _run_backend(backend, name, html):
+    # Stages 1-3 as websitescraping._scrape_links runs them for each backend
+    if backend == "legacy":
+        save_full_html(html, name)
+        get_specific_html(name)
+        get_imp_html(name)
+    else:
+        soup = save_full_html(html, name, prettify=False)
+        get_specific_html(name, soup=soup)
+        get_imp_html(name, soup=soup)
+    with open(f"data/html_only_imp/{name}_imp_pro.html", "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _written_bytes(name):
+    return sum(os.path.getsize(path) for path in (
+        f"data/html_all/{name}_all_pro.html",
+        f"data/html_only/{name}_html_only.html",
+        f"data/html_only_imp/{name}_imp_pro.html",
+    ))
+
+
+def structure(html):
+    """(visible text, [(tag, attributes)]) with whitespace normalised"""
+    soup = BeautifulSoup(html, "lxml")
+    text = " ".join(soup.get_text(" ").split())
+    tags = [
+        (tag.name, tuple(sorted((key, " ".join(value) if isinstance(value, list) else value)
+                                for key, value in tag.attrs.items())))
+        for tag in soup.find_all(True) if tag.name not in ("html", "body")
+    ]
+    return text, tags
+
+
+def run_parser_benchmark(fixtures, repeats=3):
+    """Equivalence and timing of both backends per fixture"""
+    results = []
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="bench_parser_")
+    os.chdir(workdir)
+    try:
+        for fixture_name, html in fixtures:
+            row = {"fixture": fixture_name, "mb": round(len(html.encode("utf-8")) / 1e6, 2)}
+            outputs = {}
+            for backend in ("legacy", "lxml"):
+                name = f"{backend}_{fixture_name}"
+                times = []
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for _ in range(repeats):
+                        start = time.perf_counter()
+                        outputs[backend] = _run_backend(backend, name, html)
+                        times.append(time.perf_counter() - start)
+                row[f"{backend}_s"] = round(min(times), 4)
+                row[f"{backend}_mb_s"] = round(row["mb"] / min(times), 2)
+                row[f"{backend}_disk_mb"] = round(_written_bytes(name) / 1e6, 2)
+            row["speedup"] = round(row["legacy_s"] / row["lxml_s"], 2)
+            row["equivalent"] = structure(outputs["legacy"]) == structure(outputs["lxml"])
+            results.append(row)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the legacy and lxml parsing backends")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000], help="Synthetic page sizes in KB")
+    parser.add_argument("--carriers", nargs="+", default=None, help="orange vodafone we etisalat")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    fixtures = load_fixtures(sizes=[size * 1000 for size in args.sizes], carriers=args.carriers)
+    results = run_parser_benchmark(fixtures, args.repeats)
+
+    print(f"\n{'fixture':<32} {'MB':>6} {'legacy s':>9} {'lxml s':>8} {'speedup':>8} "
+          f"{'legacy disk':>12} {'lxml disk':>10}  same")
+    for row in results:
+        print(f"{row['fixture']:<32} {row['mb']:>6.2f} {row['legacy_s']:>9.3f} {row['lxml_s']:>8.3f} "
+              f"{row['speedup']:>7.2f}x {row['legacy_disk_mb']:>11.2f}M {row['lxml_disk_mb']:>9.2f}M  "
+              f"{'✅' if row['equivalent'] else '❌'}")
+    return 0 if all(row["equivalent"] for row in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""
+Website Pipeline Benchmark
+Offline benchmark of the four website-scraper stages on recorded/synthetic
+carrier pages, with a stub LLM instead of Gemini.
+
+Stages 1-3 run the way websitescraping runs them with the given parser
+backend (by default the production one, PARSER_BACKEND: raw page_source and
+one lxml parse shared by stages 1-3). Reports per-stage p50/p95 latency,
+throughput and peak Python memory, and compares them against the stored
+baseline (benchmarks/website_baseline.json). The baseline records the pages
+it was measured on; runs on another page set are not compared.
+
+Usage (from the project root):
+    python -m tools.benchmarks.bench_website_pipeline
+    python -m tools.benchmarks.bench_website_pipeline --sizes 100 1000 --repeats 10 --llm-latency 0.5
+    python -m tools.benchmarks.bench_website_pipeline --save-baseline
+    python -m tools.benchmarks.bench_website_pipeline --fail-on-regression
+    python -m tools.benchmarks.bench_website_pipeline --parser-backend legacy
+    python -m tools.benchmarks.bench_website_pipeline --record https://www.orange.eg/ar/Tariff-Plans/FREEmax
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from tools.scraper_1_all_pro import save_full_html
+from tools.scraper_2_all_pro_html_only import get_specific_html
+from tools.scraper_3_imp_pro import get_imp_html
+from tools.scraper_4_gemeni_json_gen import get_json_insights
+from tools.websitescraping import PARSER_BACKEND
+from tools.benchmarks.stub_llm import StubLLM
+from tools.benchmarks.website_fixtures import DEFAULT_SIZES, load_fixtures, record_fixture
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "website_baseline.json")
+
+# Stage name -> file the stage reads (None: the raw page HTML)
+STAGE_INPUTS = {
+    "get_full_html": None,
+    "get_specific_html": "data/html_all/{name}_all_pro.html",
+    "get_imp_html": "data/html_only/{name}_html_only.html",
+    "get_json_insights": "data/html_only_imp/{name}_imp_pro.html",
+}
+
+
+def _run_stage(stage, name, html, llm, parser_backend=PARSER_BACKEND, soup=None):
+    # Stage 1 is benchmarked from the parse-and-save step; the browser fetch needs the network.
+    # With the lxml backend the soup of stage 1 is handed on to stages 2 and 3, like _scrape_links does
+    shared = soup if parser_backend == "lxml" else None
+    if stage == "get_full_html":
+        return save_full_html(html, name, prettify=parser_backend == "legacy")
+    if stage == "get_specific_html":
+        get_specific_html(name, soup=shared)
+    elif stage == "get_imp_html":
+        get_imp_html(name, soup=shared)
+    else:
+        get_json_insights(name, model=llm)
+    return soup
+
+
+def _stage_bytes_in(stage, name, html):
+    if STAGE_INPUTS[stage] is None:
+        return len(html.encode("utf-8"))
+    return os.path.getsize(STAGE_INPUTS[stage].format(name=name))
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+
+def run_benchmark(fixtures, repeats=5, llm_latency=0.0, llm_jitter=0.0, parser_backend=PARSER_BACKEND):
+    """
+    Run every stage on every fixture: one pass under tracemalloc for peak
+    memory, then `repeats` timed passes. Returns {stage: stats}.
+    """
+    llm = StubLLM(latency_s=llm_latency, jitter_s=llm_jitter)
+    samples = {stage: [] for stage in STAGE_INPUTS}
+    bytes_in = {stage: 0 for stage in STAGE_INPUTS}
+    peak_memory = {stage: 0 for stage in STAGE_INPUTS}
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="bench_website_")
+    os.chdir(workdir)
+    try:
+        for fixture_name, html in fixtures:
+            name = f"bench_{fixture_name}"
+            print(f"   • {fixture_name} ({len(html.encode('utf-8')) / 1e6:.2f} MB)")
+
+            # The stages print progress; keep the benchmark output readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                soup = None
+                for stage in STAGE_INPUTS:
+                    tracemalloc.start()
+                    soup = _run_stage(stage, name, html, llm, parser_backend, soup)
+                    peak_memory[stage] = max(peak_memory[stage], tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+
+                for _ in range(repeats):
+                    soup = None
+                    for stage in STAGE_INPUTS:
+                        bytes_in[stage] += _stage_bytes_in(stage, name, html)
+                        start = time.perf_counter()
+                        soup = _run_stage(stage, name, html, llm, parser_backend, soup)
+                        samples[stage].append(time.perf_counter() - start)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {}
+    for stage, values in samples.items():
+        total_time = sum(values)
+        results[stage] = {
+            "runs": len(values),
+            "p50_s": round(_percentile(values, 50), 5),
+            "p95_s": round(_percentile(values, 95), 5),
+            "throughput_mb_s": round(bytes_in[stage] / total_time / 1e6, 3) if total_time else 0.0,
+            "peak_mem_mb": round(peak_memory[stage] / 1e6, 2),
+        }
+    return results
+
+
+def fixture_sizes(fixtures):
+    """{page name: bytes}, the page set a baseline is measured on"""
+    return {name: len(html.encode("utf-8")) for name, html in fixtures}
+
+
+def baseline_mismatches(fixtures, parser_backend, baseline):
+    """
+    Why results on these pages can't be compared with the baseline: pages
+    added, missing or of another size, or another parser backend
+    """
+    if "fixtures" not in baseline:
+        return ["the baseline doesn't record its pages (re-save it with --save-baseline)"]
+    pages, base_pages = fixture_sizes(fixtures), baseline["fixtures"]
+    mismatches = [f"{name} is not in the baseline" for name in pages if name not in base_pages]
+    mismatches += [f"{name} of the baseline is not in this run" for name in base_pages if name not in pages]
+    mismatches += [f"{name} is {pages[name]} bytes, {base_pages[name]} in the baseline"
+                   for name in pages if name in base_pages and pages[name] != base_pages[name]]
+    if baseline.get("parser_backend") != parser_backend:
+        mismatches.append(f"{parser_backend} parser backend, {baseline.get('parser_backend')} in the baseline")
+    return mismatches
+
+
+def compare_to_baseline(results, baseline, tolerance=0.10):
+    """
+    Print the change of every metric against the baseline and return the list
+    of regressions (slower, lower throughput or more memory beyond tolerance).
+    """
+    regressions = []
+    print(f"\n📏 Compared to baseline (tolerance {tolerance:.0%}):")
+    for stage, stats in results.items():
+        base = baseline.get(stage)
+        if not base:
+            print(f"   {stage:<20} (not in baseline)")
+            continue
+        changes = []
+        for metric, higher_is_better in (("p50_s", False), ("p95_s", False),
+                                         ("throughput_mb_s", True), ("peak_mem_mb", False)):
+            if not base.get(metric):
+                continue
+            change = (stats[metric] - base[metric]) / base[metric]
+            worse = -change if higher_is_better else change
+            flag = "❌" if worse > tolerance else "✅"
+            changes.append(f"{metric} {change:+.1%} {flag}")
+            if worse > tolerance:
+                regressions.append((stage, metric, base[metric], stats[metric]))
+        print(f"   {stage:<20} " + "  ".join(changes))
+    return regressions
+
+
+def print_results(results):
+    print(f"\n{'stage':<20} {'runs':>5} {'p50 (s)':>10} {'p95 (s)':>10} {'MB/s':>9} {'peak MB':>9}")
+    for stage, stats in results.items():
+        print(f"{stage:<20} {stats['runs']:>5} {stats['p50_s']:>10.4f} {stats['p95_s']:>10.4f} "
+              f"{stats['throughput_mb_s']:>9.2f} {stats['peak_mem_mb']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the website scraper stages")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[size // 1000 for size in DEFAULT_SIZES],
+                        help="Synthetic page sizes in KB")
+    parser.add_argument("--carriers", nargs="+", default=None, help="orange vodafone we etisalat")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.0, help="Stub LLM latency jitter in seconds")
+    parser.add_argument("--parser-backend", choices=("lxml", "legacy"), default=PARSER_BACKEND)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--record", metavar="URL", help="Record a live page as a fixture and exit")
+    parser.add_argument("--name", help="Fixture name for --record")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_fixture(args.record, args.name)
+        return 0
+
+    fixtures = load_fixtures(sizes=[size * 1000 for size in args.sizes], carriers=args.carriers)
+    print(f"\n🏁 Website pipeline benchmark: {len(fixtures)} pages x {args.repeats} repeats ({args.parser_backend} parser)")
+    results = run_benchmark(fixtures, args.repeats, args.llm_latency, args.llm_jitter, args.parser_backend)
+    print_results(results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"parser_backend": args.parser_backend, "fixtures": fixture_sizes(fixtures), "stages": results},
+                      f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nℹ️  No baseline at {args.baseline} (run with --save-baseline)")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    # Latencies on other pages say nothing about a regression
+    mismatches = baseline_mismatches(fixtures, args.parser_backend, baseline)
+    if mismatches:
+        print("\n⚠️  Not compared with the baseline, it was measured on another page set:")
+        for mismatch in mismatches:
+            print(f"   • {mismatch}")
+        print("   Run with the baseline's --sizes/--carriers, or re-save it with --save-baseline")
+        return 2
+    regressions = compare_to_baseline(results, baseline["stages"], args.tolerance)
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
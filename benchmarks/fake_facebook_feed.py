@@ -0,0 +1,255 @@
+"""
+Fake Facebook Feed
+Local HTTP server with an infinite-scroll feed of synthetic Facebook posts,
+for benchmarking the scroll / See More / extraction loop offline.
+
+The feed mimics the markup the scraper relies on: div[role="main"], one
+div[role="article"] per post with nested comment articles, truncated texts
+with a div[role="button"] "See more" that expands them on click, timestamp
+links and "All reactions" / comments / shares counters. Every post is
+generated deterministically from its index, so ground_truth() knows exactly
+what a perfect extraction returns.
+
+Usage:
+    python -m tools.benchmarks.fake_facebook_feed --port 8765
+    # then open http://127.0.0.1:8765/feed
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+PAGE_NAME = "Telecom Egypt"
+
+SENTENCES = [
+    "استمتع بأقوى باقات الانترنت المنزلي مع WE",
+    "مبروك للفائزين في مسابقة الشهر، تابعونا لمعرفة التفاصيل",
+    "Stay connected with our new 5G bundles, now available nationwide.",
+    "كل ابتسامة طفل تستاهل نكون جنبها",
+    "Download the My WE app to recharge and manage your lines in seconds.",
+    "اشترك الآن في باقة نت بلس واحصل على ضعف السرعة لمدة شهر",
+    "Our customer service team is available 24/7 to help you.",
+    "عروض حصرية لعملاء الخط الأرضي بمناسبة العيد",
+]
+
+COMMENTERS = ["Osama Elsharkawii", "نجلاء نيل", "Mahmoud Sayed", "فاطمه ثابت", "Ahmed Ali", "سارة محمد"]
+
+COMMENT_TEXTS = [
+    "لوسمحت ممكن رقم خدمة العملاء للنت الارضي",
+    "حضرتكم بكام شريحة esim",
+    "Is this offer available in Alexandria?",
+    "الخدمة ممتازة شكرا",
+    "When will the new bundles start?",
+]
+
+# Texts longer than this are truncated behind a "See more" button
+TRUNCATE_AT = 150
+
+
+def _format_count(value):
+    return f"{value / 1000:.1f}K" if value >= 1000 else str(value)
+
+
+def _post_time(index):
+    # Newest first: hours, then days, then absolute dates
+    if index < 5:
+        return f"{index * 3 + 1}h"
+    if index < 12:
+        return f"{index - 3}d"
+    return f"September {max(1, 28 - (index - 12) % 28)}"
+
+
+def make_post(index):
+    """Ground-truth post number `index` (FacebookPost fields)"""
+    rng = random.Random(index)
+    content = " ".join(rng.choice(SENTENCES) for _ in range(rng.randrange(1, 6))) + f" #{index}"
+    return {
+        "post_time": _post_time(index),
+        "content": content,
+        "likes_number": _format_count(rng.randrange(5, 4000)),
+        "comments_number": str(rng.randrange(0, 300)),
+        "shares_number": str(rng.randrange(0, 40)),
+        "comments": [
+            {"author": rng.choice(COMMENTERS), "text": rng.choice(COMMENT_TEXTS)}
+            for _ in range(rng.randrange(0, 4))
+        ],
+    }
+
+
+def render_post(index):
+    """HTML of one feed article; long texts are truncated behind "See more" """
+    post = make_post(index)
+    content = post["content"]
+    if len(content) > TRUNCATE_AT:
+        shown = html.escape(content[:TRUNCATE_AT]) + "… "
+        see_more = f'<div role="button" tabindex="0" class="see-more" data-post="{index}">See more</div>'
+    else:
+        shown = html.escape(content)
+        see_more = ""
+
+    comments = "".join(
+        f'<div role="article" class="comment"><a href="/user/{i}">{html.escape(comment["author"])}</a>'
+        f'<div dir="auto">{html.escape(comment["text"])}</div><span>Reply</span></div>'
+        for i, comment in enumerate(post["comments"])
+    )
+
+    return (
+        f'<div role="article" class="post" data-index="{index}">'
+        f'<h2><a href="/telecomegypt">{PAGE_NAME}</a></h2>'
+        f'<a href="/posts/{index}" aria-label="{post["post_time"]}">{post["post_time"]}</a>'
+        f'<div dir="auto" class="post-text" data-post="{index}">{shown}{see_more}</div>'
+        f'<div class="footer">All reactions: '
+        f'<span aria-label="All reactions: {post["likes_number"]}">{post["likes_number"]}</span> '
+        f'<span aria-label="{post["comments_number"]} comments">{post["comments_number"]}</span> '
+        f'<span aria-label="{post["shares_number"]} shares">{post["shares_number"]}</span>'
+        f"<div>Like</div><div>Comment</div><div>Share</div></div>"
+        f'<div class="comments">{comments}</div>'
+        f'<div style="height:{random.Random(index).randrange(80, 260)}px"></div>'
+        f"</div>"
+    )
+
+
+FEED_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>%(page_name)s | Facebook</title>
+<style>body{font-family:sans-serif;margin:0} div[role=article].post{border:1px solid #ccc;margin:12px auto;
+width:600px;padding:12px} .comment{margin:6px 24px;background:#f0f2f5;padding:6px}</style></head>
+<body><div role="banner">Facebook</div>
+<div role="main"><div id="feed"></div><div id="loading">Loading…</div></div>
+<script>
+let offset = 0, loading = false, done = false;
+const fullTexts = {};
+async function loadMore() {
+    if (loading || done) return;
+    loading = true;
+    const response = await fetch('/posts?offset=' + offset + '&limit=%(batch)d');
+    const batch = await response.json();
+    document.getElementById('feed').insertAdjacentHTML('beforeend', batch.html);
+    Object.assign(fullTexts, batch.full_texts);
+    offset += batch.count;
+    done = batch.count === 0;
+    loading = false;
+}
+document.addEventListener('click', (event) => {
+    const button = event.target.closest('.see-more');
+    if (!button) return;
+    const index = button.dataset.post;
+    const text = button.closest('.post-text');
+    setTimeout(() => { text.textContent = fullTexts[index]; }, %(expand_delay_ms)d);
+});
+window.addEventListener('scroll', () => {
+    if (window.innerHeight + window.scrollY >= document.body.offsetHeight - 1500) loadMore();
+});
+loadMore();
+</script></body></html>
+"""
+
+
+class FakeFacebookFeed:
+    """
+    Threaded HTTP server for the fake feed.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        batch_size: Posts returned per infinite-scroll request
+        max_posts: Posts available in total
+        latency_s: Delay added to every /posts response
+        expand_delay_ms: Delay before a clicked "See more" shows the full text
+    """
+
+    def __init__(self, port=0, batch_size=5, max_posts=500, latency_s=0.2, expand_delay_ms=150):
+        self.batch_size = batch_size
+        self.max_posts = max_posts
+        self.latency_s = latency_s
+        self.expand_delay_ms = expand_delay_ms
+        self.served_posts = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/feed"
+
+    def ground_truth(self):
+        """Posts served to the browser so far, in feed order"""
+        return [make_post(i) for i in range(self.served_posts)]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _posts_batch(self, offset, limit):
+        end = min(offset + limit, self.max_posts)
+        indexes = range(offset, end)
+        with self._lock:
+            self.served_posts = max(self.served_posts, end)
+        return {
+            "count": len(indexes),
+            "html": "".join(render_post(i) for i in indexes),
+            "full_texts": {str(i): make_post(i)["content"] for i in indexes},
+        }
+
+    def _handler_class(self):
+        feed = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/feed":
+                    body = FEED_PAGE % {"page_name": PAGE_NAME, "batch": feed.batch_size,
+                                        "expand_delay_ms": feed.expand_delay_ms}
+                    self._send(200, "text/html; charset=utf-8", body)
+                elif parsed.path == "/posts":
+                    query = parse_qs(parsed.query)
+                    time.sleep(feed.latency_s)
+                    batch = feed._posts_batch(int(query.get("offset", ["0"])[0]),
+                                              int(query.get("limit", [str(feed.batch_size)])[0]))
+                    self._send(200, "application/json", json.dumps(batch, ensure_ascii=False))
+                else:
+                    self._send(404, "text/plain", "not found")
+
+            def _send(self, status, content_type, body):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake infinite-scroll Facebook feed")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--max-posts", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    feed = FakeFacebookFeed(args.port, args.batch_size, args.max_posts, args.latency).start()
+    print(f"🌐 Fake feed at {feed.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        feed.stop()
@@ -0,0 +1,106 @@
+"""
+Facebook Feed Replay
+Decodes a recorded set of Facebook feed responses offline and checks the
+posts against the expected ones, so the GraphQL decoder can be tested without
+a browser, a Facebook session or an LLM.
+
+The default fixture (benchmarks/fixtures/facebook_feed_responses.jsonl) holds
+a server-rendered first page and GraphQL feed responses: a deferred
+reactions fragment, a guarded ("for (;;);") body with a truncated line, an
+unrelated query, a failed request and a story that is served twice. Record a
+new fixture from a real run with
+facebook_basic_scroll(..., capture_feed=True, feed_record_path="feed.jsonl").
+
+Usage:
+    python -m tools.benchmarks.replay_facebook_feed
+    python -m tools.benchmarks.replay_facebook_feed --fixture feed.jsonl --expected none
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from tools.facebook_basic_scroll import _posts_from_extracted_data
+from tools.facebook_feed_capture import FeedCapture
+from tools.facebook_post_store import normalize_post_time
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+DEFAULT_FIXTURE = os.path.join(FIXTURES_DIR, "facebook_feed_responses.jsonl")
+DEFAULT_EXPECTED = os.path.join(FIXTURES_DIR, "facebook_feed_expected.json")
+
+# Fields compared with the expected posts; post_time is compared as a date
+# (published_date), since the decoded time is in the local timezone
+COMPARED_FIELDS = ("content", "likes_number", "comments_number", "shares_number", "comments")
+
+
+def replay(path):
+    """
+    Feed the recorded responses one by one, draining the decoder after each
+    like the streaming scraper does after each scroll step.
+
+    Returns:
+        (posts as dicts in emission order, posts ready after each response, decoder stats, seconds)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    capture = FeedCapture()
+    posts, ready_per_response = [], []
+    start = time.perf_counter()
+    for i, record in enumerate(records):
+        capture.handle(record["url"], record.get("status", 200), record.get("resource_type"), record["body"])
+        ready = capture.decoder.drain(final=i == len(records) - 1)
+        ready_per_response.append(len(ready))
+        posts += [post.model_dump() for post in _posts_from_extracted_data({"posts": ready})]
+    return posts, ready_per_response, capture.decoder.stats, time.perf_counter() - start
+
+
+def compare(posts, expected):
+    """Per-field mismatches between decoded and expected posts (matched by position)"""
+    mismatches = []
+    if len(posts) != len(expected):
+        mismatches.append(f"{len(posts)} posts decoded, {len(expected)} expected")
+    for i, (post, truth) in enumerate(zip(posts, expected)):
+        if normalize_post_time(post["post_time"]) != truth["published_date"]:
+            mismatches.append(f"post {i}: post_time {post['post_time']!r} is not on {truth['published_date']}")
+        for field in COMPARED_FIELDS:
+            if post[field] != truth[field]:
+                mismatches.append(f"post {i}: {field} {post[field]!r} != {truth[field]!r}")
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded Facebook feed responses through the decoder")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--expected", default=DEFAULT_EXPECTED, help='Expected posts JSON, or "none" to skip the check')
+    parser.add_argument("--json", action="store_true", help="Print the decoded posts as JSON")
+    args = parser.parse_args(argv)
+
+    posts, ready_per_response, stats, elapsed = replay(args.fixture)
+
+    if args.json:
+        print(json.dumps({"posts": posts}, ensure_ascii=False, indent=2))
+    else:
+        print(f"\n📡 Decoded {stats['responses']} feed responses in {elapsed * 1000:.1f} ms")
+        print(f"   Documents: {stats['documents']} ({stats['invalid_documents']} invalid), stories: {stats['stories']}")
+        print(f"   Posts ready after each response: {ready_per_response}")
+        for post in posts:
+            print(f"   • {post['post_time']:<28} 👍 {post['likes_number']:<6} 💬 {post['comments_number']:<5} "
+                  f"↗ {post['shares_number']:<4} {post['content'][:50]}")
+
+    if args.expected.lower() == "none":
+        return 0
+    with open(args.expected, "r", encoding="utf-8") as f:
+        expected = json.load(f)["posts"]
+    mismatches = compare(posts, expected)
+    for mismatch in mismatches:
+        print(f"   ❌ {mismatch}")
+    if not args.json:
+        print(f"\n{'✅ Decoded posts match the expected ones' if not mismatches else '❌ Decoded posts differ'}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
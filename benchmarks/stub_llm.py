@@ -0,0 +1,64 @@
+"""
+Stub LLM
+Offline stand-in for ChatGoogleGenerativeAI with configurable latency
+"""
+import json
+import random
+import re
+import time
+
+
+class StubResponse:
+    """Mimics the parts of a LangChain AIMessage the scrapers read"""
+
+    def __init__(self, content, input_tokens, output_tokens):
+        self.content = content
+        self.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+
+# A packed request's documents (get_json_insights_batch)
+DOCUMENT_PATTERN = re.compile(r'<document id="([^"]+)">\n(.*?)\n</document>', re.DOTALL)
+
+
+def _plans(html):
+    names = re.findall(r'class="plan-name"[^>]*>\s*([^<]+?)\s*<', html)
+    return {"plans": [{"name": name} for name in names]}
+
+
+class StubLLM:
+    """
+    Answers invoke(prompt) after latency_s (+/- jitter_s) plus
+    latency_per_1k_tokens for every 1,000 prompt tokens, with a small JSON
+    document listing the plan names found in the prompt (one per document,
+    keyed by document id, for a packed request), and reports token usage
+    estimated at 4 characters per token.
+    """
+
+    def __init__(self, latency_s=0.0, jitter_s=0.0, seed=0, latency_per_1k_tokens=0.0):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.calls = 0
+        self.prompt_tokens = 0
+        self._rng = random.Random(seed)
+
+    def invoke(self, prompt):
+        self.calls += 1
+        input_tokens = len(prompt) // 4
+        self.prompt_tokens += input_tokens
+        delay = self.latency_s + self._rng.uniform(-self.jitter_s, self.jitter_s)
+        delay += self.latency_per_1k_tokens * input_tokens / 1000
+        if delay > 0:
+            time.sleep(delay)
+
+        documents = DOCUMENT_PATTERN.findall(prompt)
+        if documents:
+            data = {document_id: _plans(html) for document_id, html in documents}
+        else:
+            data = _plans(prompt)
+        content = json.dumps(data, ensure_ascii=False)
+        return StubResponse(content, input_tokens, len(content) // 4)
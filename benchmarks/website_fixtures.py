@@ -0,0 +1,145 @@
+"""
+Website Benchmark Fixtures
+Carrier tariff pages for the offline website pipeline benchmarks.
+
+Fixture pages are read from benchmarks/fixtures/*.html. The committed
+corpus (synthetic_<carrier>_250kb.html) is not recorded from the live sites:
+it is one page per carrier made by build_page below and kept on disk, so the
+baseline in website_baseline.json is measured on fixed bytes. Live pages
+recorded with record_fixture are picked up next to them.
+Synthetic pages mimic the structure get_imp_html looks for on each carrier
+(Orange <app-free-max>, Vodafone #main-content, We [role=main], Etisalat
+main.position-relative) and are padded with scripts, styles, SVG icons and
+inline CSS to a target size, so the cleaning stages see realistic work.
+"""
+import glob
+import os
+import random
+import shutil
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Page sizes used when no size is given (bytes)
+DEFAULT_SIZES = (100_000, 1_000_000, 4_000_000)
+
+CARRIERS = {
+    "orange": ("<app-free-max>", "</app-free-max>"),
+    "vodafone": ('<div id="main-content">', "</div>"),
+    "we": ('<div role="main">', "</div>"),
+    "etisalat": ('<main class="position-relative">', "</main>"),
+}
+
+PLAN_NAMES = ["فري ماكس", "كارت الكبير", "PREMIER", "ALO", "سوبر كنترول", "Flex 70", "Red Essential", "نت بلس"]
+FEATURES = [
+    "دقائق لكل الشبكات", "ميجابايت انترنت", "Unlimited social", "رسائل SMS",
+    "Roaming bundle", "صلاحية 30 يوم", "Free Watch IT", "مكالمات دولية",
+]
+
+
+def _plan_card(rng, i):
+    name = rng.choice(PLAN_NAMES)
+    price = rng.choice([50, 70, 100, 150, 200, 300, 500])
+    features = "".join(
+        f'<li style="color:#{rng.randrange(0xffffff):06x}"><svg viewBox="0 0 24 24"><path d="M0 0h24v24H0z"/></svg>'
+        f"{rng.randrange(100, 20000)} {rng.choice(FEATURES)}</li>"
+        for _ in range(rng.randrange(3, 7))
+    )
+    return (
+        f'<div class="plan-card card-{i}" style="padding:12px;border:1px solid #ddd">'
+        f'<picture><img src="/img/plan-{i}.png" alt="{name}"></picture>'
+        f'<h3 class="plan-name">{name} {i}</h3>'
+        f'<span class="price">{price} جنيه / شهر</span>'
+        f"<ul>{features}</ul>"
+        f'<a class="btn" href="/subscribe/{i}">اشترك الآن</a></div>'
+    )
+
+
+def _noise(rng):
+    kind = rng.randrange(4)
+    if kind == 0:
+        return "<script>window.__DATA__ = " + str([rng.random() for _ in range(60)]) + ";</script>"
+    if kind == 1:
+        return "<style>" + "".join(f".c{rng.randrange(10**6)}{{margin:{rng.randrange(40)}px}}" for _ in range(40)) + "</style>"
+    if kind == 2:
+        return '<svg width="24" height="24">' + '<path d="M12 2L2 7l10 5 10-5-10-5z"/>' * 20 + "</svg>"
+    return '<nav class="menu">' + "".join(f'<a href="/p/{rng.randrange(999)}">رابط {j}</a>' for j in range(20)) + "</nav>"
+
+
+def build_page(carrier, target_bytes, seed=0):
+    """Synthetic tariff page for a carrier, about target_bytes long"""
+    rng = random.Random(f"{carrier}-{target_bytes}-{seed}")
+    open_tag, close_tag = CARRIERS[carrier]
+
+    head = ['<!DOCTYPE html><html lang="ar" dir="rtl"><head><meta charset="utf-8">',
+            '<link rel="stylesheet" href="/styles.css"><title>Tariff Plans</title>']
+    cards = []
+    body_noise = []
+    size = 0
+    i = 0
+    # Roughly a third of the page is plan content, the rest is noise to strip
+    while size < target_bytes:
+        card = _plan_card(rng, i)
+        cards.append(card)
+        size += len(card.encode("utf-8"))
+        for _ in range(3):
+            noise = _noise(rng)
+            (head if rng.random() < 0.3 else body_noise).append(noise)
+            size += len(noise.encode("utf-8"))
+        i += 1
+
+    return (
+        "".join(head) + "</head><body>"
+        + '<header class="site-header">' + "".join(body_noise[: len(body_noise) // 2]) + "</header>"
+        + open_tag + '<section class="plans">' + "".join(cards) + "</section>" + close_tag
+        + '<footer class="site-footer">' + "".join(body_noise[len(body_noise) // 2:]) + "</footer>"
+        + "</body></html>"
+    )
+
+
+def build_imp_pages(count, seed=0, max_cards=2):
+    """
+    count small "important HTML" fragments like get_imp_html leaves of a
+    single-plan page: one to max_cards plan cards each. List of (name, html).
+    """
+    rng = random.Random(f"imp-{seed}")
+    pages = []
+    for page in range(count):
+        cards = "".join(_plan_card(rng, page * max_cards + i) for i in range(rng.randint(1, max_cards)))
+        pages.append((f"imp_{page:04d}", f'<section class="plans">{cards}</section>'))
+    return pages
+
+
+def load_fixtures(sizes=DEFAULT_SIZES, carriers=None):
+    """
+    List of (name, html) pairs: every page in FIXTURES_DIR, then a synthetic
+    page per carrier and size (unless a page of that name is on disk).
+    """
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            fixtures.append((os.path.splitext(os.path.basename(path))[0], f.read()))
+
+    for carrier in carriers or CARRIERS:
+        for target_bytes in sizes:
+            name = f"synthetic_{carrier}_{target_bytes // 1000}kb"
+            if not any(fixture_name == name for fixture_name, _ in fixtures):
+                fixtures.append((name, build_page(carrier, target_bytes)))
+    return fixtures
+
+
+def record_fixture(url, name=None):
+    """
+    Render a live page with get_full_html and keep its HTML as a recorded
+    fixture (needs Chrome and network access; run once, then benchmark offline).
+    """
+    from tools.scraper_1_all_pro import get_bakat_name, get_full_html
+
+    bakat_name = get_bakat_name([url])[0]
+    get_full_html(url, bakat_name)
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path_out = os.path.join(FIXTURES_DIR, f"{name or bakat_name}.html")
+    shutil.copyfile(f"data/html_all/{bakat_name}_all_pro.html", path_out)
+    print(f"✅ Fixture recorded: {path_out}")
+    return path_out
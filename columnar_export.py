@@ -0,0 +1,267 @@
+"""
+Columnar Export
+Appends normalised Facebook posts and tariff-plan records to a partitioned
+dataset for analytics, instead of one pretty-printed JSON file per page
+"""
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+from urllib.parse import urlparse
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # line-delimited JSON is written instead
+    pa = None
+    pq = None
+
+from tools.facebook_post_store import normalize_post_time, post_fingerprint
+
+
+EXPORT_DIR = "./data/export"
+
+# Column order per dataset; every row is written with exactly these columns
+DATASET_COLUMNS = {
+    "facebook_posts": [
+        "run_id", "scraped_at", "page_url", "fingerprint", "post_time", "published_date", "content",
+        "likes_number", "comments_number", "shares_number", "likes", "comments", "shares",
+        "comments_json",
+    ],
+    "tariff_plans": [
+        "run_id", "scraped_at", "url", "host", "record_index", "name", "price", "record_json",
+    ],
+}
+
+# Integer columns; all others are strings (a fixed schema keeps part files scannable together)
+INT_COLUMNS = {"likes", "comments", "shares", "record_index"}
+
+# Keys of a tariff record (LLM output or API payload) that hold the plan name / price (the schema is free-form)
+NAME_KEYS = ("name", "plan_name", "product_name", "bundle_name", "package_name", "name_en", "name_ar", "title",
+             "اسم", "الاسم")
+PRICE_KEYS = ("price", "cost", "monthly_price", "fee", "monthly_fee", "السعر", "سعر")
+
+COUNT_SUFFIXES = {"k": 1_000, "m": 1_000_000, "ألف": 1_000, "مليون": 1_000_000}
+
+
+def parse_count(value):
+    """Facebook counter text ("1.2K", "450", "3 shares") as an int, None if unreadable"""
+    if value is None:
+        return None
+    match = re.search(r"(\d+(?:[.,]\d+)?)\s*([^\d\s]*)", str(value).replace(",", ""))
+    if not match:
+        return None
+    number = float(match.group(1))
+    return int(round(number * COUNT_SUFFIXES.get(match.group(2).lower(), 1)))
+
+
+def facebook_post_rows(posts, page_url, run_id, scraped_at=None):
+    """Rows of the facebook_posts dataset for posts (dicts or FacebookPost objects)"""
+    scraped_at = scraped_at or datetime.now()
+    rows = []
+    for post in posts:
+        if hasattr(post, "model_dump"):
+            post = post.model_dump()
+        rows.append({
+            "run_id": run_id,
+            "scraped_at": scraped_at.isoformat(timespec="seconds"),
+            "page_url": page_url,
+            "fingerprint": post_fingerprint(post, page_url, scraped_at),
+            "post_time": post.get("post_time"),
+            "published_date": normalize_post_time(post.get("post_time"), scraped_at),
+            "content": post.get("content"),
+            "likes_number": post.get("likes_number"),
+            "comments_number": post.get("comments_number"),
+            "shares_number": post.get("shares_number"),
+            "likes": parse_count(post.get("likes_number")),
+            "comments": parse_count(post.get("comments_number")),
+            "shares": parse_count(post.get("shares_number")),
+            "comments_json": json.dumps(post.get("comments") or [], ensure_ascii=False),
+        })
+    return rows
+
+
+def tariff_items(data):
+    """Plan records of a get_json_insights output: the first list of objects in it"""
+    if isinstance(data, list):
+        return [item for item in data if isinstance(item, dict)] or [{"value": data}]
+    if isinstance(data, dict):
+        for value in data.values():
+            if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+                return value
+        for value in data.values():
+            if isinstance(value, dict):
+                items = tariff_items(value)
+                if items != [value]:
+                    return items
+        return [data]
+    return [{"value": data}]
+
+
+def _first_value(record, keys):
+    for key, value in record.items():
+        # camelCase keys of API payloads (planName) match their snake_case form
+        key = re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", key).lower()
+        if key in keys and isinstance(value, (str, int, float)):
+            return str(value)
+    return None
+
+
+def tariff_plan_fields(record):
+    """Name and price of one plan record, whatever keys (English or Arabic) the LLM used for them"""
+    return {"name": _first_value(record, NAME_KEYS), "price": _first_value(record, PRICE_KEYS)}
+
+
+def tariff_plan_rows(data, url, run_id, scraped_at=None):
+    """Rows of the tariff_plans dataset for the JSON get_json_insights produced for url"""
+    scraped_at = scraped_at or datetime.now()
+    return [
+        {
+            "run_id": run_id,
+            "scraped_at": scraped_at.isoformat(timespec="seconds"),
+            "url": url,
+            "host": urlparse(url).netloc.lower(),
+            "record_index": i,
+            **tariff_plan_fields(record),
+            "record_json": json.dumps(record, ensure_ascii=False),
+        }
+        for i, record in enumerate(tariff_items(data))
+    ]
+
+
+class ColumnarExporter:
+    """
+    Buffers rows and appends them in batches to
+    <root>/<dataset>/scrape_date=YYYY-MM-DD/part-*.parquet (pyarrow) or
+    part-*.jsonl (fallback), so a query over weeks of history is one scan of
+    a few large files instead of thousands of small JSON documents.
+
+    Usage:
+        with ColumnarExporter() as exporter:
+            exporter.add("tariff_plans", tariff_plan_rows(data, url, run_id))
+    """
+
+    def __init__(self, root=EXPORT_DIR, batch_size=1000, file_format=None):
+        self.root = root
+        self.batch_size = batch_size
+        self.file_format = file_format or ("parquet" if pa is not None else "jsonl")
+        if self.file_format == "parquet" and pa is None:
+            raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow)")
+        self._buffers = {dataset: [] for dataset in DATASET_COLUMNS}
+        self.files_written = []
+
+    def add(self, dataset, rows):
+        """Queue rows for a dataset; a batch is written once batch_size rows are waiting"""
+        buffer = self._buffers[dataset]
+        buffer.extend({column: row.get(column) for column in DATASET_COLUMNS[dataset]} for row in rows)
+        if len(buffer) >= self.batch_size:
+            self.flush(dataset)
+
+    def flush(self, dataset=None):
+        """Write the buffered rows (of one dataset or all) as new part files"""
+        for name in ([dataset] if dataset else list(self._buffers)):
+            rows, self._buffers[name] = self._buffers[name], []
+            # One partition per scrape day
+            partitions = {}
+            for row in rows:
+                partitions.setdefault((row["scraped_at"] or "")[:10] or "unknown", []).append(row)
+            for scrape_date, partition_rows in partitions.items():
+                self.files_written.append(self._write_part(name, scrape_date, partition_rows))
+
+    def _write_part(self, dataset, scrape_date, rows):
+        directory = os.path.join(self.root, dataset, f"scrape_date={scrape_date}")
+        os.makedirs(directory, exist_ok=True)
+        stem = f"part-{datetime.now().strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        if self.file_format == "parquet":
+            path = os.path.join(directory, stem + ".parquet")
+            columns = DATASET_COLUMNS[dataset]
+            schema = pa.schema([(column, pa.int64() if column in INT_COLUMNS else pa.string()) for column in columns])
+            table = pa.Table.from_pydict({column: [row[column] for row in rows] for column in columns}, schema=schema)
+            pq.write_table(table, path, compression="zstd")
+        else:
+            path = os.path.join(directory, stem + ".jsonl")
+            with open(path, "w", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        return path
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_dataset(dataset, root=EXPORT_DIR, since=None):
+    """
+    All rows of an exported dataset as a list of dicts, optionally only
+    partitions with scrape_date >= since ("YYYY-MM-DD"). Reads Parquet and
+    JSONL parts alike.
+    """
+    directory = os.path.join(root, dataset)
+    if not os.path.isdir(directory):
+        return []
+
+    rows = []
+    for partition in sorted(os.listdir(directory)):
+        if since and partition.split("=", 1)[-1] < since:
+            continue
+        for name in sorted(os.listdir(os.path.join(directory, partition))):
+            rows.extend(_read_part(os.path.join(directory, partition, name)))
+    return rows
+
+
+def _read_part(path):
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise ValueError(f"{path} needs the pyarrow package to be read")
+        return pq.read_table(path).to_pylist()
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return []
+
+
+def compact(dataset, root=EXPORT_DIR, file_format=None):
+    """
+    Merge the part files of every partition of a dataset into one (single-URL
+    agent calls write one small part per run). Returns the number of files removed.
+    """
+    directory = os.path.join(root, dataset)
+    if not os.path.isdir(directory):
+        return 0
+
+    removed = 0
+    exporter = ColumnarExporter(root, file_format=file_format)
+    for partition in sorted(os.listdir(directory)):
+        partition_dir = os.path.join(directory, partition)
+        parts = sorted(name for name in os.listdir(partition_dir) if name.endswith((".parquet", ".jsonl")))
+        if len(parts) < 2:
+            continue
+        rows = [row for name in parts for row in _read_part(os.path.join(partition_dir, name))]
+        # Write the merged part before deleting the old ones
+        merged = exporter._write_part(dataset, partition.split("=", 1)[-1], rows)
+        for name in parts:
+            if os.path.join(partition_dir, name) != merged:
+                os.remove(os.path.join(partition_dir, name))
+        removed += len(parts) - 1
+    return removed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or compact the exported datasets")
+    parser.add_argument("--root", default=EXPORT_DIR)
+    parser.add_argument("--compact", action="store_true", help="Merge the part files of each partition")
+    args = parser.parse_args()
+
+    for dataset in DATASET_COLUMNS:
+        if args.compact:
+            print(f"🗜️  {dataset}: {compact(dataset, args.root)} part files merged away")
+        print(f"📊 {dataset}: {len(read_dataset(dataset, args.root))} rows")
@@ -3,12 +3,26 @@ Facebook Basic Navigator with LLM Extraction
 Navigates, scrolls, expands posts, and extracts structured data
 """
 import asyncio
+import gzip
+import hashlib
 import json
+import math
+import os
+import re
+from datetime import datetime
+from bs4 import BeautifulSoup
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode, LLMConfig
-from crawl4ai.extraction_strategy import LLMExtractionStrategy
-from pydantic import BaseModel, Field
+from crawl4ai.extraction_strategy import ExtractionStrategy
+from crawl4ai.models import TokenUsage
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional
 from langchain_core.tools import tool
+from tools.facebook_feed_capture import FeedCapture, uncovered_articles
+from tools.facebook_post_store import FacebookPostStore
+from tools.columnar_export import ColumnarExporter, facebook_post_rows
+from tools.pipeline_metrics import METRICS_PATH, RunMetrics, llm_cached_tokens, llm_usage
+from tools.prompt_cache import CachedPrefixExtractionStrategy
+from tools.model_router import ModelRouter, print_routing_report, schema_problems
 
 
 # Define the data structure for comments
@@ -34,270 +48,34 @@ class FacebookPosts(BaseModel):
     posts: List[FacebookPost] = Field(description="List of all posts found on the page")
 
 
-async def facebook_basic_scroll(
-    page_url="https://www.facebook.com/Telecomegypt",
-    scroll_count=5,
-    scroll_wait=3,
-    headless=False,
-    session_dir="./facebook_session_c4a",
-    session_id="facebook_c4a_session",
-    save_debug_files=True
-):
-    """
-    Simple script: Navigate to Facebook and scroll
-    
-    Args:
-        page_url: Facebook page URL to scrape
-        scroll_count: Number of times to scroll
-        scroll_wait: Seconds to wait between scrolls
-        headless: Run browser in headless mode
-        session_dir: Directory for browser session data
-        session_id: Session identifier
-        save_debug_files: Whether to save debug HTML/markdown files (default: True)
-    """
-    
-    print(f"\n🔍 Facebook Basic Navigator")
-    print("=" * 60)
-    print(f"📍 URL: {page_url}")
-    print(f"📜 Scrolls: {scroll_count}")
-    print("=" * 60)
-    
-    # Configure browser
-    browser_config = BrowserConfig(
-        headless=headless,
-        user_data_dir=session_dir,
-        use_persistent_context=True,
-        use_managed_browser=True,
-        viewport_width=1366,
-        viewport_height=768,
-        enable_stealth=True,  # Disabled due to import error
-        verbose=True
-    )
-    
-    # Incremental scroll script with button clicking at each step
-    scroll_script = """
-    # Wait for page to load
-    WAIT `div[role="main"]` 15
-    
-    # Initialize tracking variables
-    EVAL `
-    window.__CLICKED_BUTTONS__ = new Set();
-    window.__TOTAL_CLICKS__ = 0;
-    window.__SCROLL_STEP__ = 0;
-    console.log('🚀 Starting incremental scroll with See More clicking');
-    `
-    WAIT 5
-    
-    # Function to find and click See More buttons with tracking
-    EVAL `
-    window.clickSeeMoreButtons = function(stepNumber) {
-        const buttons = document.querySelectorAll('div[role="button"]');
-        const seeMoreButtons = [];
-        let newButtonsClicked = 0;
-        
-        // Find all "See More" buttons
-        for (let btn of buttons) {
-            const text = btn.textContent.trim();
-            if (text.includes('See More') || text.includes('See more') || 
-                text.includes('عرض المزيد') || text.includes('See More') ||
-                text.includes('المزيد') || text.includes('عرض كامل')) {
-                
-                // Create unique identifier for button
-                const rect = btn.getBoundingClientRect();
-                const buttonId = text + '_' + Math.round(rect.top) + '_' + Math.round(rect.left);
-                
-                // Only add if not already clicked
-                if (!window.__CLICKED_BUTTONS__.has(buttonId)) {
-                    seeMoreButtons.push({btn: btn, id: buttonId});
-                }
-            }
-        }
-        
-        console.log('📍 Step ' + stepNumber + ': Found ' + seeMoreButtons.length + ' new See More buttons');
-        
-        // Click new buttons sequentially with visual feedback
-        seeMoreButtons.forEach((btnData, index) => {
-            setTimeout(() => {
-                try {
-                    const btn = btnData.btn;
-                    const btnId = btnData.id;
-                    
-                    // Check if button is still visible and clickable
-                    const rect = btn.getBoundingClientRect();
-                    if (rect.width > 0 && rect.height > 0) {
-                        // Add visual feedback
-                        btn.style.border = '3px solid orange';
-                        btn.style.backgroundColor = 'lightyellow';
-                        
-                        // Smooth scroll button into view if needed
-                        if (rect.top < 100 || rect.top > window.innerHeight - 100) {
-                            btn.scrollIntoView({behavior: 'smooth', block: 'center', inline: 'nearest'});
-                        }
-                        
-                        setTimeout(() => {
-                            btn.click();
-                            window.__CLICKED_BUTTONS__.add(btnId);
-                            window.__TOTAL_CLICKS__++;
-                            newButtonsClicked++;
-                            
-                            // Change color after successful click
-                            btn.style.border = '3px solid green';
-                            btn.style.backgroundColor = 'lightgreen';
-                            
-                            console.log('✅ Step ' + stepNumber + ': Clicked button ' + (index + 1) + 
-                                       '/' + seeMoreButtons.length + ' (Total: ' + window.__TOTAL_CLICKS__ + ')');
-                        }, 200);
-                        
-                    } else {
-                        console.log('⚠️ Button not visible, skipping');
-                    }
-                } catch(e) {
-                    console.log('❌ Failed to click button: ' + e.message);
-                }
-            }, index * 800); // Much slower clicking (800ms between clicks) for maximum reliability
-        });
-        
-        return seeMoreButtons.length;
-    };
-    `
-    WAIT 2
-    
-    # Initial click on visible buttons before scrolling
-    EVAL `
-    window.__SCROLL_STEP__ = 0;
-    const initialButtons = window.clickSeeMoreButtons(0);
-    console.log('🎯 Initial pass: Processing ' + initialButtons + ' buttons');
-    `
-    WAIT 8
-    """
-    
-    # Generate incremental scroll steps with button clicking
-    for i in range(scroll_count):
-        scroll_script += f"""
-    # === SCROLL STEP {i+1} ===
-    
-    # Smooth scroll down gradually with JavaScript (slower)
-    EVAL `
-    (function() {{
-        const currentY = window.pageYOffset;
-        const targetY = currentY + 400;  // Scroll only 400px at a time (slower)
-        
-        console.log('📜 Step {i+1}: Smooth scrolling from ' + currentY + ' to ' + targetY);
-        
-        // Smooth scroll with slower animation
-        window.scrollTo({{
-            top: targetY,
-            behavior: 'smooth'
-        }});
-        
-        // Mark scroll as complete (longer wait for animation)
-        setTimeout(() => {{
-            console.log('✅ Step {i+1}: Scroll completed at ' + window.pageYOffset);
-        }}, 2000);
-    }})();
-    `
-    WAIT {max(5, scroll_wait + 3)}
-    
-    # Click newly visible "See More" buttons
-    EVAL `
-    window.__SCROLL_STEP__++;
-    const buttonsFound = window.clickSeeMoreButtons(window.__SCROLL_STEP__);
-    console.log('📊 Step ' + window.__SCROLL_STEP__ + ' Summary:');
-    console.log('  - Buttons found: ' + buttonsFound);
-    console.log('  - Total clicked so far: ' + window.__TOTAL_CLICKS__);
-    `
-    WAIT 7
-    """
-    
-    # Final comprehensive pass and cleanup
-    scroll_script += """
-    # === FINAL COMPREHENSIVE PASS ===
-    
-    # Wait for any loading to complete
-    WAIT 3
-    
-    # Final pass to catch any remaining buttons
-    EVAL `
-    console.log('🔍 Final comprehensive pass...');
-    const finalButtons = window.clickSeeMoreButtons('FINAL');
-    console.log('📊 FINAL STATISTICS:');
-    console.log('  - Final pass buttons: ' + finalButtons);
-    console.log('  - Total buttons clicked: ' + window.__TOTAL_CLICKS__);
-    console.log('  - Unique button IDs tracked: ' + window.__CLICKED_BUTTONS__.size);
-    `
-    WAIT 10
-    
-    # Count total posts for verification
-    EVAL `
-    (function() {
-        const posts = document.querySelectorAll('div[role="article"]');
-        const postsWithContent = document.querySelectorAll('div[role="article"] div[data-ad-preview]');
-        console.log('� POST STATISTICS:');
-        console.log('  - Total posts found: ' + posts.length);
-        console.log('  - Posts with content: ' + postsWithContent.length);
-        console.log('  - See More buttons clicked: ' + window.__TOTAL_CLICKS__);
-        window.__TOTAL_POSTS__ = posts.length;
-    })();
-    `
-    WAIT 2
-    
-    # Scroll back to top for extraction
-    EVAL `
-    (function() {
-        console.log('📜 Scrolling back to top for content extraction...');
-        const currentY = window.pageYOffset;
-        console.log('🔝 Starting from position: ' + currentY);
-        
-        window.scrollTo({ 
-            top: 0, 
-            behavior: 'smooth' 
-        });
-        
-        // Wait for scroll to complete then verify
-        setTimeout(() => {
-            console.log('✅ Scrolled to position: ' + window.pageYOffset);
-        }, 2000);
-    })();
-    `
-    WAIT 6
-    
-    # Final wait for content to stabilize
-    WAIT 3
-    """
-    
-    # Configure LLM extraction
-    print(f"\n🤖 Setting up LLM extraction...")
-    
-    # Load API key from environment variable
-    import os
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables. Please create a .env file.")
-    
-    # DeepSeek - More reliable for structured extraction
-    # llm_config = LLMConfig(
-    #     provider="deepseek/deepseek-chat",
-    #     api_token=os.getenv("DEEPSEEK_API_KEY")
-    # )
-    
-    llm_config = LLMConfig(
-        provider="gemini/gemini-2.5-pro",
-        api_token=api_key
-    )
+# LLM providers tried for each extraction, cheapest first; a batch of articles
+# goes to the next one only if validate_extracted_posts rejects the posts
+FACEBOOK_MODEL_TIERS = ("gemini/gemini-2.5-flash", "gemini/gemini-2.5-pro")
 
-    # llm_config = LLMConfig(
-    #     provider="groq/llama-3.3-70b-versatile",
-    #     api_token=os.getenv("GROQ_API_KEY")
-    # )
-    extraction_strategy = LLMExtractionStrategy(
-        llm_config=llm_config,
-        schema=FacebookPosts.model_json_schema(),
-        extraction_type="schema",
-        input_format="markdown",  # Use markdown - has timestamps at the end
-        instruction="""
+# Articles with less text than this (empty placeholders) aren't expected to yield a post
+MIN_ARTICLE_CHARS = 20
+
+# Share of those articles a tier's posts must cover; sponsored, reel and "suggested"
+# articles yield no post, so an exact count would escalate most batches
+MIN_POST_RATIO = 0.8
+
+
+# JSON script element the scroll script publishes its per-step telemetry into
+TELEMETRY_PATTERN = re.compile(r'<script[^>]*id="__scroll_telemetry__"[^>]*>(.*?)</script>', re.DOTALL)
+
+
+# Local store used by facebook_scraper_tool to deduplicate posts across runs
+POST_STORE_PATH = "./data/facebook_posts.db"
+
+
+# Texts of the buttons that expand a truncated post (same list as clickSeeMoreButtons)
+SEE_MORE_LABELS = ("See More", "See more", "عرض المزيد", "المزيد", "عرض كامل")
+
+# Tags and selectors stripped from the page before it reaches the LLM
+EXCLUDED_TAGS = ["script", "style", "svg", "path", "form", "blockquote", "button","img","link","meta"]
+EXCLUDED_SELECTOR = 'form[role=presentation], blockquote, [aria-label*=comment], [aria-label*=Write], [aria-label*=View more], [aria-label*=Learn More], [aria-label*=Subscribe]'
+
+FACEBOOK_EXTRACTION_INSTRUCTION = """
         You are analyzing Facebook posts in MARKDOWN format.
         
         CRITICAL UNDERSTANDING:
@@ -485,16 +263,450 @@ async def facebook_basic_scroll(
           * 2h
           * Reply
         
-        [Next post starts here]
-        ## Telecom Egypt
-        ```
-        Like
-        Comment
-        Share
-        ```
+        [Next post starts here]
+        ## Telecom Egypt
+        ```
+        Like
+        Comment
+        Share
+        ```
+        
+        Return JSON array with all posts in order.
+        """
+
+
+def _build_browser_config(headless, session_dir):
+    """Browser config shared by the batch and streaming scrapers"""
+    return BrowserConfig(
+        headless=headless,
+        user_data_dir=session_dir,
+        use_persistent_context=True,
+        use_managed_browser=True,
+        viewport_width=1366,
+        viewport_height=768,
+        enable_stealth=True,  # Disabled due to import error
+        verbose=True
+    )
+
+
+def _build_setup_script():
+    """C4A script: wait for the feed, install tracking state and the See More clicker"""
+    return """
+    # Wait for page to load
+    WAIT `div[role="main"]` 15
+    
+    # Initialize tracking variables
+    EVAL `
+    window.__CLICKED_BUTTONS__ = new Set();
+    window.__TOTAL_CLICKS__ = 0;
+    window.__SCROLL_STEP__ = 0;
+    console.log('🚀 Starting incremental scroll with See More clicking');
+    `
+    
+    # Telemetry: one record per step, published into a JSON script element the crawler reads back
+    EVAL `
+    window.__TELEMETRY__ = {steps: []};
+    window.__TELEMETRY_START__ = performance.now();
+    
+    // Feed articles, without comment articles and the DOM pruning buffer
+    window.countArticles = function() {
+        let count = 0;
+        for (let article of document.querySelectorAll('div[role="article"]')) {
+            if (article.closest('#__post_buffer__')) continue;
+            if (article.parentElement && article.parentElement.closest('div[role="article"]')) continue;
+            count++;
+        }
+        return count;
+    };
+    
+    // Record of a step (0 = initial pass, 'FINAL' = final pass), created on first use
+    window.stepTelemetry = function(stepNumber) {
+        let record = window.__TELEMETRY__.steps.find(r => r.step === stepNumber);
+        if (!record) {
+            record = {
+                step: stepNumber,
+                started_ms: Math.round(performance.now() - window.__TELEMETRY_START__),
+                scroll_ms: null,
+                scrolled_px: 0,
+                articles_before: window.countArticles(),
+                articles_after: null,
+                buttons_found: 0,
+                buttons_clicked: 0,
+                heap_mb: null
+            };
+            window.__TELEMETRY__.steps.push(record);
+        }
+        return record;
+    };
+    
+    // Close a step's record and publish all records (JS heap only in Chromium)
+    window.publishTelemetry = function(stepNumber) {
+        const record = window.stepTelemetry(stepNumber);
+        record.articles_after = window.countArticles();
+        if (performance.memory) {
+            record.heap_mb = Math.round(performance.memory.usedJSHeapSize / 104857.6) / 10;
+        }
+        let node = document.getElementById('__scroll_telemetry__');
+        if (!node) {
+            node = document.createElement('script');
+            node.id = '__scroll_telemetry__';
+            node.type = 'application/json';
+            document.body.appendChild(node);
+        }
+        node.textContent = JSON.stringify(window.__TELEMETRY__);
+    };
+    `
+    WAIT 5
+    
+    # Function to find and click See More buttons with tracking
+    EVAL `
+    window.clickSeeMoreButtons = function(stepNumber) {
+        const buttons = document.querySelectorAll('div[role="button"]');
+        const seeMoreButtons = [];
+        const telemetry = window.stepTelemetry(stepNumber);
+        let newButtonsClicked = 0;
+        
+        // Find all "See More" buttons
+        for (let btn of buttons) {
+            const text = btn.textContent.trim();
+            if (text.includes('See More') || text.includes('See more') || 
+                text.includes('عرض المزيد') || text.includes('See More') ||
+                text.includes('المزيد') || text.includes('عرض كامل')) {
+                
+                // Create unique identifier for button
+                const rect = btn.getBoundingClientRect();
+                const buttonId = text + '_' + Math.round(rect.top) + '_' + Math.round(rect.left);
+                
+                // Only add if not already clicked
+                if (!window.__CLICKED_BUTTONS__.has(buttonId)) {
+                    seeMoreButtons.push({btn: btn, id: buttonId});
+                }
+            }
+        }
+        
+        telemetry.buttons_found += seeMoreButtons.length;
+        console.log('📍 Step ' + stepNumber + ': Found ' + seeMoreButtons.length + ' new See More buttons');
+        
+        // Click new buttons sequentially with visual feedback
+        seeMoreButtons.forEach((btnData, index) => {
+            setTimeout(() => {
+                try {
+                    const btn = btnData.btn;
+                    const btnId = btnData.id;
+                    
+                    // Check if button is still visible and clickable
+                    const rect = btn.getBoundingClientRect();
+                    if (rect.width > 0 && rect.height > 0) {
+                        // Add visual feedback
+                        btn.style.border = '3px solid orange';
+                        btn.style.backgroundColor = 'lightyellow';
+                        
+                        // Smooth scroll button into view if needed
+                        if (rect.top < 100 || rect.top > window.innerHeight - 100) {
+                            btn.scrollIntoView({behavior: 'smooth', block: 'center', inline: 'nearest'});
+                        }
+                        
+                        setTimeout(() => {
+                            btn.click();
+                            window.__CLICKED_BUTTONS__.add(btnId);
+                            window.__TOTAL_CLICKS__++;
+                            telemetry.buttons_clicked++;
+                            newButtonsClicked++;
+                            
+                            // Change color after successful click
+                            btn.style.border = '3px solid green';
+                            btn.style.backgroundColor = 'lightgreen';
+                            
+                            console.log('✅ Step ' + stepNumber + ': Clicked button ' + (index + 1) + 
+                                       '/' + seeMoreButtons.length + ' (Total: ' + window.__TOTAL_CLICKS__ + ')');
+                        }, 200);
+                        
+                    } else {
+                        console.log('⚠️ Button not visible, skipping');
+                    }
+                } catch(e) {
+                    console.log('❌ Failed to click button: ' + e.message);
+                }
+            }, index * 800); // Much slower clicking (800ms between clicks) for maximum reliability
+        });
+        
+        return seeMoreButtons.length;
+    };
+    `
+    WAIT 2
+    
+    # Initial click on visible buttons before scrolling
+    EVAL `
+    window.__SCROLL_STEP__ = 0;
+    const initialButtons = window.clickSeeMoreButtons(0);
+    console.log('🎯 Initial pass: Processing ' + initialButtons + ' buttons');
+    `
+    WAIT 8
+    
+    EVAL `window.publishTelemetry(0);`
+    """
+
+
+def _build_scroll_step_script(i, scroll_wait):
+    """C4A script for scroll step i (0-based): scroll 400px, then click new See More buttons"""
+    return f"""
+    # === SCROLL STEP {i+1} ===
+    
+    # Smooth scroll down gradually with JavaScript (slower)
+    EVAL `
+    (function() {{
+        const currentY = window.pageYOffset;
+        const targetY = currentY + 400;  // Scroll only 400px at a time (slower)
+        const telemetry = window.stepTelemetry({i+1});
+        const scrollStart = performance.now();
+        let scrollDone = false;
+        const finishScroll = () => {{
+            if (scrollDone) return;
+            scrollDone = true;
+            telemetry.scroll_ms = Math.round(performance.now() - scrollStart);
+            telemetry.scrolled_px = Math.round(window.pageYOffset - currentY);
+        }};
+        
+        console.log('📜 Step {i+1}: Smooth scrolling from ' + currentY + ' to ' + targetY);
+        
+        // Smooth scroll with slower animation; scrollend times it (not fired if the page can't scroll)
+        window.addEventListener('scrollend', finishScroll, {{once: true}});
+        window.scrollTo({{
+            top: targetY,
+            behavior: 'smooth'
+        }});
+        
+        // Mark scroll as complete (longer wait for animation)
+        setTimeout(() => {{
+            finishScroll();
+            console.log('✅ Step {i+1}: Scroll completed at ' + window.pageYOffset);
+        }}, 2000);
+    }})();
+    `
+    WAIT {max(5, scroll_wait + 3)}
+    
+    # Click newly visible "See More" buttons
+    EVAL `
+    window.__SCROLL_STEP__++;
+    const buttonsFound = window.clickSeeMoreButtons(window.__SCROLL_STEP__);
+    console.log('📊 Step ' + window.__SCROLL_STEP__ + ' Summary:');
+    console.log('  - Buttons found: ' + buttonsFound);
+    console.log('  - Total clicked so far: ' + window.__TOTAL_CLICKS__);
+    `
+    WAIT 7
+    
+    EVAL `window.publishTelemetry({i+1});`
+    """
+
+
+def _build_final_script():
+    """C4A script: final See More pass, post count and scroll back to top"""
+    return """
+    # === FINAL COMPREHENSIVE PASS ===
+    
+    # Wait for any loading to complete
+    WAIT 3
+    
+    # Final pass to catch any remaining buttons
+    EVAL `
+    console.log('🔍 Final comprehensive pass...');
+    const finalButtons = window.clickSeeMoreButtons('FINAL');
+    console.log('📊 FINAL STATISTICS:');
+    console.log('  - Final pass buttons: ' + finalButtons);
+    console.log('  - Total buttons clicked: ' + window.__TOTAL_CLICKS__);
+    console.log('  - Unique button IDs tracked: ' + window.__CLICKED_BUTTONS__.size);
+    `
+    WAIT 10
+    
+    # Count total posts for verification
+    EVAL `
+    (function() {
+        const posts = document.querySelectorAll('div[role="article"]');
+        const postsWithContent = document.querySelectorAll('div[role="article"] div[data-ad-preview]');
+        console.log('� POST STATISTICS:');
+        console.log('  - Total posts found: ' + posts.length);
+        console.log('  - Posts with content: ' + postsWithContent.length);
+        console.log('  - See More buttons clicked: ' + window.__TOTAL_CLICKS__);
+        window.__TOTAL_POSTS__ = posts.length;
+        window.publishTelemetry('FINAL');
+    })();
+    `
+    WAIT 2
+    
+    # Scroll back to top for extraction
+    EVAL `
+    (function() {
+        console.log('📜 Scrolling back to top for content extraction...');
+        const currentY = window.pageYOffset;
+        console.log('🔝 Starting from position: ' + currentY);
+        
+        window.scrollTo({ 
+            top: 0, 
+            behavior: 'smooth' 
+        });
+        
+        // Wait for scroll to complete then verify
+        setTimeout(() => {
+            console.log('✅ Scrolled to position: ' + window.pageYOffset);
+        }, 2000);
+    })();
+    `
+    WAIT 6
+    
+    # Final wait for content to stabilize
+    WAIT 3
+    """
+
+
+def _build_prune_setup_script():
+    """C4A script: install the compact post buffer and the capture-and-prune function"""
+    return """
+    # Compact buffer for expanded articles (processed nodes are pruned from the feed).
+    # Copies are kept as HTML strings, not nodes, so the per-step scans of the feed
+    # (See More buttons, articles) don't walk them; renderPostBuffer puts them in the page
+    EVAL `
+    window.__POST_BUFFER__ = [];
+    window.__CAPTURED_POSTS__ = 0;
+    
+    window.renderPostBuffer = function() {
+        let buffer = document.getElementById('__post_buffer__');
+        if (!buffer) {
+            buffer = document.createElement('div');
+            buffer.id = '__post_buffer__';
+            buffer.style.display = 'none';
+            document.body.appendChild(buffer);
+        }
+        buffer.innerHTML = window.__POST_BUFFER__.join('');
+        return buffer;
+    };
+    
+    window.clearPostBuffer = function() {
+        window.__POST_BUFFER__ = [];
+        const buffer = document.getElementById('__post_buffer__');
+        if (buffer) buffer.remove();
+    };
+    
+    window.captureExpandedArticles = function(force) {
+        const keepAttributes = ['role', 'aria-label', 'href', 'dir', 'lang'];
+        const isSeeMore = (text) => text.includes('See More') || text.includes('See more') ||
+            text.includes('عرض المزيد') || text.includes('المزيد') || text.includes('عرض كامل');
+        let captured = 0;
+        
+        for (let article of document.querySelectorAll('div[role="article"]:not([data-scraped])')) {
+            // Skip the buffer itself and comment articles nested inside a post
+            if (article.closest('#__post_buffer__')) continue;
+            if (article.parentElement && article.parentElement.closest('div[role="article"]')) continue;
+            
+            const rect = article.getBoundingClientRect();
+            if (!force) {
+                // Only articles already scrolled into view and fully expanded
+                if (rect.bottom > window.innerHeight) continue;
+                const buttons = article.querySelectorAll('div[role="button"]');
+                if (Array.from(buttons).some(btn => isSeeMore(btn.textContent.trim()))) continue;
+            }
+            
+            // Compact copy: text, links and labels only
+            const copy = article.cloneNode(true);
+            copy.querySelectorAll('script, style, svg, img, picture, video, link, meta').forEach(node => node.remove());
+            for (let el of [copy, ...copy.querySelectorAll('*')]) {
+                for (let attr of Array.from(el.attributes)) {
+                    if (!keepAttributes.includes(attr.name)) el.removeAttribute(attr.name);
+                }
+            }
+            window.__POST_BUFFER__.push(copy.outerHTML);
+            
+            // Empty the original but keep its height so the scroll position doesn't jump
+            article.style.minHeight = Math.round(rect.height) + 'px';
+            article.setAttribute('data-scraped', '1');
+            article.replaceChildren();
+            captured++;
+        }
         
-        Return JSON array with all posts in order.
-        """,
+        window.__CAPTURED_POSTS__ += captured;
+        return captured;
+    };
+    `
+    WAIT 1
+    """
+
+
+def _build_prune_step_script(force=False, render=False):
+    """
+    C4A script: move expanded articles into the buffer and empty them in the
+    feed; with render, put the buffer in the page for the step's HTML
+    """
+    return f"""
+    # Capture expanded articles into the buffer and prune them from the feed
+    EVAL `
+    (function() {{
+        const captured = window.captureExpandedArticles({'true' if force else 'false'});
+        console.log('🧹 Captured and pruned ' + captured + ' articles (total: ' + window.__CAPTURED_POSTS__ + ')');
+        {'window.renderPostBuffer();' if render else ''}
+    }})();
+    `
+    WAIT 1
+    """
+
+
+def _build_prune_clear_script():
+    """C4A script: empty the post buffer once its articles have been read"""
+    return """
+    EVAL `window.clearPostBuffer();`
+    """
+
+
+def _build_prune_final_script():
+    """C4A script: capture the remaining articles and make the buffer the page content"""
+    return """
+    # Capture whatever is left and expose the buffer for extraction
+    EVAL `
+    (function() {
+        window.captureExpandedArticles(true);
+        window.renderPostBuffer().style.display = 'block';
+        window.__TOTAL_POSTS__ = window.__POST_BUFFER__.length;
+        console.log('📦 Post buffer holds ' + window.__TOTAL_POSTS__ + ' articles');
+    })();
+    `
+    WAIT 1
+    """
+
+
+def _build_model_strategy(provider):
+    """
+    LLM extraction strategy for the FacebookPosts schema on one provider. The
+    instruction and schema are sent as a cached prefix ahead of the page
+    markdown, so only the first call of a cache window pays for them in full.
+    """
+    
+    # Load API key from environment variable
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY not found in environment variables. Please create a .env file.")
+    
+    # DeepSeek - More reliable for structured extraction
+    # llm_config = LLMConfig(
+    #     provider="deepseek/deepseek-chat",
+    #     api_token=os.getenv("DEEPSEEK_API_KEY")
+    # )
+    
+    llm_config = LLMConfig(
+        provider=provider,
+        api_token=api_key
+    )
+
+    # llm_config = LLMConfig(
+    #     provider="groq/llama-3.3-70b-versatile",
+    #     api_token=os.getenv("GROQ_API_KEY")
+    # )
+    extraction_strategy = CachedPrefixExtractionStrategy(
+        llm_config=llm_config,
+        schema=FacebookPosts.model_json_schema(),
+        extraction_type="schema",
+        input_format="markdown",  # Use markdown - has timestamps at the end
+        instruction=FACEBOOK_EXTRACTION_INSTRUCTION,
         apply_chunking=False,  # Disable - we're using CSS selector to filter posts
         verbose=True,
         extra_args={
@@ -503,38 +715,350 @@ async def facebook_basic_scroll(
         # ✅ Use cleaned HTML (default behavior, but explicit is better)
         # The css_selector in CrawlerRunConfig will pre-filter the HTML
     )
+    return extraction_strategy
+
+
+def _build_extraction_strategy():
+    """Default extraction: FACEBOOK_MODEL_TIERS behind a TieredPostExtractionStrategy"""
+    return TieredPostExtractionStrategy(
+        [(provider.split("/")[-1], _build_model_strategy(provider)) for provider in FACEBOOK_MODEL_TIERS]
+    )
+
+
+def validate_extracted_posts(blocks, expected_posts=None):
+    """
+    Problems with the blocks an LLM extraction returned (empty if they are
+    fine): error blocks, posts that don't match the FacebookPost schema or
+    have no text, and, when the number of articles sent is known, fewer
+    posts than MIN_POST_RATIO of them.
+    """
+    problems = []
+    posts = 0
+    for block in blocks:
+        if not isinstance(block, dict):
+            problems.append(f"block is not an object: {str(block)[:80]}")
+            continue
+        if block.get("error"):
+            problems.append(f"LLM error: {str(block.get('content'))[:120]}")
+            continue
+        for item in block.get("posts", [block]):
+            item_problems = schema_problems(FacebookPost, item)
+            if not item_problems and not str(item.get("content") or "").strip():
+                item_problems = ["content: empty"]
+            problems += [f"post {posts}: {problem}" for problem in item_problems]
+            posts += 1
+    if expected_posts is not None and posts < math.ceil(expected_posts * MIN_POST_RATIO):
+        problems.append(f"{posts} posts for {expected_posts} articles")
+    return problems
+
+
+class TieredPostExtractionStrategy(ExtractionStrategy):
+    """
+    Runs the extraction on the first (cheapest) tier and re-runs it on the
+    next tier only when validate_extracted_posts rejects the result. Tiers
+    are (name, extraction strategy) pairs sharing one input format. Token
+    usage is the sum over all tiers, so llm_usage() and llm_cached_tokens()
+    work unchanged; router.report() has the per-tier success and latency.
+
+    crawl4ai calls arun(url, sections) without an article count; the
+    scraper calls it with expected_posts so the count check applies too.
+    """
+
+    def __init__(self, tiers):
+        tiers = list(tiers)
+        super().__init__(input_format=tiers[0][1].input_format)
+        self.tiers = tiers
+        self.router = ModelRouter(tiers, validate_extracted_posts)
+
+    def extract(self, url, html, *q, **kwargs):
+        return self.run(url, [html])
+
+    def run(self, url, sections, *q, expected_posts=None, **kwargs):
+        blocks, _, _ = self.router.run(lambda strategy: strategy.run(url, sections), expected_posts=expected_posts)
+        return blocks
+
+    async def arun(self, url, sections, *q, expected_posts=None, **kwargs):
+        blocks, _, _ = await self.router.arun(lambda strategy: strategy.arun(url, sections),
+                                              expected_posts=expected_posts)
+        return blocks
+
+    @property
+    def usages(self):
+        return [usage for _, strategy in self.tiers for usage in getattr(strategy, "usages", None) or []]
+
+    @property
+    def total_usage(self):
+        total = TokenUsage()
+        for _, strategy in self.tiers:
+            usage = getattr(strategy, "total_usage", None)
+            if usage is not None:
+                total.prompt_tokens += usage.prompt_tokens
+                total.completion_tokens += usage.completion_tokens
+                total.total_tokens += usage.total_tokens
+        return total
+
+    def prefix_cache_report(self):
+        """CachedPrefixExtractionStrategy.prefix_cache_report() of every tier that was called"""
+        return {
+            name: strategy.prefix_cache_report() for name, strategy in self.tiers
+            if isinstance(strategy, CachedPrefixExtractionStrategy) and strategy.usages
+        }
+
+
+def _print_prefix_cache_report(report, label=None):
+    """Console summary of CachedPrefixExtractionStrategy.prefix_cache_report()"""
+    print(f"\n   🪙 Prompt prefix{f' ({label})' if label else ''}: {report['prefix_tokens']:,} tokens x {report['calls']} call(s)"
+          f" ({'explicit cache' if report['explicit_cache'] else 'implicit caching'})")
+    print(f"      • Cached by the provider: {report['cached_tokens']:,} of {report['prompt_tokens']:,} prompt tokens"
+          f" ({report['saved_share'] * 100:.1f}% of the prefix)")
+
+
+def _report_extraction(extraction_strategy, metrics=None):
+    """Print the prefix cache and model routing reports of the extraction strategy, and add them to metrics"""
+    reports = {}
+    if isinstance(extraction_strategy, TieredPostExtractionStrategy):
+        reports["prefix_cache"] = extraction_strategy.prefix_cache_report()
+        for name, report in reports["prefix_cache"].items():
+            _print_prefix_cache_report(report, name)
+        reports["model_routing"] = extraction_strategy.router.report()
+        print_routing_report(reports["model_routing"])
+    elif isinstance(extraction_strategy, CachedPrefixExtractionStrategy):
+        reports["prefix_cache"] = extraction_strategy.prefix_cache_report()
+        _print_prefix_cache_report(reports["prefix_cache"])
+    if metrics is not None:
+        metrics.update(reports)
+
+
+def _result_metrics(result, extracted_content):
+    """Size metrics of a crawl, small enough to keep after the result is dropped"""
+    markdown_obj = getattr(result, 'markdown', None)
+    raw_markdown = (getattr(markdown_obj, 'raw_markdown', None) or str(markdown_obj)) if markdown_obj else ''
+    return {
+        "full_html_chars": len(getattr(result, 'html', '') or ''),
+        "cleaned_html_chars": len(getattr(result, 'cleaned_html', '') or ''),
+        "markdown_chars": len(raw_markdown),
+        "extracted_chars": len(extracted_content or ''),
+        "posts": 0
+    }
+
+
+def _scroll_telemetry(html):
+    """
+    Per-step telemetry the scroll script published into the page: scroll
+    duration, new feed articles, See More buttons found and clicked and JS
+    heap size. Steps with no new articles are listed as stalled; their waits
+    were spent on a feed that didn't load anything.
+    Returns None if the page holds no telemetry.
+    """
+    match = TELEMETRY_PATTERN.search(html or "")
+    if not match:
+        return None
+    try:
+        records = json.loads(match.group(1))["steps"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    steps = []
+    for i, record in enumerate(records):
+        before, after = record.get("articles_before"), record.get("articles_after")
+        # A step lasts until the next one starts; the last one has no end in the page
+        next_start = records[i + 1].get("started_ms") if i + 1 < len(records) else None
+        steps.append({
+            "step": record.get("step"),
+            "duration_s": round((next_start - record["started_ms"]) / 1000, 2) if next_start is not None else None,
+            "scroll_ms": record.get("scroll_ms"),
+            "scrolled_px": record.get("scrolled_px"),
+            "new_articles": after - before if before is not None and after is not None else None,
+            "articles": after,
+            "buttons_found": record.get("buttons_found", 0),
+            "buttons_clicked": record.get("buttons_clicked", 0),
+            "heap_mb": record.get("heap_mb"),
+        })
+
+    heaps = [step["heap_mb"] for step in steps if step["heap_mb"] is not None]
+    return {
+        "steps": steps,
+        # Only scroll steps are expected to load articles
+        "stalled_steps": [step["step"] for step in steps
+                          if isinstance(step["step"], int) and step["step"] > 0 and step["new_articles"] == 0],
+        "buttons_found": sum(step["buttons_found"] for step in steps),
+        "buttons_clicked": sum(step["buttons_clicked"] for step in steps),
+        "max_heap_mb": max(heaps) if heaps else None,
+    }
+
+
+def _print_scroll_telemetry(telemetry):
+    """Console table of _scroll_telemetry()"""
+    print(f"\n   📈 Scroll telemetry:")
+    print(f"      {'step':>5} {'time (s)':>9} {'scroll (ms)':>12} {'new posts':>10} {'See More':>9} {'heap (MB)':>10}")
+    for step in telemetry["steps"]:
+        duration = f"{step['duration_s']:.1f}" if step["duration_s"] is not None else "-"
+        scroll = step["scroll_ms"] if step["scroll_ms"] is not None else "-"
+        heap = f"{step['heap_mb']:.1f}" if step["heap_mb"] is not None else "-"
+        print(f"      {step['step']!s:>5} {duration:>9} {scroll!s:>12} {step['new_articles']!s:>10}"
+              f" {step['buttons_clicked']:>4}/{step['buttons_found']:<4} {heap:>10}")
+    if telemetry["stalled_steps"]:
+        print(f"      ⚠️  No new posts after step(s) {', '.join(map(str, telemetry['stalled_steps']))}")
+
+
+def _save_debug_artifacts(result, debug_dir):
+    """
+    Write each debug artifact of a crawl once, gzip-compressed, into a new
+    per-run directory under debug_dir. Markdown variants identical to the raw
+    markdown are skipped. Returns the run directory.
+    """
+    run_dir = os.path.join(debug_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+    os.makedirs(run_dir, exist_ok=True)
+    print(f"\n   💾 Saving debug artifacts to {run_dir}/ ...")
+    
+    artifacts = [
+        ("full_html.html.gz", getattr(result, 'html', '')),
+        ("cleaned_html.html.gz", getattr(result, 'cleaned_html', '')),
+    ]
     
-    # Configure crawler with LLM extraction
+    markdown_obj = getattr(result, 'markdown', None)
+    if markdown_obj:
+        raw_markdown = getattr(markdown_obj, 'raw_markdown', None) or str(markdown_obj)
+        artifacts.append(("raw_markdown.md.gz", raw_markdown))
+        for file_name, attr in (("markdown_citations.md.gz", "markdown_with_citations"),
+                                ("fit_markdown.md.gz", "fit_markdown")):
+            text = getattr(markdown_obj, attr, '')
+            if text and text != raw_markdown:
+                artifacts.append((file_name, text))
+    
+    for file_name, text in artifacts:
+        if not text:
+            continue
+        path = os.path.join(run_dir, file_name)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+        print(f"      ✅ Saved: {file_name} ({len(text):,} chars → {os.path.getsize(path):,} bytes)")
+    
+    return run_dir
+
+
+async def facebook_basic_scroll(
+    page_url="https://www.facebook.com/Telecomegypt",
+    scroll_count=5,
+    scroll_wait=3,
+    headless=False,
+    session_dir="./facebook_session_c4a",
+    session_id="facebook_c4a_session",
+    save_debug_files=True,
+    lean_result=False,
+    debug_dir="./debug",
+    prune_dom=False,
+    extraction_strategy=None,
+    metrics_path=METRICS_PATH,
+    capture_feed=False,
+    feed_record_path=None
+):
+    """
+    Simple script: Navigate to Facebook and scroll
+    
+    Args:
+        page_url: Facebook page URL to scrape
+        scroll_count: Number of times to scroll
+        scroll_wait: Seconds to wait between scrolls
+        headless: Run browser in headless mode
+        session_dir: Directory for browser session data
+        session_id: Session identifier
+        save_debug_files: Whether to save debug HTML/markdown files (default: True)
+        lean_result: Return only the extracted posts and metrics, without the
+            crawl4ai CrawlResult (raw HTML, cleaned HTML, markdown)
+        debug_dir: Base directory for debug files; each run gets its own
+            timestamped sub-directory of gzip-compressed artifacts
+        prune_dom: Capture each expanded article into a compact in-page buffer
+            and empty it in the feed, so per-step cost and tab memory stay flat
+            on long scrolls; extraction then reads only the buffer
+        extraction_strategy: crawl4ai extraction strategy to use instead of the
+            Gemini one (e.g. an offline strategy for benchmarks)
+        metrics_path: JSONL file the run's stage metrics are appended to
+        capture_feed: Decode the posts from the GraphQL responses the feed is
+            loaded with; only articles no decoded post covers go to the LLM
+        feed_record_path: JSONL file the captured responses are appended to
+            (a fixture for facebook_feed_capture.replay_fixture)
+    """
+    
+    print(f"\n🔍 Facebook Basic Navigator")
+    print("=" * 60)
+    print(f"📍 URL: {page_url}")
+    print(f"📜 Scrolls: {scroll_count}")
+    print("=" * 60)
+    
+    # Configure browser
+    browser_config = _build_browser_config(headless, session_dir)
+    
+    # Incremental scroll script with button clicking at each step
+    scroll_script = _build_setup_script()
+    if prune_dom:
+        scroll_script += _build_prune_setup_script()
+    
+    # Generate incremental scroll steps with button clicking
+    for i in range(scroll_count):
+        scroll_script += _build_scroll_step_script(i, scroll_wait)
+        if prune_dom:
+            scroll_script += _build_prune_step_script()
+    
+    # Final comprehensive pass and cleanup
+    scroll_script += _build_final_script()
+    if prune_dom:
+        scroll_script += _build_prune_final_script()
+    
+    # Configure LLM extraction (runs after the crawl; with feed capture only as a fallback)
+    feed_capture = FeedCapture(record_path=feed_record_path) if capture_feed else None
+    if not capture_feed:
+        print(f"\n🤖 Setting up LLM extraction...")
+        extraction_strategy = extraction_strategy or _build_extraction_strategy()
+    
+    # Configure crawler (scrolling, expanding and content filtering)
     crawler_config = CrawlerRunConfig(
         page_timeout=90000,
         wait_until="domcontentloaded",
         c4a_script=scroll_script,
-        extraction_strategy=extraction_strategy,
+        # Extraction runs after the crawl, once the number of articles is known
+        extraction_strategy=None,
         session_id=session_id,
         cache_mode=CacheMode.BYPASS,
         verbose=False,
         # ✅ CRITICAL: Extract only post containers to keep structure
         # Facebook uses data-ad-rendering-role="story_message" for post content
         # ✅ REDUCE HTML SIZE - Remove unnecessary tags (NOT 'a' - has timestamps!)
-        excluded_tags=["script", "style", "svg", "path", "form", "blockquote", "button","img","link","meta"],
+        excluded_tags=EXCLUDED_TAGS,
         exclude_external_links=False,  # Keep links - timestamps are in <a> tags!
         # ✅ Remove comment sections and repetitive elements
-        excluded_selector='form[role=presentation], blockquote, [aria-label*=comment], [aria-label*=Write], [aria-label*=View more], [aria-label*=Learn More], [aria-label*=Subscribe]',
+        excluded_selector=EXCLUDED_SELECTOR,
+        # With DOM pruning the expanded posts live only in the compact buffer
+        css_selector="#__post_buffer__" if prune_dom else None,
     )
     
+    # Stage timings, sizes and token usage, appended to data/metrics/pipeline_metrics.jsonl
+    run_metrics = RunMetrics("facebook", page_url)
+    
     # Start crawling
     async with AsyncWebCrawler(config=browser_config) as crawler:
+        if feed_capture:
+            feed_capture.attach(crawler)
         
         print(f"\n🚀 Opening page...")
         
         try:
-            result = await crawler.arun(
-                url=page_url,
-                session_id=session_id,
-                config=crawler_config
-            )
+            # Scrolling and clicking happen inside arun; the LLM call is timed as its own stage
+            extracted_content, extract_stage = None, None
+            with run_metrics.stage("crawl") as crawl_stage:
+                result = await crawler.arun(
+                    url=page_url,
+                    session_id=session_id,
+                    config=crawler_config
+                )
+                current_url = getattr(result, "url", "")
+                telemetry = _scroll_telemetry(result.html)
+                articles = [str(article) for article in
+                            _top_level_articles(_post_buffer_html(result.html) if prune_dom else result.html)]
+            if not feed_capture and "login" not in current_url.lower():
+                with run_metrics.stage("extract") as extract_stage:
+                    extracted_content = await _run_extraction(result, extraction_strategy, articles, current_url)
             
-            current_url = getattr(result, "url", "")
             
             # Check if session expired
             if "login" in current_url.lower():
@@ -548,95 +1072,93 @@ async def facebook_basic_scroll(
             # Extract structured data with LLM
             print(f"\n🤖 Extracting structured data with LLM...")
             
+            if feed_capture:
+                # Posts decoded from the feed responses; articles none of them covers go to the LLM
+                with run_metrics.stage("decode_feed") as decode_stage:
+                    await feed_capture.settle()
+                    posts = _posts_from_extracted_data({"posts": feed_capture.decoder.drain(final=True)})
+                    missing = uncovered_articles(articles, feed_capture.decoder.contents())
+                    decode_stage.update(posts=len(posts), articles=len(articles), llm_fallback_articles=len(missing))
+                print(f"   📡 Decoded {len(posts)} posts from {feed_capture.decoder.stats['responses']} feed responses")
+                if missing:
+                    print(f"   🤖 {len(missing)} article(s) not in the feed responses, extracting them with the LLM...")
+                    extraction_strategy = extraction_strategy or _build_extraction_strategy()
+                    with run_metrics.stage("extract") as extract_stage:
+                        posts += await _extract_posts_from_articles(crawler, missing, extraction_strategy)
+                extracted_content = json.dumps({"posts": [post.model_dump() for post in posts]},
+                                               ensure_ascii=False) if posts else None
+            
+            # Size metrics are kept in every mode, the CrawlResult only when not lean
+            metrics = _result_metrics(result, extracted_content)
+            if feed_capture:
+                metrics["feed_capture"] = {**feed_capture.decoder.stats, "decoded_posts": decode_stage["posts"],
+                                           "llm_fallback_articles": len(missing)}
+            metrics["run_id"] = run_metrics.run_id
+            if telemetry:
+                metrics["scroll_telemetry"] = telemetry
+                crawl_stage.update(
+                    stalled_steps=len(telemetry["stalled_steps"]),
+                    see_more_clicks=telemetry["buttons_clicked"],
+                    max_heap_mb=telemetry["max_heap_mb"]
+                )
+                _print_scroll_telemetry(telemetry)
+            crawl_stage.update(
+                html_chars_before=metrics["full_html_chars"],
+                html_chars_after=metrics["cleaned_html_chars"],
+                markdown_chars=metrics["markdown_chars"],
+                cache_hits=1 if str(getattr(result, "cache_status", "") or "").startswith("hit") else 0
+            )
+            if extract_stage is not None:
+                prompt_tokens, completion_tokens = llm_usage(extraction_strategy)
+                extract_stage.update(
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens,
+                    cached_prompt_tokens=llm_cached_tokens(extraction_strategy)
+                )
+            _report_extraction(extraction_strategy, metrics)
+            
             # ========================================
             # SAVE ALL FORMATS FOR DEBUGGING (OPTIONAL)
             # ========================================
+            run_dir = None
             if save_debug_files:
-                print(f"\n   💾 Saving all formats for analysis...")
-                
-                # 1. Full Raw HTML
-                full_html = getattr(result, 'html', '')
-                with open("debug_1_full_html.html", "w", encoding="utf-8") as f:
-                    f.write(full_html)
-                print(f"      ✅ Saved: debug_1_full_html.html ({len(full_html):,} chars)")
-                
-                # 2. Cleaned HTML (what gets processed)
-                cleaned_html = getattr(result, 'cleaned_html', '')
-                with open("debug_2_cleaned_html.html", "w", encoding="utf-8") as f:
-                    f.write(cleaned_html)
-                print(f"      ✅ Saved: debug_2_cleaned_html.html ({len(cleaned_html):,} chars)")
-                
-                # 2b. Save EXACTLY what the LLM receives as input
-                with open("debug_2b_LLM_EXACT_INPUT.html", "w", encoding="utf-8") as f:
-                    f.write("<!-- THIS IS THE EXACT HTML SENT TO THE LLM FOR EXTRACTION -->\n")
-                    f.write("<!-- File: debug_2_cleaned_html.html (same content) -->\n")
-                    f.write("<!-- The LLM uses this HTML + your instruction to extract data -->\n\n")
-                    f.write(cleaned_html)
-                print(f"      ⭐ Saved: debug_2b_LLM_EXACT_INPUT.html (EXACT LLM INPUT)")
-                
-                # 3. Markdown output (if available)
-                markdown_obj = getattr(result, 'markdown', None)
-                if markdown_obj:
-                    # Raw markdown
-                    raw_markdown = getattr(markdown_obj, 'raw_markdown', None) or str(markdown_obj)
-                    with open("debug_3_raw_markdown.md", "w", encoding="utf-8") as f:
-                        f.write(raw_markdown)
-                    print(f"      ✅ Saved: debug_3_raw_markdown.md ({len(raw_markdown):,} chars)")
-                    
-                    # Markdown with citations (if available)
-                    markdown_with_citations = getattr(markdown_obj, 'markdown_with_citations', '')
-                    if markdown_with_citations:
-                        with open("debug_3b_markdown_citations.md", "w", encoding="utf-8") as f:
-                            f.write(markdown_with_citations)
-                        print(f"      ✅ Saved: debug_3b_markdown_citations.md ({len(markdown_with_citations):,} chars)")
-                    
-                    # Fit markdown (filtered, if available)
-                    fit_markdown = getattr(markdown_obj, 'fit_markdown', '')
-                    if fit_markdown:
-                        with open("debug_3c_fit_markdown.md", "w", encoding="utf-8") as f:
-                            f.write(fit_markdown)
-                        print(f"      ✅ Saved: debug_3c_fit_markdown.md ({len(fit_markdown):,} chars)")
+                with run_metrics.stage("save_debug_files"):
+                    run_dir = _save_debug_artifacts(result, debug_dir)
                 
                 # Show HTML size reduction analysis
-                full_html_size = len(getattr(result, 'html', ''))
-                cleaned_html_size = len(getattr(result, 'cleaned_html', ''))
                 print(f"\n   📊 HTML Size Analysis:")
-                print(f"      • Full HTML: {full_html_size:,} chars")
-                print(f"      • Cleaned HTML (sent to LLM): {cleaned_html_size:,} chars")
-                if full_html_size > 0:
-                    reduction = 100 - (cleaned_html_size/full_html_size*100)
+                print(f"      • Full HTML: {metrics['full_html_chars']:,} chars")
+                print(f"      • Cleaned HTML (sent to LLM): {metrics['cleaned_html_chars']:,} chars")
+                if metrics['full_html_chars'] > 0:
+                    reduction = 100 - (metrics['cleaned_html_chars']/metrics['full_html_chars']*100)
                     print(f"      • Size reduction: {reduction:.1f}%")
             
+            if lean_result:
+                # Drop the raw HTML, cleaned HTML and markdown variants right away
+                result = None
+            
             # 4. Extracted content (LLM output)
-            extracted_content = getattr(result, 'extracted_content', None)
             if extracted_content:
                 # Parse the JSON response
                 extracted_data = json.loads(extracted_content)
+                metrics["posts"] = len(_parse_extracted_posts(extracted_content))
                 
                 print(f"\n   ✅ LLM returned data!")
                 print(f"   📝 Type: {type(extracted_data)}")
                 
                 # Save debug files only if requested
-                if save_debug_files:
-                    # Save raw LLM extraction response
-                    with open("extracted_raw_data.json", "w", encoding="utf-8") as f:
-                        f.write(extracted_content)
-                    print(f"      ✅ Saved: extracted_raw_data.json ({len(extracted_content):,} chars)")
-                    
-                    # Save formatted/parsed response
-                    output_file = "facebook_posts_extracted.json"
-                    with open(output_file, 'w', encoding='utf-8') as f:
+                if run_dir:
+                    output_file = os.path.join(run_dir, "facebook_posts_extracted.json.gz")
+                    with gzip.open(output_file, "wt", encoding="utf-8") as f:
                         json.dump(extracted_data, f, ensure_ascii=False, indent=2)
                     print(f"      ✅ Saved: {output_file} (formatted)")
                     
-                    print(f"\n✅ SUCCESS! All debug files saved!")
-                    print(f"\n   📁 Debug files created:")
-                    print(f"      1. debug_1_full_html.html          - Complete page HTML")
-                    print(f"      2. debug_2_cleaned_html.html       - Cleaned & filtered HTML")
-                    print(f"      ⭐ debug_2b_LLM_EXACT_INPUT.html   - EXACT INPUT TO LLM ⭐")
-                    print(f"      3. debug_3_raw_markdown.md         - Markdown conversion")
-                    print(f"      4. extracted_raw_data.json         - LLM raw output")
-                    print(f"      5. {output_file}         - Final formatted result")
+                    print(f"\n✅ SUCCESS! All debug files saved to {run_dir}/")
+                    print(f"\n   📁 Debug files created (gzip-compressed):")
+                    print(f"      1. full_html.html.gz                - Complete page HTML")
+                    print(f"      2. cleaned_html.html.gz             - Cleaned & filtered HTML")
+                    print(f"      3. raw_markdown.md.gz               - Markdown conversion")
+                    print(f"      4. facebook_posts_extracted.json.gz - Final formatted result")
                 else:
                     output_file = None
                     print(f"   ℹ️  Debug files disabled (save_debug_files=False)")
@@ -647,22 +1169,28 @@ async def facebook_basic_scroll(
                     preview = json.dumps(extracted_data, ensure_ascii=False, indent=2)[:500]
                     print(preview)
                 
-                return {
+                response = {
                     "success": True,
                     "url": current_url,
                     "extracted_data": extracted_data,
                     "output_file": output_file,
-                    "result": result
+                    "debug_dir": run_dir,
+                    "metrics": metrics
                 }
             else:
                 print(f"⚠️  No content extracted by LLM")
-                return {
+                response = {
                     "success": False,
                     "error": "No content extracted",
                     "url": current_url,
-                    "result": result
+                    "debug_dir": run_dir,
+                    "metrics": metrics
                 }
             
+            if not lean_result:
+                response["result"] = result
+            return response
+            
         except Exception as e:
             print(f"❌ Error: {e}")
             import traceback
@@ -672,18 +1200,303 @@ async def facebook_basic_scroll(
                 "success": False,
                 "error": str(e)
             }
+        
+        finally:
+            run_metrics.export_jsonl(metrics_path)
+            print(f"\n📊 Stage timings:")
+            print(run_metrics.summary())
+
+
+def _top_level_articles(html):
+    """Yield feed articles, skipping comment articles nested inside a post"""
+    soup = BeautifulSoup(html, "lxml")
+    for article in soup.select('div[role="article"]'):
+        if article.find_parent("div", attrs={"role": "article"}) is None:
+            yield article
+
+
+def _article_key(article):
+    """Stable identifier for an article, based on the start of its text"""
+    text = " ".join(article.get_text(" ").split())
+    return hashlib.sha1(text[:200].encode("utf-8")).hexdigest()
+
+
+def _is_expanded(article):
+    """True when the article has no "See More" button left to click"""
+    for button in article.select('div[role="button"]'):
+        text = button.get_text(strip=True)
+        if any(label in text for label in SEE_MORE_LABELS):
+            return False
+    return True
+
+
+def _collect_new_articles(html, seen_keys, final=False):
+    """
+    Return the HTML of articles that are fully expanded and not yet emitted.
+    On the final pass, articles that still show a "See More" button are
+    emitted as well, so nothing that was loaded is lost.
+    """
+    new_articles = []
+    for article in _top_level_articles(html):
+        if not final and not _is_expanded(article):
+            continue
+        key = _article_key(article)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        new_articles.append(str(article))
+    return new_articles
+
+
+def _post_buffer_html(html):
+    """Inner HTML of the in-page post buffer used by DOM pruning"""
+    buffer = BeautifulSoup(html, "lxml").select_one("#__post_buffer__")
+    return buffer.decode_contents() if buffer else ""
+
+
+def _parse_extracted_posts(extracted_content):
+    """Turn crawl4ai's extracted_content JSON into FacebookPost objects"""
+    return _posts_from_extracted_data(json.loads(extracted_content))
+
+
+def _posts_from_extracted_data(data):
+    """FacebookPost objects from already parsed extracted_content"""
+    blocks = data if isinstance(data, list) else [data]
+
+    posts = []
+    for block in blocks:
+        if not isinstance(block, dict) or block.get("error"):
+            continue
+        # Schema extraction returns either {"posts": [...]} blocks or the posts themselves
+        for item in block.get("posts", [block]):
+            try:
+                posts.append(FacebookPost.model_validate(item))
+            except ValidationError:
+                continue
+    return posts
+
+
+def _extraction_input(result, input_format):
+    """The content crawl4ai hands an extraction strategy with this input_format (markdown by default)"""
+    markdown_obj = getattr(result, "markdown", None)
+    return {
+        "html": getattr(result, "html", None),
+        "cleaned_html": getattr(result, "cleaned_html", None),
+        "fit_html": getattr(result, "fit_html", None),
+        "fit_markdown": getattr(markdown_obj, "fit_markdown", None),
+    }.get(input_format) or getattr(markdown_obj, "raw_markdown", None) or ""
+
+
+async def _run_extraction(result, extraction_strategy, articles_html, url):
+    """
+    Run the extraction strategy on a crawl result the way crawl4ai does at
+    the end of arun. A TieredPostExtractionStrategy is also given the number
+    of articles with text, to check the post count against.
+    Returns the blocks as JSON, like CrawlResult.extracted_content.
+    """
+    sections = [_extraction_input(result, extraction_strategy.input_format)]
+    if isinstance(extraction_strategy, TieredPostExtractionStrategy):
+        expected_posts = len(uncovered_articles(articles_html, [], min_chars=MIN_ARTICLE_CHARS))
+        blocks = await extraction_strategy.arun(url, sections, expected_posts=expected_posts)
+    else:
+        blocks = await extraction_strategy.arun(url, sections)
+    return json.dumps(blocks, indent=4, default=str, ensure_ascii=False)
+
+
+async def _extract_posts_from_articles(crawler, articles_html, extraction_strategy):
+    """Run the extraction strategy on a batch of article HTML snippets"""
+    html = '<div role="main">' + "".join(articles_html) + "</div>"
+    result = await crawler.arun(
+        url="raw:" + html,
+        config=CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            verbose=False,
+            excluded_tags=EXCLUDED_TAGS,
+            exclude_external_links=False,
+            excluded_selector=EXCLUDED_SELECTOR,
+        )
+    )
+    extracted_content = await _run_extraction(result, extraction_strategy, articles_html, "Raw HTML")
+    return _parse_extracted_posts(extracted_content)
+
+
+async def facebook_stream_posts(
+    page_url="https://www.facebook.com/Telecomegypt",
+    scroll_count=5,
+    scroll_wait=3,
+    headless=False,
+    session_dir="./facebook_session_c4a",
+    session_id="facebook_c4a_session",
+    jsonl_path=None,
+    prune_dom=False,
+    extraction_strategy=None,
+    metrics_path=METRICS_PATH,
+    capture_feed=False,
+    feed_record_path=None
+):
+    """
+    Streaming variant of facebook_basic_scroll: an async generator that yields
+    each FacebookPost as soon as its article is expanded and extracted.
+    
+    The page is driven step by step in one browser session. After every scroll
+    step the newly expanded articles are sent to the LLM on their own, so the
+    first posts arrive after the first step instead of after the whole scroll,
+    and only the keys of already emitted articles are kept in memory.
+    
+    Args:
+        page_url: Facebook page URL to scrape
+        scroll_count: Number of times to scroll
+        scroll_wait: Seconds to wait between scrolls
+        headless: Run browser in headless mode
+        session_dir: Directory for browser session data
+        session_id: Session identifier
+        jsonl_path: Optional JSONL file each post is appended to as it is yielded
+        prune_dom: Capture expanded articles into a compact in-page buffer and
+            empty them in the feed (see facebook_basic_scroll)
+        extraction_strategy: crawl4ai extraction strategy to use instead of the
+            Gemini one
+        metrics_path: JSONL file the run's stage metrics are appended to
+        capture_feed: Yield the posts decoded from the feed's GraphQL responses
+            after each step; only articles none of them covers go to the LLM
+        feed_record_path: JSONL file the captured responses are appended to
+    
+    Usage:
+        async for post in facebook_stream_posts(page_url, jsonl_path="./data/posts.jsonl"):
+            print(post.content)
+    """
+    
+    print(f"\n🔍 Facebook Streaming Navigator")
+    print("=" * 60)
+    print(f"📍 URL: {page_url}")
+    print(f"📜 Scrolls: {scroll_count}")
+    print("=" * 60)
+    
+    browser_config = _build_browser_config(headless, session_dir)
+    feed_capture = FeedCapture(record_path=feed_record_path) if capture_feed else None
+    if not capture_feed:
+        extraction_strategy = extraction_strategy or _build_extraction_strategy()
+    
+    # One script per step: setup, each scroll step, then the final pass
+    step_scripts = [_build_setup_script()]
+    step_scripts += [_build_scroll_step_script(i, scroll_wait) for i in range(scroll_count)]
+    step_scripts.append(_build_final_script())
+    
+    if prune_dom:
+        # Each step empties the buffer read after the previous step, then refills it
+        step_scripts[0] += _build_prune_setup_script() + _build_prune_step_script(render=True)
+        for i in range(1, len(step_scripts) - 1):
+            step_scripts[i] = _build_prune_clear_script() + step_scripts[i] + _build_prune_step_script(render=True)
+        step_scripts[-1] = (_build_prune_clear_script() + step_scripts[-1]
+                            + _build_prune_step_script(force=True, render=True))
+    
+    seen_keys = set()
+    jsonl_file = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+    run_metrics = RunMetrics("facebook_stream", page_url)
+    
+    try:
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            if feed_capture:
+                feed_capture.attach(crawler)
+            
+            print(f"\n🚀 Opening page...")
+            
+            for step, script in enumerate(step_scripts):
+                is_first = step == 0
+                is_final = step == len(step_scripts) - 1
+                
+                # The first step navigates, later steps run in the already open page
+                step_config = CrawlerRunConfig(
+                    page_timeout=90000,
+                    wait_until="domcontentloaded",
+                    c4a_script=script,
+                    session_id=session_id,
+                    js_only=not is_first,
+                    cache_mode=CacheMode.BYPASS,
+                    verbose=False,
+                )
+                with run_metrics.stage(f"scroll_step_{step}") as step_stage:
+                    result = await crawler.arun(url=page_url, session_id=session_id, config=step_config)
+                
+                if is_first and "login" in getattr(result, "url", "").lower():
+                    print("❌ Redirected to login - session expired!")
+                    print("💡 Run: python facebook_c4a_login.py")
+                    raise RuntimeError("Session expired")
+                
+                html = getattr(result, "html", "")
+                telemetry = _scroll_telemetry(html)
+                if telemetry and telemetry["steps"]:
+                    # The record this step's script just closed
+                    step_telemetry = telemetry["steps"][-1]
+                    step_stage.update(
+                        scroll_ms=step_telemetry["scroll_ms"],
+                        page_new_articles=step_telemetry["new_articles"],
+                        buttons_found=step_telemetry["buttons_found"],
+                        buttons_clicked=step_telemetry["buttons_clicked"],
+                        heap_mb=step_telemetry["heap_mb"]
+                    )
+                if prune_dom:
+                    # Buffered articles were already checked for expansion in the page
+                    new_articles = _collect_new_articles(_post_buffer_html(html), seen_keys, final=True)
+                else:
+                    new_articles = _collect_new_articles(html, seen_keys, final=is_final)
+                step_stage["new_articles"] = len(new_articles)
+                html = result = None  # Don't keep the page HTML alive while the LLM runs
+                
+                posts = []
+                if feed_capture:
+                    # Posts decoded from the feed responses; their articles skip the LLM
+                    await feed_capture.settle()
+                    posts = _posts_from_extracted_data({"posts": feed_capture.decoder.drain(final=is_final)})
+                    new_articles = uncovered_articles(new_articles, feed_capture.decoder.contents())
+                    step_stage.update(decoded_posts=len(posts), llm_fallback_articles=len(new_articles))
+                
+                if new_articles:
+                    print(f"\n🤖 Step {step}: extracting {len(new_articles)} new article(s)...")
+                    extraction_strategy = extraction_strategy or _build_extraction_strategy()
+                    tokens_before = llm_usage(extraction_strategy)
+                    cached_before = llm_cached_tokens(extraction_strategy)
+                    with run_metrics.stage(f"extract_step_{step}") as extract_stage:
+                        extracted_posts = await _extract_posts_from_articles(crawler, new_articles, extraction_strategy)
+                    tokens_after = llm_usage(extraction_strategy)
+                    extract_stage.update(
+                        bytes_in=sum(len(article) for article in new_articles),
+                        prompt_tokens=tokens_after[0] - tokens_before[0],
+                        completion_tokens=tokens_after[1] - tokens_before[1],
+                        cached_prompt_tokens=llm_cached_tokens(extraction_strategy) - cached_before,
+                        posts=len(extracted_posts)
+                    )
+                    posts += extracted_posts
+                
+                for post in posts:
+                    if jsonl_file:
+                        jsonl_file.write(json.dumps(post.model_dump(), ensure_ascii=False) + "\n")
+                        jsonl_file.flush()
+                    yield post
+    finally:
+        if jsonl_file:
+            jsonl_file.close()
+        run_metrics.export_jsonl(metrics_path)
+        _report_extraction(extraction_strategy)
+
 
 @tool
-def facebook_scraper_tool(page_url: str) -> str:
+def facebook_scraper_tool(page_url: str, headless: bool = False) -> str:
     """
     Synchronous wrapper for facebook_basic_scroll to use as a LangChain tool.
-    Saves the extracted data to a JSON file AND returns it to the agent.
+    Upserts the extracted posts into the local post store, then saves the
+    delta (new posts and posts whose counters changed) to a JSON file AND
+    returns it to the agent.
+    
+    Posts are extracted with gemini-2.5-flash and re-extracted with
+    gemini-2.5-pro only when flash's posts fail validation (until now every
+    extraction used gemini-2.5-pro; see FACEBOOK_MODEL_TIERS).
     
     Args:
         page_url: The Facebook page URL to scrape
+        headless: Run the browser in headless mode (the scheduler daemon does)
     
     Returns:
-        JSON string containing the extracted posts data
+        JSON string containing the new and updated posts
     """
     try:
         # Run the async function synchronously WITHOUT debug files
@@ -691,21 +1504,31 @@ def facebook_scraper_tool(page_url: str) -> str:
             page_url=page_url,
             scroll_count=20,
             scroll_wait=3,
-            headless=False,
-            save_debug_files=False  # Don't create debug files
+            headless=headless,
+            save_debug_files=False,  # Don't create debug files
+            lean_result=True  # Keep only posts and metrics in the agent process
         ))
         
         if result["success"]:
             # Get the extracted data
             extracted_data = result.get('extracted_data', {})
+            posts = _posts_from_extracted_data(extracted_data)
+            
+            # Keep only what changed since the previous runs
+            delta = FacebookPostStore(POST_STORE_PATH).upsert_posts(posts, page_url)
+            print(f"\n📦 Post store: {len(delta['new'])} new, {len(delta['updated'])} updated, "
+                  f"{delta['unchanged']} unchanged")
+
+            # Every post of this run as rows for analytics (data/export/facebook_posts)
+            with ColumnarExporter() as exporter:
+                exporter.add("facebook_posts", facebook_post_rows(posts, page_url, result["metrics"]["run_id"]))
             
-            # Save to JSON file with timestamp
-            from datetime import datetime
+            # Save the delta to JSON file with timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = f"./data/facebook_scraped_data_{timestamp}.json"
+            output_filename = f"./data/facebook_scraped_delta_{timestamp}.json"
             
             with open(output_filename, 'w', encoding='utf-8') as f:
-                json.dump(extracted_data, f, ensure_ascii=False, indent=2)
+                json.dump(delta, f, ensure_ascii=False, indent=2)
             
             print(f"\n✅ Data saved to: {output_filename}")
             
@@ -713,7 +1536,8 @@ def facebook_scraper_tool(page_url: str) -> str:
             response_data = {
                 "success": True,
                 "saved_to_file": output_filename,
-                "data": extracted_data
+                "post_store": POST_STORE_PATH,
+                "data": delta
             }
             
             # Return the data as JSON string to the agent
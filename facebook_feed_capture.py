@@ -0,0 +1,331 @@
+"""
+Facebook Feed Capture
+Records the GraphQL responses Facebook loads the feed with while the page scrolls
+and decodes their stories into posts, without DOM rendering or an LLM call
+"""
+import asyncio
+import json
+from collections import deque
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+
+# Requests whose responses carry feed stories
+FEED_URL_MARKERS = ("/api/graphql",)
+
+# Anti-JSON-hijacking prefix Facebook puts in front of some responses
+JSON_GUARD = "for (;;);"
+
+# Comments kept per post, like the LLM instruction asks for
+MAX_COMMENTS = 10
+
+
+def is_feed_response(url, resource_type=None):
+    """True for the XHR/fetch responses that load feed stories"""
+    if resource_type not in (None, "xhr", "fetch"):
+        return False
+    return any(marker in url for marker in FEED_URL_MARKERS)
+
+
+def iter_json_documents(text):
+    """
+    JSON documents of a response body. GraphQL feed responses are streamed as
+    one document per line (the story first, deferred parts after it); lines
+    that aren't valid JSON are skipped, and counted by the caller.
+    """
+    text = (text or "").strip()
+    if text.startswith(JSON_GUARD):
+        text = text[len(JSON_GUARD):]
+    decoder = json.JSONDecoder()
+    position = 0
+    while position < len(text):
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position >= len(text):
+            break
+        try:
+            document, position = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            # Skip to the next line and try again
+            next_line = text.find("\n", position)
+            yield None
+            if next_line == -1:
+                break
+            position = next_line + 1
+            continue
+        yield document
+
+
+def script_json_documents(html):
+    """JSON embedded in <script type="application/json"> tags (server-rendered first stories)"""
+    soup = BeautifulSoup(html or "", "lxml")
+    for script in soup.find_all("script", attrs={"type": "application/json"}):
+        yield from iter_json_documents(script.string or "")
+
+
+def _walk(node, prune=None):
+    # Every dict in a JSON tree, parents before children (breadth first);
+    # the children of dicts for which prune() is true are skipped
+    queue = deque([node])
+    while queue:
+        current = queue.popleft()
+        if isinstance(current, dict):
+            yield current
+            if prune is None or not prune(current):
+                queue.extend(value for value in current.values() if isinstance(value, (dict, list)))
+        elif isinstance(current, list):
+            queue.extend(value for value in current if isinstance(value, (dict, list)))
+
+
+def _is_story(node):
+    return node.get("__typename") == "Story" and bool(node.get("post_id"))
+
+
+def _first(node, key, accept):
+    """Shallowest value stored under key anywhere in node that passes accept"""
+    for item in _walk(node):
+        if key in item and accept(item[key]):
+            return item[key]
+    return None
+
+
+def _is_text_holder(value):
+    return isinstance(value, dict) and isinstance(value.get("text"), str) and value["text"].strip() != ""
+
+
+def _format_time(timestamp):
+    # Same shape as Facebook's absolute timestamps, so normalize_post_time reads it
+    return datetime.fromtimestamp(timestamp).strftime("%B %d, %Y at %I:%M %p").replace(" 0", " ")
+
+
+def _count(node, text_key, count_key, count_field="count"):
+    """Counter as Facebook displays it ("1.2K"), else the raw number, else None"""
+    text = _first(node, text_key, lambda value: isinstance(value, (str, int)))
+    if text is not None:
+        return str(text)
+    holder = _first(node, count_key, lambda value: isinstance(value, dict) and isinstance(value.get(count_field), int))
+    return str(holder[count_field]) if holder else None
+
+
+def _counters(node):
+    return {
+        "likes_number": _count(node, "i18n_reaction_count", "reaction_count"),
+        "comments_number": _count(node, "i18n_comment_count", "comments", "total_count")
+        or _count(node, "i18n_comment_count", "comment_count", "total_count"),
+        "shares_number": _count(node, "i18n_share_count", "share_count"),
+    }
+
+
+def _comments(node):
+    comments = []
+    for item in _walk(node):
+        if item.get("__typename") != "Comment":
+            continue
+        author = (item.get("author") or {}).get("name")
+        body = item.get("body")
+        if author and _is_text_holder(body):
+            comments.append({"author": author, "text": body["text"]})
+        if len(comments) >= MAX_COMMENTS:
+            break
+    return comments
+
+
+class FeedDecoder:
+    """
+    Incremental decoder of Facebook feed payloads into FacebookPost-shaped
+    dicts. Stories are keyed by post_id, so a story seen again (the same
+    post in a later response) only fills in what was missing. Deferred
+    fragments that carry just the reactions/comments of a story are matched
+    to it through the id of its feedback object.
+
+    Usage:
+        decoder = FeedDecoder()
+        decoder.feed(response_text)
+        for post in decoder.drain():
+            ...
+    """
+
+    def __init__(self):
+        self._posts = {}
+        self._feedback_owner = {}
+        self._emitted = set()
+        self.stats = {"responses": 0, "documents": 0, "invalid_documents": 0, "stories": 0}
+
+    def feed(self, text):
+        """Decode one response body (one or more JSON documents)"""
+        self.stats["responses"] += 1
+        for document in iter_json_documents(text):
+            self._feed_document(document)
+
+    def feed_html(self, html):
+        """Decode the stories embedded in a server-rendered page"""
+        self.stats["responses"] += 1
+        for document in script_json_documents(html):
+            self._feed_document(document)
+
+    def _feed_document(self, document):
+        if document is None:
+            self.stats["invalid_documents"] += 1
+            return
+        self.stats["documents"] += 1
+        # A story's attached (shared) story is part of it, not a post of its own
+        for item in _walk(document, prune=_is_story):
+            if _is_story(item):
+                self._merge_story(item)
+            elif item.get("id") in self._feedback_owner:
+                self._merge_feedback(self._feedback_owner[item["id"]], item)
+
+    def _merge_story(self, story):
+        post_id = str(story["post_id"])
+        post = self._posts.get(post_id)
+        if post is None:
+            post = self._posts[post_id] = {
+                "post_time": None, "content": None, "likes_number": None,
+                "comments_number": None, "shares_number": None, "comments": [],
+            }
+            self.stats["stories"] += 1
+
+        if post["content"] is None:
+            message = _first(story, "message", _is_text_holder)
+            post["content"] = message["text"] if message else None
+        if post["post_time"] is None:
+            created = _first(story, "creation_time", lambda value: isinstance(value, int))
+            post["post_time"] = _format_time(created) if created else None
+
+        # The shallowest Feedback is the story's own; deeper ones belong to its comments
+        for feedback in _walk(story):
+            if feedback.get("__typename") == "Feedback" and feedback.get("id"):
+                self._feedback_owner[feedback["id"]] = post_id
+                break
+        self._merge_feedback(post_id, story)
+
+    def _merge_feedback(self, post_id, node):
+        post = self._posts[post_id]
+        for field, value in _counters(node).items():
+            if post[field] is None and value is not None:
+                post[field] = value
+        if not post["comments"]:
+            post["comments"] = _comments(node)
+
+    def posts(self):
+        """Every decoded post with content, in the order the stories arrived"""
+        return [post for post in self._posts.values() if post["content"]]
+
+    def contents(self):
+        """Texts of all decoded posts (emitted or not), to tell which articles are covered"""
+        return [post["content"] for post in self.posts()]
+
+    def drain(self, final=False):
+        """
+        Posts not returned by an earlier drain() that are complete (content
+        and reaction count). With final=True, posts still missing their
+        counters are returned as well.
+        """
+        ready = []
+        for post_id, post in self._posts.items():
+            if post_id in self._emitted or not post["content"]:
+                continue
+            if post["likes_number"] is None and not final:
+                continue
+            self._emitted.add(post_id)
+            ready.append(post)
+        return ready
+
+
+class FeedCapture:
+    """
+    Listens to the responses of the crawl4ai page and feeds the GraphQL
+    feed responses (and the server-rendered first page) to a FeedDecoder.
+    Each captured response can also be appended to a JSONL file, which
+    replay_fixture() decodes again offline.
+
+    Usage:
+        capture = FeedCapture(record_path="./debug/feed_responses.jsonl")
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            capture.attach(crawler)
+            result = await crawler.arun(url=page_url, config=config)
+            await capture.settle()
+        posts = capture.decoder.posts()
+    """
+
+    def __init__(self, decoder=None, record_path=None):
+        self.decoder = decoder or FeedDecoder()
+        self.record_path = record_path
+        self._pages = set()
+        self._pending = set()
+
+    def attach(self, crawler):
+        """Register the response listener on every page the crawler opens"""
+        crawler.crawler_strategy.set_hook("on_page_context_created", self._on_page)
+
+    async def _on_page(self, page, context=None, **kwargs):
+        # Session pages are handed to the hook again on every arun
+        if id(page) not in self._pages:
+            self._pages.add(id(page))
+            page.on("response", self._on_response)
+        return page
+
+    def _on_response(self, response):
+        resource_type = response.request.resource_type
+        if resource_type == "document" or is_feed_response(response.url, resource_type):
+            task = asyncio.ensure_future(self._read(response, resource_type))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _read(self, response, resource_type):
+        try:
+            body = await response.text()
+        except Exception:
+            # Redirects and aborted requests have no body
+            return
+        self.handle(response.url, response.status, resource_type, body)
+
+    def handle(self, url, status, resource_type, body):
+        """Record and decode one response"""
+        if self.record_path:
+            with open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"url": url, "status": status, "resource_type": resource_type, "body": body},
+                                   ensure_ascii=False) + "\n")
+        if status != 200:
+            return
+        if resource_type == "document":
+            self.decoder.feed_html(body)
+        else:
+            self.decoder.feed(body)
+
+    async def settle(self):
+        """Wait for the bodies of responses that already arrived to be decoded"""
+        while self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+
+def replay_fixture(path):
+    """FeedDecoder fed with the responses of a recorded JSONL fixture, in order"""
+    capture = FeedCapture()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                capture.handle(record["url"], record.get("status", 200), record.get("resource_type"), record["body"])
+    return capture.decoder
+
+
+def covered_by(article_text, contents, prefix_chars=60):
+    """True if an article's text contains the start of one of the decoded post texts"""
+    text = " ".join(article_text.split())
+    return any(" ".join(content.split())[:prefix_chars] in text for content in contents if content)
+
+
+def uncovered_articles(articles_html, contents, min_chars=20):
+    """
+    The feed articles (HTML snippets) none of the decoded posts accounts for;
+    articles with almost no text, like empty placeholders, are dropped
+    """
+    missing = []
+    for article_html in articles_html:
+        text = BeautifulSoup(article_html, "lxml").get_text(" ")
+        if len(text.strip()) < min_chars or covered_by(text, contents):
+            continue
+        missing.append(article_html)
+    return missing
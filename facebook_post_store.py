@@ -0,0 +1,290 @@
+"""
+Facebook Post Store
+Local SQLite store that deduplicates scraped posts across runs
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+
+# Counters that change between runs and are refreshed on every upsert
+COUNTER_FIELDS = ("likes_number", "comments_number", "shares_number")
+
+# Texts Facebook appends to truncated or expanded posts
+TRAILING_NOISE = ("See more", "See More", "See less", "عرض المزيد", "عرض أقل")
+
+RELATIVE_TIME_UNITS = {
+    "m": "minutes", "min": "minutes", "mins": "minutes", "minute": "minutes", "minutes": "minutes",
+    "h": "hours", "hr": "hours", "hrs": "hours", "hour": "hours", "hours": "hours",
+    "d": "days", "day": "days", "days": "days",
+    "w": "weeks", "week": "weeks", "weeks": "weeks",
+}
+
+ABSOLUTE_TIME_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%B %d", "%b %d")
+
+# Days a date derived from a relative timestamp can drift between runs
+# ("1w" is shown for a whole week, "23h" may fall on either side of midnight)
+RELATIVE_TIME_TOLERANCE_DAYS = {"minutes": 1, "hours": 1, "days": 1, "weeks": 7}
+
+# Leading characters of the content that identify a post; a truncated copy
+# ("...See more") still shares this prefix with the expanded one
+FINGERPRINT_PREFIX_CHARS = 200
+
+
+def normalize_text(text):
+    """Collapse whitespace and drop "See more"-style suffixes"""
+    text = " ".join((text or "").split())
+    for noise in TRAILING_NOISE:
+        if text.endswith(noise):
+            text = text[:-len(noise)].rstrip(" .…")
+    return text
+
+
+def normalize_post_time(post_time, scraped_at=None):
+    """
+    Convert a Facebook timestamp ("5h", "2 days ago", "Yesterday",
+    "September 24 at 2:04 PM") to a YYYY-MM-DD date, relative to scraped_at.
+    Returns None when the format isn't recognised.
+    """
+    if not post_time:
+        return None
+    scraped_at = scraped_at or datetime.now()
+    text = post_time.strip().lower()
+
+    if text in ("just now", "now"):
+        return scraped_at.strftime("%Y-%m-%d")
+    if text.startswith("yesterday"):
+        return (scraped_at - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    match = re.match(r"^(\d+)\s*([a-z]+)(\s+ago)?$", text)
+    if match and match.group(2) in RELATIVE_TIME_UNITS:
+        delta = timedelta(**{RELATIVE_TIME_UNITS[match.group(2)]: int(match.group(1))})
+        return (scraped_at - delta).strftime("%Y-%m-%d")
+
+    # Absolute dates: drop the " at 2:04 PM" part, then try the known formats
+    date_part = post_time.split(" at ")[0].strip()
+    for fmt in ABSOLUTE_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(date_part, fmt)
+        except ValueError:
+            continue
+        if "%Y" not in fmt:
+            # Facebook omits the year for the current year
+            parsed = parsed.replace(year=scraped_at.year)
+            if parsed > scraped_at:
+                parsed = parsed.replace(year=scraped_at.year - 1)
+        return parsed.strftime("%Y-%m-%d")
+
+    return None
+
+
+def post_time_tolerance(post_time):
+    """
+    Days by which the date normalize_post_time gives for post_time can differ
+    from run to run: 0 for absolute dates, the unit size for relative ones.
+    None when the format isn't recognised.
+    """
+    if not post_time:
+        return None
+    text = post_time.strip().lower()
+    if text in ("just now", "now") or text.startswith("yesterday"):
+        return 1
+    match = re.match(r"^(\d+)\s*([a-z]+)(\s+ago)?$", text)
+    if match and match.group(2) in RELATIVE_TIME_UNITS:
+        return RELATIVE_TIME_TOLERANCE_DAYS[RELATIVE_TIME_UNITS[match.group(2)]]
+    return 0 if normalize_post_time(post_time) else None
+
+
+def post_fingerprint(post, page_url, scraped_at=None):
+    """
+    Identifier of a post's content: a hash of the page URL and the start of
+    the normalised text. It doesn't depend on the timestamp, which is relative
+    ("1w", "6d") and moves between runs; FacebookPostStore tells reposts of
+    the same text apart by their publication dates. Posts without text
+    (photos, videos) are keyed by their date if it is absolute, otherwise by
+    the raw timestamp.
+    """
+    content = normalize_text(post.get("content"))[:FINGERPRINT_PREFIX_CHARS]
+    if content:
+        basis = f"{page_url}\ncontent\n{content}"
+    else:
+        post_time = post.get("post_time")
+        published = normalize_post_time(post_time, scraped_at) if post_time_tolerance(post_time) == 0 else None
+        basis = f"{page_url}\ntime\n{published or post_time or ''}"
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()
+
+
+def same_publication(published, tolerance, row):
+    """
+    True if a post dated published (tolerance days) can be the stored row:
+    the dates are within the larger tolerance of the two, or either is unknown
+    """
+    if published is None or row["published_date"] is None:
+        return True
+    days = abs((datetime.fromisoformat(published) - datetime.fromisoformat(row["published_date"])).days)
+    return days <= max(tolerance or 0, row["time_tolerance_days"] or 0)
+
+
+class FacebookPostStore:
+    """
+    SQLite store of Facebook posts. A scraped post is the stored post with the
+    same post_fingerprint whose publication date matches (same_publication),
+    so a relative timestamp that moved or became absolute still finds it,
+    while the same text posted again on another date is a new post.
+
+    upsert_posts() inserts unseen posts, refreshes the counters of known ones
+    and returns only what changed, so downstream jobs can process the delta
+    instead of re-reading full snapshots.
+    """
+
+    def __init__(self, db_path="./data/facebook_posts.db"):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    fingerprint TEXT PRIMARY KEY,
+                    page_url TEXT NOT NULL,
+                    post_time TEXT,
+                    published_date TEXT,
+                    time_tolerance_days INTEGER,
+                    content_key TEXT,
+                    content TEXT,
+                    likes_number TEXT,
+                    comments_number TEXT,
+                    shares_number TEXT,
+                    comments_json TEXT,
+                    first_seen TEXT NOT NULL,
+                    last_seen TEXT NOT NULL
+                )
+            """)
+            # Stores created when rows were keyed by fingerprint alone
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(posts)")}
+            if "content_key" not in columns:
+                conn.execute("ALTER TABLE posts ADD COLUMN time_tolerance_days INTEGER")
+                conn.execute("ALTER TABLE posts ADD COLUMN content_key TEXT")
+                for row in conn.execute("SELECT * FROM posts").fetchall():
+                    conn.execute(
+                        "UPDATE posts SET time_tolerance_days = ?, content_key = ? WHERE fingerprint = ?",
+                        (post_time_tolerance(row["post_time"]), post_fingerprint(dict(row), row["page_url"]),
+                         row["fingerprint"])
+                    )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_page ON posts (page_url, published_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_content ON posts (content_key)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def upsert_posts(self, posts, page_url, scraped_at=None):
+        """
+        Insert or update posts scraped from page_url.
+
+        Args:
+            posts: List of post dicts (or FacebookPost objects)
+            page_url: The Facebook page the posts were scraped from
+            scraped_at: datetime of the scrape (default: now)
+
+        Returns:
+            {"new": [...], "updated": [...], "unchanged": int}
+            Updated posts carry a "changes" dict of {field: [old, new]}.
+        """
+        scraped_at = scraped_at or datetime.now()
+        seen_at = scraped_at.isoformat(timespec="seconds")
+        delta = {"new": [], "updated": [], "unchanged": 0}
+
+        with self._connect() as conn:
+            for post in posts:
+                if hasattr(post, "model_dump"):
+                    post = post.model_dump()
+                content_key = post_fingerprint(post, page_url, scraped_at)
+                published = normalize_post_time(post.get("post_time"), scraped_at)
+                tolerance = post_time_tolerance(post.get("post_time"))
+                candidates = conn.execute(
+                    "SELECT * FROM posts WHERE content_key = ? ORDER BY last_seen DESC", (content_key,)
+                ).fetchall()
+                row = next((row for row in candidates if same_publication(published, tolerance, row)), None)
+
+                if row is None:
+                    # A repost of stored text gets its own row, told apart by its date
+                    fingerprint = content_key if not candidates else hashlib.sha1(
+                        f"{content_key}\n{published or post.get('post_time') or ''}".encode("utf-8")).hexdigest()
+                    conn.execute(
+                        """INSERT INTO posts (fingerprint, page_url, post_time, published_date, time_tolerance_days,
+                                              content_key, content, likes_number, comments_number, shares_number,
+                                              comments_json, first_seen, last_seen)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (
+                            fingerprint, page_url, post.get("post_time"), published, tolerance, content_key,
+                            post.get("content"),
+                            post.get("likes_number"), post.get("comments_number"), post.get("shares_number"),
+                            json.dumps(post.get("comments") or [], ensure_ascii=False),
+                            seen_at, seen_at,
+                        )
+                    )
+                    delta["new"].append({**post, "fingerprint": fingerprint})
+                    continue
+
+                fingerprint = row["fingerprint"]
+
+                changes = {
+                    field: [row[field], post.get(field)]
+                    for field in COUNTER_FIELDS
+                    if post.get(field) is not None and post.get(field) != row[field]
+                }
+                # Keep the longest version of the text (posts are sometimes caught truncated)
+                content = post.get("content") or ""
+                if len(content) > len(row["content"] or ""):
+                    changes["content"] = [row["content"], content]
+
+                conn.execute(
+                    f"""UPDATE posts SET last_seen = ?{''.join(f', {field} = ?' for field in changes)}
+                        WHERE fingerprint = ?""",
+                    (seen_at, *(new for _, new in changes.values()), fingerprint)
+                )
+                # Keep the most precise date seen ("October 12" over "1w")
+                if published is not None and (row["published_date"] is None or
+                                               (tolerance or 0) < (row["time_tolerance_days"] or 0)):
+                    conn.execute(
+                        "UPDATE posts SET post_time = ?, published_date = ?, time_tolerance_days = ? WHERE fingerprint = ?",
+                        (post.get("post_time"), published, tolerance, fingerprint)
+                    )
+                if changes:
+                    delta["updated"].append({**post, "fingerprint": fingerprint, "changes": changes})
+                else:
+                    delta["unchanged"] += 1
+
+        return delta
+
+    def get_posts(self, page_url=None, since=None):
+        """Return stored posts as dicts, optionally filtered by page and first_seen >= since"""
+        query = "SELECT * FROM posts WHERE 1 = 1"
+        params = []
+        if page_url:
+            query += " AND page_url = ?"
+            params.append(page_url)
+        if since:
+            query += " AND first_seen >= ?"
+            params.append(since.isoformat(timespec="seconds") if hasattr(since, "isoformat") else since)
+        query += " ORDER BY published_date DESC"
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        posts = []
+        for row in rows:
+            post = dict(row)
+            post["comments"] = json.loads(post.pop("comments_json") or "[]")
+            posts.append(post)
+        return posts
@@ -0,0 +1,194 @@
+"""
+Host Limiter
+Per-host token bucket and max-in-flight limit shared by the cloudscraper
+requests and Selenium navigations of get_full_html and the pages of the
+async fetch backend, with adaptive backoff
+when a host answers with a challenge page, 429 or 503
+"""
+import asyncio
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlparse
+
+
+# Statuses that mean "slow down"
+THROTTLE_STATUSES = (429, 503)
+
+# Markers of Cloudflare / anti-bot interstitials in a page
+CHALLENGE_MARKERS = (
+    "cf-browser-verification",
+    "cf-challenge",
+    "challenge-platform",
+    "cf_chl_opt",
+    "<title>just a moment...</title>",
+    "attention required! | cloudflare",
+    "checking your browser before accessing",
+)
+
+
+def is_challenge(status_code=None, html=None):
+    """True if a response is a throttle status or an anti-bot challenge page"""
+    if status_code in THROTTLE_STATUSES:
+        return True
+    if not html:
+        return False
+    # Challenge pages are small; only the head of a page needs checking
+    head = re.sub(r"\s+", " ", html[:20000].lower())
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+def _retry_after(headers):
+    # Retry-After in seconds (the HTTP-date form is ignored)
+    try:
+        return float((headers or {}).get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _HostState:
+    def __init__(self, rate_per_s, burst):
+        self.rate_per_s = rate_per_s
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.penalty = 0
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.waited_s = 0.0
+
+
+class HostLimiter:
+    """
+    Every request to a host takes a token (refilled at rate_per_s up to
+    burst) and a slot (at most max_in_flight at once). A throttled response
+    (challenge page, 429, 503) blocks the host for an exponential backoff,
+    or Retry-After, and halves its rate. Successful responses raise the
+    rate back step by step and reset the backoff (AIMD), so throughput
+    recovers once the host stops pushing back.
+
+    Usage:
+        with limiter.slot(url):              # async with limiter.aslot(url): in coroutines
+            resp = scraper.get(url)
+        limiter.report(url, resp.status_code, resp.text, resp.headers)
+    """
+
+    def __init__(self, rate_per_s=1.0, burst=4, max_in_flight=2, base_backoff_s=5.0, max_backoff_s=300.0,
+                 min_rate_per_s=0.05):
+        self.rate_per_s = rate_per_s
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.min_rate_per_s = min_rate_per_s
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def host(url):
+        return urlparse(url).netloc.lower()
+
+    def _state(self, host):
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self.rate_per_s, self.burst)
+        return self._hosts[host]
+
+    def _refill(self, state, now):
+        state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate_per_s)
+        state.updated = now
+
+    def _acquire(self, state):
+        # Take a token and a slot if both are free: (True, None), else (False, seconds to wait or None until a slot frees)
+        now = time.monotonic()
+        self._refill(state, now)
+        if now < state.blocked_until:
+            return False, state.blocked_until - now
+        if state.in_flight >= self.max_in_flight:
+            return False, None
+        if state.tokens < 1:
+            return False, (1 - state.tokens) / state.rate_per_s
+        state.tokens -= 1
+        state.in_flight += 1
+        state.requests += 1
+        return True, None
+
+    def _release(self, state):
+        with self._condition:
+            state.in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, url):
+        """Wait for a token and a free slot of the url's host, hold the slot while the request runs"""
+        start = time.monotonic()
+        with self._condition:
+            state = self._state(self.host(url))
+            while True:
+                acquired, wait = self._acquire(state)
+                if acquired:
+                    break
+                self._condition.wait(wait)
+            state.waited_s += time.monotonic() - start
+        try:
+            yield
+        finally:
+            self._release(state)
+
+    @asynccontextmanager
+    async def aslot(self, url):
+        """slot() for coroutines: waits with asyncio.sleep, so other fetches on the event loop keep running"""
+        start = time.monotonic()
+        while True:
+            with self._condition:
+                state = self._state(self.host(url))
+                acquired, wait = self._acquire(state)
+                if acquired:
+                    state.waited_s += time.monotonic() - start
+                    break
+            await asyncio.sleep(min(wait, 1.0) if wait is not None else 0.05)
+        try:
+            yield
+        finally:
+            self._release(state)
+
+    def report(self, url, status_code=None, html=None, headers=None):
+        """
+        Feed back the outcome of a request. Returns True if it was throttled
+        (the caller may retry; the next slot() waits out the backoff).
+        """
+        throttled = is_challenge(status_code, html)
+        with self._condition:
+            state = self._state(self.host(url))
+            if throttled:
+                state.throttled += 1
+                state.penalty += 1
+                backoff = _retry_after(headers)
+                if backoff is None:
+                    backoff = min(self.max_backoff_s, self.base_backoff_s * 2 ** (state.penalty - 1))
+                state.blocked_until = max(state.blocked_until, time.monotonic() + backoff)
+                state.rate_per_s = max(self.min_rate_per_s, state.rate_per_s / 2)
+                state.tokens = min(state.tokens, 0.0)
+            else:
+                state.penalty = 0
+                state.rate_per_s = min(self.rate_per_s, state.rate_per_s + self.rate_per_s / 10)
+            self._condition.notify_all()
+        return throttled
+
+    def stats(self):
+        """Per-host requests, throttled responses, time spent waiting and current rate"""
+        with self._condition:
+            return {
+                host: {
+                    "requests": state.requests,
+                    "throttled": state.throttled,
+                    "waited_s": round(state.waited_s, 2),
+                    "rate_per_s": round(state.rate_per_s, 3),
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+# Shared by every get_full_html call in the process unless a limiter is passed explicitly
+HOST_LIMITER = HostLimiter()
@@ -0,0 +1,128 @@
+"""
+HTML Cleaning Pool
+Runs the CPU-bound cleaning stages (get_specific_html + get_imp_html) in
+worker processes, so a batch of multi-MB pages uses every core instead of
+one BeautifulSoup parse at a time under the GIL
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from bs4 import BeautifulSoup
+
+from tools.scraper_2_all_pro_html_only import strip_assets
+from tools.scraper_3_imp_pro import find_main_container
+
+
+# Chunks handed to each worker per batch: enough to even out pages of very
+# different sizes, few enough that pickling overhead stays small
+CHUNKS_PER_WORKER = 4
+
+
+def _warm_up():
+    # Runs once in every worker: pay the parser imports before the first page
+    for parser in ("lxml", "html.parser"):
+        BeautifulSoup("<html><body><p>warm</p></body></html>", parser).get_text()
+
+
+def _worker_pid(_):
+    return os.getpid()
+
+
+def clean_page(html_content, parser="lxml"):
+    """
+    Stages 2 and 3 on one raw page from a single parse. Returns only the
+    important HTML and sizes; the cleaned page is never serialised.
+    """
+    start = time.perf_counter()
+    soup = BeautifulSoup(html_content, parser)
+    important = str(find_main_container(strip_assets(soup)))
+    return {
+        "important_html": important,
+        "html_chars_before": len(html_content),
+        "html_chars_after": len(important),
+        "wall_time_s": round(time.perf_counter() - start, 4),
+    }
+
+
+def clean_saved_page(bakat_name_each, parser="lxml"):
+    """
+    Same as get_specific_html + get_imp_html: reads data/html_all, writes
+    data/html_only and data/html_only_imp. The worker does the file I/O, so
+    only the page name and a few sizes cross the process boundary.
+    """
+    start = time.perf_counter()
+    with open(f"data/html_all/{bakat_name_each}_all_pro.html", "r", encoding="utf-8") as f:
+        html_content = f.read()
+
+    soup = strip_assets(BeautifulSoup(html_content, parser))
+    file_path_out = f"data/html_only/{bakat_name_each}_html_only.html"
+    os.makedirs(os.path.dirname(file_path_out), exist_ok=True)
+    with open(file_path_out, "w", encoding="utf-8") as f:
+        f.write(str(soup))
+
+    important = str(find_main_container(soup))
+    file_path_out = f"data/html_only_imp/{bakat_name_each}_imp_pro.html"
+    os.makedirs(os.path.dirname(file_path_out), exist_ok=True)
+    with open(file_path_out, "w", encoding="utf-8") as f:
+        f.write(important)
+
+    return {
+        "bytes_in": len(html_content.encode("utf-8")),
+        "bytes_out": len(important.encode("utf-8")),
+        "wall_time_s": round(time.perf_counter() - start, 4),
+    }
+
+
+class HtmlCleaningPool:
+    """
+    Process pool for the cleaning stages. Workers are started and warmed up
+    when the pool is created, so the first batch doesn't pay for process
+    start-up and imports.
+
+    parser is the BeautifulSoup backend ("lxml" or "html.parser"); each
+    page is parsed once and cleaned in place.
+
+    Usage:
+        with HtmlCleaningPool() as pool:
+            results = pool.clean(pages)                # raw HTML strings
+            sizes = pool.clean_saved_pages(bakat_name)  # files from stage 1
+    """
+
+    def __init__(self, workers=None, parser="lxml"):
+        self.workers = workers or os.cpu_count() or 1
+        self.parser = parser
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_up)
+        # One tiny task per worker forces all of them to start now
+        list(self._executor.map(_worker_pid, range(self.workers)))
+
+    def chunksize(self, count):
+        """Pages per task so every worker gets CHUNKS_PER_WORKER tasks"""
+        return max(1, math.ceil(count / (self.workers * CHUNKS_PER_WORKER)))
+
+    def clean(self, html_pages):
+        """clean_page for every HTML string, results in input order"""
+        html_pages = list(html_pages)
+        return list(self._executor.map(partial(clean_page, parser=self.parser), html_pages,
+                                       chunksize=self.chunksize(len(html_pages))))
+
+    def clean_saved_pages(self, bakat_name):
+        """clean_saved_page for every page name, results in input order"""
+        bakat_name = list(bakat_name)
+        return list(self._executor.map(partial(clean_saved_page, parser=self.parser), bakat_name,
+                                       chunksize=self.chunksize(len(bakat_name))))
+
+    def submit_saved_page(self, bakat_name_each):
+        """clean_saved_page for one page name, as a Future (for callers feeding pages one at a time)"""
+        return self._executor.submit(clean_saved_page, bakat_name_each, parser=self.parser)
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
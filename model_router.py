@@ -0,0 +1,163 @@
+"""
+Model Router
+Tiered model routing: every page goes to a fast, cheap model first and is
+re-run on a stronger model only when the output fails validation
+"""
+import threading
+import time
+
+from pydantic import ValidationError
+
+
+def schema_problems(schema, data):
+    """Validation errors of data against a Pydantic model, as short strings (empty if valid)"""
+    try:
+        schema.model_validate(data)
+    except ValidationError as e:
+        return [f"{'.'.join(str(part) for part in error['loc']) or 'output'}: {error['msg']}" for error in e.errors()]
+    return []
+
+
+class ModelRouter:
+    """
+    Tiers are (name, target) pairs, cheapest first; a target is whatever the
+    call needs (a LangChain model, a crawl4ai extraction strategy). run()
+    calls each tier in turn until validate(output, **context) returns no
+    problems. A tier that raises counts as a failure and the next one is
+    tried. If no tier passes, the last output is returned with its problems,
+    so callers get the strongest model's best effort like before.
+
+    Per-tier calls, accepted/rejected outputs, errors and latency are
+    recorded; the router is thread-safe and meant to be shared by all pages
+    of a run.
+
+    Usage:
+        router = ModelRouter([("flash", flash_model), ("pro", pro_model)], validate_output)
+        output, tier, problems = router.run(lambda model: model.invoke(prompt), page=html)
+        print(router.report())
+    """
+
+    def __init__(self, tiers, validate):
+        self.tiers = list(tiers)
+        if not self.tiers:
+            raise ValueError("ModelRouter needs at least one tier")
+        self.validate = validate
+        self._tier_stats = {
+            name: {"calls": 0, "accepted": 0, "rejected": 0, "errors": 0, "latency_s": 0.0, "max_latency_s": 0.0}
+            for name, _ in self.tiers
+        }
+        self._routed = {"pages": 0, "escalated": 0, "unresolved": 0}
+        self._lock = threading.Lock()
+
+    def _record(self, name, start, problems=None, error=None):
+        latency_s = time.perf_counter() - start
+        with self._lock:
+            stats = self._tier_stats[name]
+            stats["calls"] += 1
+            stats["latency_s"] += latency_s
+            stats["max_latency_s"] = max(stats["max_latency_s"], latency_s)
+            if error is not None:
+                stats["errors"] += 1
+            elif problems:
+                stats["rejected"] += 1
+            else:
+                stats["accepted"] += 1
+
+        if error is not None or problems:
+            reason = f"{type(error).__name__}: {error}" if error is not None else problems[0]
+            print(f"↗️  {name} output rejected ({reason[:120]})")
+
+    def record_pages(self, pages, escalated=False, unresolved=False):
+        """Add pages to the page counts of report(); run() does it for the pages of its call"""
+        with self._lock:
+            self._routed["pages"] += pages
+            self._routed["escalated"] += pages if escalated else 0
+            self._routed["unresolved"] += pages if unresolved else 0
+
+    def _result(self, attempts, output, tier, problems, error, pages):
+        self.record_pages(pages, escalated=attempts > 1, unresolved=problems is None or bool(problems))
+        if tier is None:
+            # Every tier raised
+            raise error
+        return output, tier, problems
+
+    def run(self, call, validate=None, pages=1, **context):
+        """
+        call(target) on each tier until the output passes validation
+        (validate, if given, instead of the router's own check). pages is
+        the number of pages the call extracts (a packed batch has several)
+        and is what the page counts of report() add up; with pages=0 the
+        caller counts them with record_pages.
+
+        Returns:
+            (output, name of the tier that produced it, problems: empty if accepted)
+        """
+        output, tier, problems, error = None, None, None, None
+        for attempts, (name, target) in enumerate(self.tiers, start=1):
+            start = time.perf_counter()
+            try:
+                candidate = call(target)
+            except Exception as e:
+                error = e
+                self._record(name, start, error=e)
+                continue
+            tier_problems = (validate or self.validate)(candidate, **context)
+            self._record(name, start, problems=tier_problems)
+            output, tier, problems = candidate, name, tier_problems
+            if not problems:
+                break
+        return self._result(attempts, output, tier, problems, error, pages)
+
+    async def arun(self, call, validate=None, pages=1, **context):
+        """run() for a call that returns a coroutine"""
+        output, tier, problems, error = None, None, None, None
+        for attempts, (name, target) in enumerate(self.tiers, start=1):
+            start = time.perf_counter()
+            try:
+                candidate = await call(target)
+            except Exception as e:
+                error = e
+                self._record(name, start, error=e)
+                continue
+            tier_problems = (validate or self.validate)(candidate, **context)
+            self._record(name, start, problems=tier_problems)
+            output, tier, problems = candidate, name, tier_problems
+            if not problems:
+                break
+        return self._result(attempts, output, tier, problems, error, pages)
+
+    def report(self):
+        """
+        Routing statistics so far.
+
+        Returns:
+            {"pages", "escalated" (pages that needed more than one tier),
+             "unresolved" (pages no tier produced valid output for),
+             "tiers": {name: {"calls", "accepted", "rejected", "errors",
+                              "success_rate", "mean_latency_s", "max_latency_s"}}}
+        """
+        with self._lock:
+            tiers = {}
+            for name, stats in self._tier_stats.items():
+                calls = stats["calls"]
+                tiers[name] = {
+                    "calls": calls,
+                    "accepted": stats["accepted"],
+                    "rejected": stats["rejected"],
+                    "errors": stats["errors"],
+                    "success_rate": round(stats["accepted"] / calls, 4) if calls else None,
+                    "mean_latency_s": round(stats["latency_s"] / calls, 4) if calls else None,
+                    "max_latency_s": round(stats["max_latency_s"], 4),
+                }
+            return {**self._routed, "tiers": tiers}
+
+
+def print_routing_report(report):
+    """Console summary of ModelRouter.report()"""
+    print(f"\n   🧭 Model routing: {report['pages']} page(s), {report['escalated']} escalated,"
+          f" {report['unresolved']} unresolved")
+    for name, stats in report["tiers"].items():
+        if not stats["calls"]:
+            continue
+        print(f"      • {name}: {stats['accepted']}/{stats['calls']} accepted"
+              f" ({stats['errors']} errors), mean {stats['mean_latency_s']:.2f}s, max {stats['max_latency_s']:.2f}s")
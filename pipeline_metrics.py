@@ -0,0 +1,183 @@
+"""
+Pipeline Metrics
+Per-run stage timing, size and token metrics for the website and Facebook pipelines
+"""
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# Every run appends one JSON record here
+METRICS_PATH = "./data/metrics/pipeline_metrics.jsonl"
+
+
+def file_size(path):
+    """Size of a file in bytes, 0 if it doesn't exist"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def llm_usage(extraction_strategy):
+    """(prompt_tokens, completion_tokens) accumulated by a crawl4ai LLM extraction strategy"""
+    usage = getattr(extraction_strategy, "total_usage", None)
+    return (getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0)
+
+
+def cached_prompt_tokens(usage):
+    """Prompt tokens of one LLM call the provider served from its prompt cache"""
+    details = getattr(usage, "prompt_tokens_details", None) or {}
+    # crawl4ai's TokenUsage keeps the details as a dict, litellm's usage as an object
+    if not isinstance(details, dict):
+        details = getattr(details, "__dict__", {})
+    return details.get("cached_tokens") or 0
+
+
+def llm_cached_tokens(extraction_strategy):
+    """Prompt tokens of a crawl4ai LLM extraction strategy the provider served from its prompt cache"""
+    return sum(cached_prompt_tokens(usage) for usage in getattr(extraction_strategy, "usages", None) or [])
+
+
+class RunMetrics:
+    """
+    Metrics of one pipeline run: a list of stage records with wall time plus
+    whatever sizes, token counts and cache hits the stage reports.
+
+    Usage:
+        metrics = RunMetrics("website", url)
+        with metrics.stage("get_specific_html") as stage:
+            get_specific_html(name)
+            stage["bytes_out"] = file_size(path)
+        metrics.export_jsonl()
+    """
+
+    def __init__(self, pipeline, target=None):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.pipeline = pipeline
+        self.target = target
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.stages = []
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Time a stage; the yielded dict can be filled with extra fields"""
+        record = {"stage": name, **fields}
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = str(e)
+            raise
+        finally:
+            record["wall_time_s"] = round(time.perf_counter() - start, 4)
+            self.stages.append(record)
+
+    def record(self, name, **fields):
+        """Add a stage that was timed elsewhere (e.g. in a worker process)"""
+        record = {"stage": name, **fields}
+        record.setdefault("wall_time_s", 0.0)
+        self.stages.append(record)
+        return record
+
+    def total(self, field):
+        """Sum of a numeric field over all stages"""
+        return sum(stage.get(field) or 0 for stage in self.stages)
+
+    def to_dict(self):
+        return {
+            "run_id": self.run_id,
+            "pipeline": self.pipeline,
+            "target": self.target,
+            "started_at": self.started_at,
+            "wall_time_s": round(time.perf_counter() - self._start, 4),
+            "stages": self.stages,
+        }
+
+    def export_jsonl(self, path=METRICS_PATH):
+        """Append this run as one JSON line"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+        return path
+
+    def summary(self):
+        """One line per stage for the console"""
+        return "\n".join(
+            f"   ⏱️  {stage['stage']:<28} {stage['wall_time_s']:>8.2f}s"
+            for stage in self.stages
+        )
+
+
+def load_runs(path=METRICS_PATH):
+    """All run records from a metrics JSONL file"""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def stage_report(runs):
+    """Mean wall time and share of the run per (pipeline, stage), slowest first"""
+    totals = {}
+    for run in runs:
+        for stage in run["stages"]:
+            # Streaming step stages are numbered; group them by kind
+            name = stage["stage"].rsplit("_", 1)[0] if stage["stage"][-1:].isdigit() else stage["stage"]
+            entry = totals.setdefault((run["pipeline"], name), {"count": 0, "wall_time_s": 0.0})
+            entry["count"] += 1
+            entry["wall_time_s"] += stage["wall_time_s"]
+
+    pipeline_time = {}
+    for (pipeline, _), entry in totals.items():
+        pipeline_time[pipeline] = pipeline_time.get(pipeline, 0.0) + entry["wall_time_s"]
+
+    report = [
+        {
+            "pipeline": pipeline,
+            "stage": name,
+            "count": entry["count"],
+            "mean_wall_time_s": round(entry["wall_time_s"] / entry["count"], 4),
+            "share": round(entry["wall_time_s"] / pipeline_time[pipeline], 4) if pipeline_time[pipeline] else 0.0,
+        }
+        for (pipeline, name), entry in totals.items()
+    ]
+    return sorted(report, key=lambda row: (row["pipeline"], -row["share"]))
+
+
+def token_report(runs):
+    """Prompt tokens, cached prompt tokens and cached share per pipeline"""
+    totals = {}
+    for run in runs:
+        entry = totals.setdefault(run["pipeline"], {"runs": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0})
+        entry["runs"] += 1
+        for stage in run["stages"]:
+            entry["prompt_tokens"] += stage.get("prompt_tokens") or 0
+            entry["cached_prompt_tokens"] += stage.get("cached_prompt_tokens") or 0
+    return [
+        {
+            "pipeline": pipeline,
+            **entry,
+            "cached_share": round(entry["cached_prompt_tokens"] / entry["prompt_tokens"], 4) if entry["prompt_tokens"] else 0.0,
+        }
+        for pipeline, entry in sorted(totals.items())
+    ]
+
+
+if __name__ == "__main__":
+    import sys
+
+    runs = load_runs(sys.argv[1] if len(sys.argv) > 1 else METRICS_PATH)
+    print(f"📊 {len(runs)} runs")
+    for row in stage_report(runs):
+        print(f"   {row['pipeline']:<16} {row['stage']:<24} x{row['count']:<5} "
+              f"{row['mean_wall_time_s']:>9.2f}s  {row['share'] * 100:5.1f}%")
+    print(f"\n🪙 Prompt tokens")
+    for row in token_report(runs):
+        if row["prompt_tokens"]:
+            print(f"   {row['pipeline']:<16} {row['prompt_tokens']:>10,} prompt  "
+                  f"{row['cached_prompt_tokens']:>10,} cached  {row['cached_share'] * 100:5.1f}%")
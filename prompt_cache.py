@@ -0,0 +1,207 @@
+"""
+Prompt Cache
+LLM extraction strategy that sends the static instruction and schema as a
+reusable cached prefix, so each call only pays full price for the page content
+"""
+import inspect
+import json
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import crawl4ai.extraction_strategy
+import crawl4ai.utils
+from crawl4ai.config import DEFAULT_PROVIDER
+from crawl4ai.extraction_strategy import LLMExtractionStrategy
+from crawl4ai.utils import escape_json_string, sanitize_html
+
+from tools.pipeline_metrics import cached_prompt_tokens
+
+
+# Smallest prefix the provider accepts for an explicit cache; shorter prefixes
+# rely on implicit prefix caching (Gemini 2.5, OpenAI, DeepSeek) instead
+EXPLICIT_CACHE_MIN_TOKENS = {
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-pro": 4096,
+}
+DEFAULT_EXPLICIT_CACHE_MIN_TOKENS = 4096
+
+# How long an explicit cache lives on the provider side
+CACHE_TTL = "3600s"
+
+# Everything that doesn't change between pages; the page itself goes in the user message
+PREFIX_TEMPLATE = """You extract structured data from web page content. The user message contains the URL of a page in <url> tags and its content in <url_content> tags.
+
+The user has made the following request for what information to extract from that content:
+
+<user_request>
+{REQUEST}
+</user_request>
+
+<schema_block>
+{SCHEMA}
+</schema_block>
+
+Extract the requested information from the URL content according to the schema in the <schema_block> above.
+
+Extraction instructions:
+Return the extracted information as a list of JSON objects, with each object in the list corresponding to a block of content from the URL, in the same order as it appears on the page. Wrap the entire JSON list in <blocks>...</blocks> XML tags.
+
+Avoid Common Mistakes:
+- Do NOT add any comments using "//" or "#" in the JSON output. It causes parsing errors.
+- Make sure the JSON is properly formatted with curly braces, square brackets, and commas in the right places.
+- Do not miss closing </blocks> tag at the end of the JSON output.
+- Do not generate Python code showing how to do the task; this is your task to extract the information and return it in JSON format.
+
+Result
+Output the final list of JSON objects, wrapped in <blocks>...</blocks> XML tags. Make sure to close the tag properly."""
+
+PAGE_TEMPLATE = """Here is the content from the URL:
+<url>{URL}</url>
+
+<url_content>
+{HTML}
+</url_content>"""
+
+
+# crawl4ai's completion helpers: extract looks the sync one up in its module,
+# aextract imports the async one from crawl4ai.utils on every call
+COMPLETION_HELPERS = (
+    (crawl4ai.extraction_strategy, "perform_completion_with_backoff"),
+    (crawl4ai.utils, "aperform_completion_with_backoff"),
+)
+
+# Messages of the extraction call in progress (set by CachedPrefixExtractionStrategy)
+_call_messages = ContextVar("prompt_cache_messages", default=None)
+
+_patch_lock = threading.Lock()
+_patch_depth = 0
+_originals = []
+
+
+def _with_messages(completion):
+    def call(provider, prompt_with_variables, api_token, *args, **kwargs):
+        messages = _call_messages.get()
+        if messages is not None:
+            kwargs["messages"] = messages
+        return completion(provider, prompt_with_variables, api_token, *args, **kwargs)
+    return call
+
+
+@contextmanager
+def _sending(messages):
+    """
+    crawl4ai builds a one-message prompt inside extract/aextract and has no
+    hook for it, but its completion helpers take messages=. While a call of
+    ours is in flight they are wrapped to send `messages` instead; calls made
+    outside this context (other strategies, other threads) pass through
+    unchanged, and the helpers are restored when the last call of ours ends.
+    """
+    global _patch_depth
+    token = _call_messages.set(messages)
+    with _patch_lock:
+        if _patch_depth == 0:
+            for module, name in COMPLETION_HELPERS:
+                _originals.append((module, name, getattr(module, name)))
+                setattr(module, name, _with_messages(getattr(module, name)))
+        _patch_depth += 1
+    try:
+        yield
+    finally:
+        with _patch_lock:
+            _patch_depth -= 1
+            if _patch_depth == 0:
+                for module, name, original in _originals:
+                    setattr(module, name, original)
+                _originals.clear()
+        _call_messages.reset(token)
+
+
+def estimate_tokens(text, model=None):
+    """Token count of text for model (litellm's tokenizer), ~4 chars per token if unavailable"""
+    try:
+        import litellm
+        return litellm.token_counter(model=model or "gpt-4o", text=text)
+    except Exception:
+        return len(text) // 4
+
+
+class CachedPrefixExtractionStrategy(LLMExtractionStrategy):
+    """
+    LLMExtractionStrategy whose prompt is split into a static system message
+    (instruction, schema and output rules, identical for every page) and a
+    user message with the page. crawl4ai's own prompt puts the page first,
+    so no two calls share a prefix and nothing can be cached.
+
+    With the static part first, providers with implicit prefix caching
+    (Gemini 2.5, OpenAI, DeepSeek) bill it at the cached rate from the second
+    call on. When the prefix is large enough for the model, it is also marked
+    with cache_control, so litellm creates an explicit context cache and
+    references it instead of re-sending the text.
+
+    Usage:
+        strategy = CachedPrefixExtractionStrategy(llm_config=..., schema=..., instruction=...)
+        ...
+        print(strategy.prefix_cache_report())
+    """
+
+    # The deprecated provider/api_token/base_url/api_base arguments stay in the
+    # signature: LLMExtractionStrategy.__setattr__ looks up their defaults there
+    def __init__(self, llm_config=None, instruction=None, schema=None, explicit_cache=None, cache_ttl=CACHE_TTL,
+                 provider=DEFAULT_PROVIDER, api_token=None, base_url=None, api_base=None, **kwargs):
+        for module, name in COMPLETION_HELPERS:
+            if "messages" not in inspect.signature(getattr(module, name)).parameters:
+                raise RuntimeError(f"{module.__name__}.{name} takes no messages; this crawl4ai version "
+                                   "can't send a cached prefix")
+        super().__init__(llm_config=llm_config, instruction=instruction, schema=schema, provider=provider,
+                         api_token=api_token, base_url=base_url, api_base=api_base, **kwargs)
+        self.prefix = PREFIX_TEMPLATE.replace("{REQUEST}", self.instruction or "").replace(
+            "{SCHEMA}", json.dumps(self.schema, indent=2) if self.schema else "Infer a suitable schema."
+        )
+        model = self.llm_config.provider
+        self.prefix_tokens = estimate_tokens(self.prefix, model)
+        if explicit_cache is None:
+            min_tokens = EXPLICIT_CACHE_MIN_TOKENS.get(model.split("/")[-1], DEFAULT_EXPLICIT_CACHE_MIN_TOKENS)
+            explicit_cache = self.prefix_tokens >= min_tokens
+        self.explicit_cache = explicit_cache
+        self.cache_ttl = cache_ttl
+
+    def _messages(self, url, html):
+        system = self.prefix
+        if self.explicit_cache:
+            system = [{"type": "text", "text": self.prefix, "cache_control": {"type": "ephemeral", "ttl": self.cache_ttl}}]
+        page = PAGE_TEMPLATE.replace("{URL}", url).replace("{HTML}", escape_json_string(sanitize_html(html)))
+        return [{"role": "system", "content": system}, {"role": "user", "content": page}]
+
+    # Prompt building, response parsing and usage tracking are LLMExtractionStrategy's;
+    # only the messages sent differ
+    def extract(self, url, ix, html):
+        with _sending(self._messages(url, html)):
+            return super().extract(url, ix, html)
+
+    async def aextract(self, url, ix, html):
+        with _sending(self._messages(url, html)):
+            return await super().aextract(url, ix, html)
+
+    def prefix_cache_report(self):
+        """
+        Token accounting of the static prefix over all calls so far.
+
+        Returns:
+            {"calls", "explicit_cache", "prefix_tokens" (per call),
+             "prefix_tokens_sent" (calls x prefix), "prompt_tokens",
+             "cached_tokens" (reported by the provider), "saved_share"
+             (cached share of the prefix tokens sent)}
+        """
+        calls = len(self.usages)
+        prefix_tokens_sent = calls * self.prefix_tokens
+        cached = sum(cached_prompt_tokens(usage) for usage in self.usages)
+        return {
+            "calls": calls,
+            "explicit_cache": self.explicit_cache,
+            "prefix_tokens": self.prefix_tokens,
+            "prefix_tokens_sent": prefix_tokens_sent,
+            "prompt_tokens": self.total_usage.prompt_tokens,
+            "cached_tokens": cached,
+            "saved_share": round(min(cached, prefix_tokens_sent) / prefix_tokens_sent, 4) if prefix_tokens_sent else 0.0,
+        }
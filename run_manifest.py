@@ -0,0 +1,152 @@
+"""
+Run Manifest
+Per-URL stage checkpoints for batch runs, so a resumed run picks each URL up
+after its last completed stage instead of re-rendering and re-prompting everything
+"""
+import hashlib
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+
+MANIFEST_PATH = "./data/run_manifest.db"
+
+# Artifact kind of the file each website stage produces
+STAGE_KINDS = {
+    "get_full_html": "html_all",
+    "get_specific_html": "html_only",
+    "get_imp_html": "html_only_imp",
+    "get_json_insights": "json",
+    "get_api_insights": "json",
+}
+
+
+def batch_run_name(urls):
+    """Stable name for a batch: the same URL list resumes the same manifest"""
+    return "batch_" + hashlib.sha1("\n".join(urls).encode("utf-8")).hexdigest()[:12]
+
+
+def file_sha256(path):
+    """sha256 of a file's content, None if it doesn't exist"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RunManifest:
+    """
+    SQLite record of which stages finished for each URL of a named run,
+    with the file each stage wrote and the sha256 of its content.
+
+    A stage counts as done only if its file still has that hash. When the
+    file was overwritten or deleted, it is restored from the artifact store
+    (if one is given and holds the blob) instead of rerunning the stage.
+
+    Usage:
+        manifest = RunManifest("tariffs_2025_01", artifact_store=ArtifactStore())
+        if not manifest.is_done(url, "get_full_html"):
+            get_full_html(url, name)
+            manifest.record(url, "get_full_html", path, run_id)
+        manifest.clear()   # once the whole batch succeeded
+    """
+
+    def __init__(self, run_name, db_path=MANIFEST_PATH, artifact_store=None):
+        self.run_name = run_name
+        self.db_path = db_path
+        self.artifact_store = artifact_store
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS stages (
+                    run_name TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    finished_at TEXT NOT NULL,
+                    PRIMARY KEY (run_name, url, stage)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _row(self, url, stage):
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT * FROM stages WHERE run_name = ? AND url = ? AND stage = ?",
+                (self.run_name, url, stage)
+            ).fetchone()
+
+    def record(self, url, stage, file_path, run_id=None):
+        """
+        Mark a stage of url as finished with the file it wrote. The file is
+        also kept in the artifact store, if there is one: this is the only
+        place a checkpointed run stores its files.
+
+        Returns:
+            The artifact store's put() result ({"sha256", "size", "stored_size",
+            "deduplicated"}), or {"sha256"} without a store
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"{stage} output not found: {file_path}")
+        if self.artifact_store is not None:
+            stored = self.artifact_store.put_file(file_path, url, run_id or self.run_name, STAGE_KINDS.get(stage, stage))
+        else:
+            stored = {"sha256": file_sha256(file_path)}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?)",
+                (self.run_name, url, stage, file_path, stored["sha256"], datetime.now().isoformat(timespec="seconds"))
+            )
+        return stored
+
+    def is_done(self, url, stage):
+        """True if the stage finished and its output is on disk (restoring it from the store if needed)"""
+        row = self._row(url, stage)
+        if row is None:
+            return False
+        if file_sha256(row["file_path"]) == row["sha256"]:
+            return True
+        if self.artifact_store is None:
+            return False
+        try:
+            data = self.artifact_store.get(row["sha256"])
+        except (KeyError, FileNotFoundError):
+            return False
+        os.makedirs(os.path.dirname(row["file_path"]) or ".", exist_ok=True)
+        with open(row["file_path"], "wb") as f:
+            f.write(data)
+        print(f"♻️  Restored {row['file_path']} from the artifact store")
+        return True
+
+    def output_file(self, url, stage):
+        """File a finished stage wrote (e.g. the timestamped JSON of get_json_insights)"""
+        row = self._row(url, stage)
+        return row["file_path"] if row else None
+
+    def progress(self):
+        """{stage: number of URLs that finished it}"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT stage, COUNT(*) AS n FROM stages WHERE run_name = ? GROUP BY stage", (self.run_name,)
+            ).fetchall()
+        return {row["stage"]: row["n"] for row in rows}
+
+    def clear(self):
+        """Forget this run (call when it completed, so the next run of the same batch starts fresh)"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM stages WHERE run_name = ?", (self.run_name,))
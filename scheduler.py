@@ -0,0 +1,477 @@
+"""
+Scrape Scheduler
+Long-running daemon that re-scrapes a list of URLs on per-URL intervals
+through a persistent SQLite job queue, keeping browsers, the cleaning pool
+and the LLM client warm between jobs
+
+Usage:
+    python -m tools.scheduler --targets targets.json
+    python -m tools.scheduler --targets targets.json --once   # run what is due, then exit
+
+targets.json:
+    [
+        {"url": "https://www.orange.eg/ar/Tariff-Plans/FREEmax", "interval_minutes": 360},
+        {"url": "https://www.facebook.com/TelecomEgypt", "kind": "facebook", "interval_minutes": 720}
+    ]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from tools.scraper_1_all_pro import create_driver, get_bakat_name, get_full_html
+from tools.scraper_4_gemeni_json_gen import create_router, get_api_insights, get_json_insights
+from tools.html_cleaning_pool import HtmlCleaningPool
+from tools.host_limiter import HOST_LIMITER, HostLimiter
+from tools.artifact_store import ArtifactStore
+from tools.columnar_export import ColumnarExporter, tariff_plan_rows
+from tools.pipeline_metrics import RunMetrics, file_size
+from tools.websitescraping import ARTIFACT_KEEP_RUNS, remove_stored_files, stage_paths, store_artifacts
+
+
+QUEUE_PATH = "./data/scheduler.db"
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class JobQueue:
+    """
+    SQLite tables of scrape targets (url, kind, interval) and jobs.
+
+    A job is queued when its target is due, claimed by the daemon (running),
+    then done, or queued again with exponential backoff until max_attempts
+    is reached (failed). Each job records the stages it completed and the
+    JSON file its insights stage wrote.
+    """
+
+    def __init__(self, db_path=QUEUE_PATH, max_attempts=3, retry_delay_s=300):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.retry_delay_s = retry_delay_s
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS targets (
+                    url TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    bakat_name TEXT NOT NULL,
+                    interval_s INTEGER NOT NULL,
+                    next_run_at TEXT NOT NULL,
+                    enabled INTEGER NOT NULL DEFAULT 1
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    bakat_name TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    completed_stages TEXT NOT NULL DEFAULT '[]',
+                    output_file TEXT,
+                    due_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    error TEXT
+                )
+            """)
+            # Queues created before output_file existed
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "output_file" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN output_file TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, due_at)")
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def sync_targets(self, targets):
+        """
+        Make the targets table match a list of {"url", "kind", "interval_minutes"}:
+        new URLs are due now, known ones keep their schedule, missing ones are disabled.
+        """
+        urls = [target["url"] for target in targets]
+        # Names for the stage files; unique across all targets
+        bakat_name = get_bakat_name(urls)
+        now = _now()
+        with self._connect() as conn:
+            conn.execute("UPDATE targets SET enabled = 0")
+            for i, target in enumerate(targets):
+                conn.execute(
+                    """INSERT INTO targets (url, kind, bakat_name, interval_s, next_run_at, enabled)
+                       VALUES (?, ?, ?, ?, ?, 1)
+                       ON CONFLICT (url) DO UPDATE SET kind = excluded.kind, bakat_name = excluded.bakat_name,
+                           interval_s = excluded.interval_s, enabled = 1""",
+                    (target["url"], target.get("kind", "website"), bakat_name[i],
+                     int(target.get("interval_minutes", 360) * 60), now)
+                )
+
+    def recover(self):
+        """Jobs left running by a crashed daemon go back to the queue"""
+        with self._connect() as conn:
+            return conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'").rowcount
+
+    def enqueue_due(self):
+        """
+        Queue one job per due target that has no job pending. A target that
+        missed several intervals (daemon down) gets a single job.
+        """
+        now = datetime.now()
+        with self._connect() as conn:
+            due = conn.execute("""
+                SELECT * FROM targets
+                WHERE enabled = 1 AND next_run_at <= ?
+                  AND url NOT IN (SELECT url FROM jobs WHERE status IN ('queued', 'running'))
+            """, (now.isoformat(timespec="seconds"),)).fetchall()
+            for target in due:
+                conn.execute(
+                    "INSERT INTO jobs (url, kind, bakat_name, status, due_at) VALUES (?, ?, ?, 'queued', ?)",
+                    (target["url"], target["kind"], target["bakat_name"], now.isoformat(timespec="seconds"))
+                )
+                next_run_at = now + timedelta(seconds=target["interval_s"])
+                conn.execute("UPDATE targets SET next_run_at = ? WHERE url = ?",
+                             (next_run_at.isoformat(timespec="seconds"), target["url"]))
+        return len(due)
+
+    def claim(self, limit):
+        """Mark up to `limit` due jobs as running and return them"""
+        if limit <= 0:
+            return []
+        with self._connect() as conn:
+            jobs = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND due_at <= ? ORDER BY due_at, id LIMIT ?",
+                (_now(), limit)
+            ).fetchall()
+            for job in jobs:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE id = ?",
+                    (_now(), job["id"])
+                )
+        return [{**dict(job), "attempts": job["attempts"] + 1} for job in jobs]
+
+    def mark_stage(self, job_id, stage, output_file=None):
+        """Record a completed stage (and the file it wrote) so a retry starts after it"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT completed_stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            stages = json.loads(row["completed_stages"])
+            if stage not in stages:
+                stages.append(stage)
+            conn.execute("UPDATE jobs SET completed_stages = ? WHERE id = ?", (json.dumps(stages), job_id))
+            if output_file is not None:
+                conn.execute("UPDATE jobs SET output_file = ? WHERE id = ?", (output_file, job_id))
+
+    def complete(self, job_id):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'done', finished_at = ?, error = NULL WHERE id = ?",
+                         (_now(), job_id))
+
+    def fail(self, job_id, error):
+        """Queue the job again with backoff, or mark it failed after max_attempts"""
+        with self._connect() as conn:
+            job = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job["attempts"] >= self.max_attempts:
+                conn.execute("UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                             (_now(), error, job_id))
+                return False
+            due_at = datetime.now() + timedelta(seconds=self.retry_delay_s * 2 ** (job["attempts"] - 1))
+            conn.execute("UPDATE jobs SET status = 'queued', due_at = ?, error = ? WHERE id = ?",
+                         (due_at.isoformat(timespec="seconds"), error, job_id))
+            return True
+
+    def pending(self, due_only=True):
+        """Number of queued jobs (only those due now by default)"""
+        query = "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+        params = ()
+        if due_only:
+            query += " AND due_at <= ?"
+            params = (_now(),)
+        with self._connect() as conn:
+            return conn.execute(query, params).fetchone()[0]
+
+    def counts(self):
+        """{status: number of jobs}"""
+        with self._connect() as conn:
+            return {row["status"]: row["n"] for row in
+                    conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()}
+
+
+class Scheduler:
+    """
+    Runs queued jobs with warm resources:
+    - browser_workers threads, each keeping its own headless Chrome, or with
+      fetch_backend="async" one shared crawl4ai browser rendering up to
+      browser_workers pages at once while other jobs are in the LLM stage
+    - an HtmlCleaningPool of clean_workers processes
+    - llm_workers threads sharing one model router (Gemini Flash, escalating to Pro)
+
+    Args:
+        queue: JobQueue
+        browser_workers / clean_workers / llm_workers: Pool sizes
+        limiter: HostLimiter every fetch goes through (default: the process-wide HOST_LIMITER)
+        poll_s: Seconds between checks for due jobs
+        fetch_backend: "selenium" or "async" (website pages only; Facebook jobs keep their own browser)
+        capture_api: Record the pages' same-origin JSON API responses; a page whose
+            responses hold its plans skips cleaning and the LLM
+        headless: Run the Facebook browser headless (website pages always are)
+    """
+
+    def __init__(self, queue, browser_workers=2, clean_workers=None, llm_workers=4,
+                 limiter=None, poll_s=5.0, fetch_backend="selenium", capture_api=False, headless=True):
+        if fetch_backend not in ("selenium", "async"):
+            raise ValueError(f"Unknown fetch backend: {fetch_backend}")
+        self.queue = queue
+        self.poll_s = poll_s
+        self.capture_api = capture_api
+        self.headless = headless
+        self.max_jobs = browser_workers + llm_workers
+        self.limiter = limiter or HOST_LIMITER
+        self.browser_pool = ThreadPoolExecutor(browser_workers, thread_name_prefix="browser")
+        self.cleaning_pool = HtmlCleaningPool(clean_workers)
+        self.llm_pool = ThreadPoolExecutor(llm_workers, thread_name_prefix="llm")
+        self.job_pool = ThreadPoolExecutor(self.max_jobs, thread_name_prefix="job")
+        self.artifact_store = ArtifactStore()
+        self.exporter = ColumnarExporter()
+        self._export_lock = threading.Lock()
+        self._facebook_lock = threading.Lock()
+        self._router = None
+        self._router_lock = threading.Lock()
+        self._local = threading.local()
+        self._drivers = []
+        self._fetcher = None
+        if fetch_backend == "async":
+            # Imported here so Selenium schedules don't need crawl4ai
+            from tools.async_fetch import ThreadedPageFetcher
+            self._fetcher = ThreadedPageFetcher(concurrency=browser_workers, limiter=self.limiter)
+        self._running = set()
+        self._stop = threading.Event()
+
+    # --- Warm resources ---
+
+    def _driver(self):
+        # One Chrome per browser thread, reused across jobs
+        if getattr(self._local, "driver", None) is None:
+            self._local.driver = create_driver(self.capture_api)
+            self._drivers.append(self._local.driver)
+        return self._local.driver
+
+    def _drop_driver(self):
+        # A failed fetch may have left Chrome in a bad state; the next job starts a fresh one
+        driver = getattr(self._local, "driver", None)
+        self._local.driver = None
+        if driver is not None:
+            self._drivers.remove(driver)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def _fetch(self, url, bakat_name_each, api_responses=None):
+        try:
+            get_full_html(url, bakat_name_each, prettify=False, driver=self._driver(), limiter=self.limiter,
+                          api_responses=api_responses)
+        except Exception:
+            self._drop_driver()
+            raise
+
+    def _llm(self):
+        with self._router_lock:
+            if self._router is None:
+                self._router = create_router()
+            return self._router
+
+    def routing_report(self):
+        """Per-tier statistics of the model router (None before the first LLM job)"""
+        return self._router.report() if self._router is not None else None
+
+    # --- Jobs ---
+
+    def _run_website_job(self, job):
+        url = job["url"]
+        done = set(json.loads(job["completed_stages"]))
+        paths = stage_paths(job["bakat_name"])
+        metrics = RunMetrics("website", url)
+        try:
+            # A retry after a failed export or artifact store reuses the insights of the previous attempt
+            output_file = job.get("output_file")
+            if not output_file or not os.path.exists(output_file):
+                output_file = self._website_insights(job, done, paths, metrics)
+
+            with open(output_file, "r", encoding="utf-8") as f:
+                rows = tariff_plan_rows(json.load(f), url, metrics.run_id)
+            with self._export_lock:
+                self.exporter.add("tariff_plans", rows)
+            with metrics.stage("store_artifacts") as store_stage:
+                store_artifacts(self.artifact_store, url, metrics.run_id,
+                                {**paths, "json": output_file}, store_stage)
+            remove_stored_files(job["bakat_name"], output_file)
+        finally:
+            metrics.export_jsonl()
+
+    def _website_insights(self, job, done, paths, metrics):
+        # Stages 1-4 of a website job; returns the JSON file of the page's plans
+        url, name = job["url"], job["bakat_name"]
+        api_responses = None
+        # Stages whose output is missing are redone even if recorded as completed
+        if "get_full_html" not in done or not os.path.exists(paths["html_all"]):
+            api_responses = [] if self.capture_api else None
+            with metrics.stage("get_full_html") as stage:
+                if self._fetcher is not None:
+                    # Rendered on the fetcher's event loop; this job thread just waits for its page
+                    stage["backend"] = "async"
+                    self._fetcher.submit(url, name, False, stage, api_responses).result()
+                else:
+                    self.browser_pool.submit(self._fetch, url, name, api_responses).result()
+                stage["bytes_out"] = file_size(paths["html_all"])
+            self.queue.mark_stage(job["id"], "get_full_html")
+
+        # Plans found in the page's API responses skip cleaning and the LLM
+        from_api = False
+        if api_responses is not None:
+            with metrics.stage("get_api_insights") as stage:
+                from_api = get_api_insights(name, api_responses, metrics=stage) is not None
+
+        if not from_api:
+            if "clean_html" not in done or not os.path.exists(paths["html_only_imp"]):
+                with metrics.stage("clean_html") as stage:
+                    cleaned = self.cleaning_pool.submit_saved_page(name).result()
+                    stage.update(bytes_in=cleaned["bytes_in"], bytes_out=cleaned["bytes_out"])
+                self.queue.mark_stage(job["id"], "clean_html")
+
+            with metrics.stage("get_json_insights") as stage:
+                self.llm_pool.submit(get_json_insights, name, stage, None, self._llm()).result()
+
+            # Checkpointed before export so a retry doesn't call the LLM again
+            self.queue.mark_stage(job["id"], "get_json_insights", stage["output_file"])
+        else:
+            self.queue.mark_stage(job["id"], "get_api_insights", stage["output_file"])
+        return stage["output_file"]
+
+    def _run_facebook_job(self, job):
+        # Imported here so website-only schedules don't need crawl4ai
+        from tools.facebook_basic_scroll import facebook_scraper_tool
+
+        # The Facebook session directory allows one browser at a time
+        with self._facebook_lock:
+            output = self.browser_pool.submit(
+                facebook_scraper_tool.invoke, {"page_url": job["url"], "headless": self.headless}
+            ).result()
+        response = json.loads(output.removeprefix("data:"))
+        if not response.get("success"):
+            raise RuntimeError(response.get("error", "Unknown error"))
+
+    def _run_job(self, job):
+        print(f"▶️  Job {job['id']} ({job['kind']}, attempt {job['attempts']}): {job['url']}")
+        try:
+            if job["kind"] == "facebook":
+                self._run_facebook_job(job)
+            else:
+                self._run_website_job(job)
+        except Exception as e:
+            retrying = self.queue.fail(job["id"], str(e))
+            print(f"❌ Job {job['id']} failed: {e} ({'will retry' if retrying else 'giving up'})")
+        else:
+            self.queue.complete(job["id"])
+            print(f"✅ Job {job['id']} done: {job['url']}")
+
+    # --- Main loop ---
+
+    def run_forever(self, once=False):
+        """Queue due targets and run jobs until stop() (or, with once, until nothing is due)"""
+        recovered = self.queue.recover()
+        if recovered:
+            print(f"🔁 Re-queued {recovered} interrupted jobs")
+        try:
+            while not self._stop.is_set():
+                self.queue.enqueue_due()
+                for job in self.queue.claim(self.max_jobs - len(self._running)):
+                    future = self.job_pool.submit(self._run_job, job)
+                    self._running.add(future)
+                    future.add_done_callback(self._running.discard)
+
+                if not self._running:
+                    # Idle: write buffered analytics rows and drop expired artifacts
+                    with self._export_lock:
+                        self.exporter.flush()
+                    self.artifact_store.gc(keep_runs=ARTIFACT_KEEP_RUNS)
+                    if once and not self.queue.pending():
+                        break
+                self._stop.wait(self.poll_s)
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        self.job_pool.shutdown(wait=True)
+        self.browser_pool.shutdown(wait=True)
+        self.llm_pool.shutdown(wait=True)
+        self.cleaning_pool.close()
+        with self._export_lock:
+            self.exporter.close()
+        for driver in list(self._drivers):
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self._drivers.clear()
+        if self._fetcher is not None:
+            self._fetcher.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run recurring scrapes from a persistent job queue")
+    parser.add_argument("--targets", required=True, help="JSON list of {url, kind, interval_minutes}")
+    parser.add_argument("--queue", default=QUEUE_PATH)
+    parser.add_argument("--browser-workers", type=int, default=2, help="Chrome threads, or pages at once with --fetch-backend async")
+    parser.add_argument("--fetch-backend", choices=("selenium", "async"), default="selenium",
+                        help="async: render website pages in one shared crawl4ai browser")
+    parser.add_argument("--capture-api", action="store_true",
+                        help="Take the plans from the pages' JSON API responses when they hold them (no cleaning or LLM)")
+    parser.add_argument("--headed", action="store_true", help="Show the browser of Facebook jobs")
+    parser.add_argument("--clean-workers", type=int, default=None, help="Default: one per core")
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--host-rate", type=float, default=0.5, help="Requests per second per host")
+    parser.add_argument("--host-in-flight", type=int, default=1, help="Concurrent requests per host")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--retry-delay", type=float, default=300, help="First retry delay in seconds")
+    parser.add_argument("--poll", type=float, default=5.0)
+    parser.add_argument("--once", action="store_true", help="Run the jobs that are due, then exit")
+    args = parser.parse_args(argv)
+
+    with open(args.targets, "r", encoding="utf-8") as f:
+        targets = json.load(f)
+
+    queue = JobQueue(args.queue, args.max_attempts, args.retry_delay)
+    queue.sync_targets(targets)
+    limiter = HostLimiter(rate_per_s=args.host_rate, burst=3, max_in_flight=args.host_in_flight)
+    scheduler = Scheduler(queue, args.browser_workers, args.clean_workers, args.llm_workers, limiter, args.poll,
+                          args.fetch_backend, args.capture_api, headless=not args.headed)
+    print(f"🗓️  Scheduler started with {len(targets)} targets (queue: {args.queue})")
+    try:
+        scheduler.run_forever(once=args.once)
+    except KeyboardInterrupt:
+        scheduler.stop()
+    print(f"📋 Jobs: {queue.counts()}")
+    print(f"🚦 Hosts: {json.dumps(limiter.stats())}")
+    print(f"🧭 Model tiers: {json.dumps(scheduler.routing_report())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
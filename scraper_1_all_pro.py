@@ -5,18 +5,65 @@ from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 import time
 import os
+import re
+import hashlib
+from tools.artifact_store import url_key
+from tools.host_limiter import HOST_LIMITER
+from tools.api_capture import enable_performance_log, selenium_api_responses
 
 
 def get_bakat_name(link):
+    # File name of each page: its last path segment, readable, plus a hash of host and path, so pages
+    # with the same last segment on other hosts or paths never share files, in one batch or across calls
     bakat_name = []
-    for i in range(len(link)):
-        bakat_name.append(link[i].split("/")[-1])
-        if "-" in bakat_name[i]:
-            bakat_name[i] = bakat_name[i].replace("-", "_")
+    for url in link:
+        host, path = url_key(url)
+        segment = re.sub(r"\W+", "_", path.split("?")[0].rstrip("/").split("/")[-1] or host).strip("_")
+        digest = hashlib.sha1(f"{host}{path}".encode("utf-8")).hexdigest()[:8]
+        bakat_name.append(f"{segment}_{digest}")
     return bakat_name
 
 
-def get_full_html(link_each, bakat_name):
+def save_full_html(html_content, bakat_name, prettify=True):
+
+    # Parse and save full HTML (split out of get_full_html so it can run without a browser)
+    # The returned soup can be handed to the next stages so the page is parsed only once
+    soup = BeautifulSoup(html_content, "lxml")
+
+    # Define output file path
+    file_path_out = f"data/html_all/{bakat_name}_all_pro.html"
+
+    # Create directory if it doesn't exist
+    os.makedirs(os.path.dirname(file_path_out), exist_ok=True)
+
+    with open(file_path_out, "w", encoding="utf-8") as f:
+        # prettify() re-serialises the whole tree and inflates the file; without it page_source is stored as is
+        f.write(soup.prettify() if prettify else html_content)
+
+    print(f"✅ Full HTML saved to {file_path_out}")
+    return soup
+
+
+def create_driver(capture_api=False):
+
+    # Headless Chrome used by get_full_html
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    if capture_api:
+        # Network events in the performance log, so the page's JSON API responses can be read back
+        enable_performance_log(chrome_options)
+    return webdriver.Chrome(options=chrome_options)
+
+
+def get_full_html(link_each, bakat_name, prettify=True, driver=None, limiter=None, challenge_retries=2,
+                  api_responses=None):
+
+    # Every request to the host goes through the per-host limiter (shared by all calls in the process)
+    limiter = limiter or HOST_LIMITER
+    # With an api_responses list, the same-origin JSON responses of the page load are appended to it
+    capture_api = api_responses is not None
 
     # --- Step 1: Create scraper to bypass protection ---
     scraper = cloudscraper.create_scraper(
@@ -24,20 +71,21 @@ def get_full_html(link_each, bakat_name):
     )
 
     # Get initial response
-    resp = scraper.get(link_each)
+    with limiter.slot(link_each):
+        resp = scraper.get(link_each)
+    limiter.report(link_each, resp.status_code, resp.text, resp.headers)
 
-    # --- Step 2: Setup Selenium in headless mode ---
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    driver = webdriver.Chrome(options=chrome_options)
+    # --- Step 2: Setup Selenium in headless mode (unless a running driver is reused) ---
+    own_driver = driver is None
+    if own_driver:
+        driver = create_driver(capture_api)
 
     try:
         # --- Step 3: Extract base domain and load it first ---
         parsed = urlparse(link_each)
         base_url = f"{parsed.scheme}://{parsed.netloc}"
-        driver.get(base_url)
+        with limiter.slot(base_url):
+            driver.get(base_url)
         time.sleep(2)
 
         # --- Step 4: Add cookies safely ---
@@ -51,28 +99,26 @@ def get_full_html(link_each, bakat_name):
             except Exception:
                 pass  # Ignore invalid cookies
 
-        # --- Step 5: Navigate to target link_each ---
-        driver.get(link_each)
-        time.sleep(5)
-
-        # --- Step 6: Parse and save full HTML ---
-        html_content = driver.page_source
-        soup = BeautifulSoup(html_content, "lxml")
-
-        # Define output file path
-        file_path_out = f"data/html_all/{bakat_name}_all_pro.html"
-
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(file_path_out), exist_ok=True)
+        # --- Step 5: Navigate to target link_each (again, after the host's backoff, if it served a challenge) ---
+        for attempt in range(challenge_retries + 1):
+            with limiter.slot(link_each):
+                driver.get(link_each)
+            time.sleep(5)
+            html_content = driver.page_source
+            if not limiter.report(link_each, html=html_content):
+                break
+            print(f"⚠️ Challenge page from {parsed.netloc} (attempt {attempt + 1}), backing off")
 
-        with open(file_path_out, "w", encoding="utf-8") as f:
-            f.write(soup.prettify())
+        if capture_api:
+            # Read right after the load, before the response bodies are evicted
+            api_responses += selenium_api_responses(driver, link_each)
 
-        print(f"✅ Full HTML saved to {file_path_out}")
-        return soup
+        # --- Step 6: Parse and save full HTML ---
+        return save_full_html(html_content, bakat_name, prettify)
 
     finally:
-        driver.quit()
+        if own_driver:
+            driver.quit()
 
 
 if __name__ == "__main__":
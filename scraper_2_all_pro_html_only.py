@@ -4,15 +4,7 @@ import cloudscraper
 from tools.scraper_1_all_pro import get_bakat_name
 
 
-def get_specific_html(bakat_name_each):
-    
-    # Read the HTML file
-    file_path_in = f"data/html_all/{bakat_name_each}_all_pro.html"
-    with open(file_path_in, "r", encoding="utf-8") as f:
-        html_content = f.read()
-
-    # Parse HTML
-    soup = BeautifulSoup(html_content, "html.parser")
+def strip_assets(soup):
 
     # --- Remove all <style> tags ---
     for style_tag in soup.find_all('style'):
@@ -35,6 +27,21 @@ def get_specific_html(bakat_name_each):
         for tag in soup.find_all(tag_name):
             tag.decompose()
 
+    return soup
+
+
+def get_specific_html(bakat_name_each, soup=None):
+
+    # Reuse the soup of the previous stage if given, otherwise read the HTML file
+    if soup is None:
+        file_path_in = f"data/html_all/{bakat_name_each}_all_pro.html"
+        with open(file_path_in, "r", encoding="utf-8") as f:
+            html_content = f.read()
+        soup = BeautifulSoup(html_content, "html.parser")
+
+    # Remove CSS, JS and images (in place, so a shared soup stays cleaned for stage 3)
+    cleaned = str(strip_assets(soup))
+
     # Define output file path
     file_path_out = f"data/html_only/{bakat_name_each}_html_only.html"
 
@@ -43,7 +50,7 @@ def get_specific_html(bakat_name_each):
 
     # Save cleaned HTML to a new file
     with open(file_path_out, "w", encoding="utf-8") as f:
-        f.write(str(soup))
+        f.write(cleaned)
 
 
 if __name__ == "__main__":
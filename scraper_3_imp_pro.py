@@ -4,15 +4,7 @@ import cloudscraper
 from tools.scraper_1_all_pro import get_bakat_name
 
 
-def get_imp_html(bakat_name_each):
-
-    # Read the HTML file
-    file_path_in = f"data/html_only/{bakat_name_each}_html_only.html"
-    with open(file_path_in, "r", encoding="utf-8") as f:
-        html_content = f.read()
-
-    # Parse HTML
-    soup = BeautifulSoup(html_content, "html.parser")
+def find_main_container(soup):
 
     # Check for different possible containers
 
@@ -42,6 +34,20 @@ def get_imp_html(bakat_name_each):
     elif soup.find("main", class_="position-relative"):
         content = soup.find("main", class_="position-relative")
 
+    return content
+
+
+def get_imp_html(bakat_name_each, soup=None):
+
+    # Reuse the cleaned soup of the previous stage if given, otherwise read the HTML file
+    if soup is None:
+        file_path_in = f"data/html_only/{bakat_name_each}_html_only.html"
+        with open(file_path_in, "r", encoding="utf-8") as f:
+            html_content = f.read()
+        soup = BeautifulSoup(html_content, "html.parser")
+
+    # Keep only the carrier's main content container
+    content = str(find_main_container(soup))
 
     # Define output file path
     file_path_out = f"data/html_only_imp/{bakat_name_each}_imp_pro.html"
@@ -51,7 +57,7 @@ def get_imp_html(bakat_name_each):
 
     # Save cleaned HTML to a new file
     with open(file_path_out, "w", encoding="utf-8") as f:
-        f.write(str(content))
+        f.write(content)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,126 @@
 import json
+import re
+import time
+from typing import List, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 # from langchain_community.chat_models import ChatDeepSeek
+from pydantic import BaseModel, Field
 from tools.scraper_1_all_pro import get_bakat_name
+from tools.columnar_export import tariff_items, tariff_plan_fields
+from tools.model_router import ModelRouter, schema_problems
 import os
 
-def get_json_insights(bakat_name_each):
-    
+
+# Model tiers of get_json_insights, cheapest first; a page goes to the next
+# tier only if the JSON of the previous one fails validate_tariff_output
+MODEL_TIERS = ("gemini-2.5-flash", "gemini-2.5-pro")
+
+# A price on the page: a number next to a currency (EGP, LE, جنيه, ج.م)
+CURRENCY = r"(?:\bEGP\b|\bLE\b|جنيه|ج\.?م)"
+PRICE_PATTERN = re.compile(rf"\d[\d,.]*\s*{CURRENCY}|{CURRENCY}\s*\d", re.IGNORECASE)
+
+
+# Pages under this many tokens are packed together into shared requests
+# (get_json_insights_batch), up to BATCH_TOKEN_BUDGET page tokens per request
+SMALL_PAGE_TOKENS = 2_000
+BATCH_TOKEN_BUDGET = 12_000
+
+# Pages per packed request, so the answer stays well under the model's output limit
+MAX_BATCH_PAGES = 20
+
+# Rough token estimate used for packing
+CHARS_PER_TOKEN = 4
+
+# Prompt of a packed request; {COUNT} and {DOCUMENTS} are filled in per batch
+BATCH_PROMPT = """
+    keeping the same language (don't translate arabic words to english and english remains english):
+
+    You are an intelligent web data extractor.
+
+    Below are {COUNT} separate HTML documents, each one between <document id="..."> and </document>.
+    Convert EACH document on its own into a **structured, insightful JSON** format.
+    Focus on extracting meaningful information, such as:
+    - Plan or product names
+    - Prices or costs
+    - Descriptions, features, and benefits
+    - Duration, data, or call limits (if present)
+    - Any other relevant insights
+
+    Return only one valid JSON object whose keys are the document ids and whose values are the JSON of
+    each document. Every document id must be a key. Never mix information of different documents.
+    Do not include explanations or markdown formatting.
+
+    {DOCUMENTS}
+    """
+
+
+class TariffPlan(BaseModel):
+    """Required fields of a plan record in an API payload (under any name/price key tariff_plan_fields knows)"""
+    name: str = Field(min_length=1, description="Plan or product name")
+    price: Optional[str] = Field(default=None, description="Price or cost as written on the page")
+
+
+class TariffPlans(BaseModel):
+    """The plans found in one API response (see tariff_payload)"""
+    plans: List[TariffPlan] = Field(min_length=1, description="At least one plan per tariff page")
+
+
+def _leaf_values(data):
+    # Scalar values anywhere in a JSON document
+    if isinstance(data, dict):
+        for value in data.values():
+            yield from _leaf_values(value)
+    elif isinstance(data, list):
+        for value in data:
+            yield from _leaf_values(value)
+    elif data not in (None, ""):
+        yield data
+
+
+def validate_tariff_output(output, html_content=""):
+    """
+    Structural problems with the JSON a model produced for a page (empty if
+    it is fine): it must hold some content, and if the page shows prices,
+    some number. The output is free-form, so key names aren't checked;
+    JSON that doesn't parse fails before this (and escalates as well).
+    """
+    _, data = output
+    values = list(_leaf_values(data)) if isinstance(data, (dict, list)) else []
+    if not values:
+        return ["the output holds no plans"]
+    if PRICE_PATTERN.search(html_content) and not any(re.search(r"\d", str(value)) for value in values):
+        return ["the page lists prices but the output has no number"]
+    return []
+
+
+def estimate_tokens(text):
+    """Approximate token count of a page (CHARS_PER_TOKEN characters per token)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def parse_model_output(raw_output):
+    """JSON of a model answer, with or without a ```json fence"""
+    raw_output = raw_output.strip()
+    try:
+        return json.loads(raw_output)
+    except json.JSONDecodeError:
+        print("⚠️ Cleaning Gemini output...")
+        cleaned = raw_output.split("```json")[-1].split("```")[0].strip()
+        return json.loads(cleaned)
+
+
+def create_router(models=None):
+    """
+    ModelRouter over MODEL_TIERS for get_json_insights. Ready models (anything
+    with .invoke(prompt)) can be passed instead, as (name, model) pairs.
+    """
+    tiers = models or [(name, create_model(name)) for name in MODEL_TIERS]
+    return ModelRouter(tiers, validate_tariff_output)
+
+
+def create_model(model_name=MODEL_TIERS[0]):
+    """The Gemini chat model used by get_json_insights"""
+
     # Load API key from environment variable
     from dotenv import load_dotenv
     load_dotenv()
@@ -14,13 +129,27 @@ def get_json_insights(bakat_name_each):
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment variables. Please create a .env file.")
     
-    # Step 1 — Initialize the Gemini model
-    model = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
+    return ChatGoogleGenerativeAI(
+        model=model_name,
         temperature=0.2,
         google_api_key=api_key
     )
 
+
+def get_json_insights(bakat_name_each, metrics=None, model=None, router=None):
+    """
+    Stage 4: turn the important HTML of a page into structured JSON with Gemini.
+    If a metrics dict is given, it is filled with the prompt size and token usage.
+    A ready model (anything with .invoke(prompt)) can be passed instead of Gemini;
+    otherwise the page goes through a ModelRouter (router, or a new one over
+    MODEL_TIERS), which escalates to a stronger model only if the JSON fails
+    validate_tariff_output.
+    """
+
+    if model is None and router is None:
+        # Step 1 — Initialize the Gemini models, cheapest first
+        router = create_router()
+
     # Alternative: DeepSeek
     # model = ChatDeepSeek(
     #     model="deepseek-chat",
@@ -53,20 +182,40 @@ def get_json_insights(bakat_name_each):
     {html_content}
     """
 
-    # Step 4 — Generate JSON output
-    response = model.invoke(prompt)
+    # Step 4 — Generate JSON output and parse it (every call is kept for the token counts)
+    responses = []
 
-    # Step 5 — Clean and parse model output
-    raw_output = response.content.strip()
+    def ask(tier_model):
+        response = tier_model.invoke(prompt)
+        responses.append(response)
+        return response, parse_model_output(response.content)
 
-    try:
-        data = json.loads(raw_output)
-    except json.JSONDecodeError:
-        print("⚠️ Cleaning Gemini output...")
-        cleaned = raw_output.split("```json")[-1].split("```")[0].strip()
-        data = json.loads(cleaned)
+    if router is not None:
+        (_, data), tier, problems = router.run(ask, html_content=html_content)
+    else:
+        (_, data), tier, problems = ask(model), None, []
+
+    if metrics is not None:
+        usages = [getattr(item, "usage_metadata", None) or {} for item in responses]
+        metrics["bytes_in"] = len(html_content.encode("utf-8"))
+        metrics["prompt_chars"] = len(prompt)
+        metrics["prompt_tokens"] = sum(usage.get("input_tokens", 0) for usage in usages)
+        metrics["completion_tokens"] = sum(usage.get("output_tokens", 0) for usage in usages)
+        if router is not None:
+            metrics["model_tier"] = tier
+            metrics["model_calls"] = len(responses)
+            metrics["validation_problems"] = len(problems)
+
+    # Step 5 — Warn when even the strongest model's JSON failed validation (it is saved anyway)
+    if problems:
+        print(f"⚠️ JSON for {bakat_name_each} failed validation: {problems[0]}")
         
     # Step 6 — Save to JSON file with timestamp
+    return save_insights(bakat_name_each, data, metrics)
+
+
+def save_insights(bakat_name_each, data, metrics=None):
+    """Write the JSON of one page to data/website_scraped_data_<name>_<timestamp>.json"""
     from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     file_path_out = f"data/website_scraped_data_{bakat_name_each}_{timestamp}.json"
@@ -77,9 +226,179 @@ def get_json_insights(bakat_name_each):
     with open(file_path_out, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+    if metrics is not None:
+        metrics["bytes_out"] = os.path.getsize(file_path_out)
+        metrics["output_file"] = file_path_out
+
     return f"✅ Insightful JSON successfully saved as: {file_path_out}"
 
 
+def tariff_payload(api_responses):
+    """
+    The page's JSON API response (api_capture) its plans come from, recognised
+    by its plan records: all of them named (TariffPlans) and at least one
+    with a price. Returns (url, plan records) of the response with the most
+    plans, or None.
+    """
+    best = None
+    for response in api_responses:
+        items = tariff_items(response["data"])
+        plans = [tariff_plan_fields(record) for record in items]
+        if schema_problems(TariffPlans, {"plans": plans}) or not any(plan["price"] for plan in plans):
+            continue
+        if best is None or len(items) > len(best[1]):
+            best = (response["url"], items)
+    return best
+
+
+def get_api_insights(bakat_name_each, api_responses, metrics=None):
+    """
+    Stage 4 without cleaning or LLM: if one of the JSON API responses of the
+    page load is a tariff payload, its plan records are saved as the page's
+    JSON. Returns None (the page then takes the HTML path) if none is.
+    """
+    payload = tariff_payload(api_responses)
+    if metrics is not None:
+        metrics["api_responses"] = len(api_responses)
+        metrics["recognised"] = payload is not None
+    if payload is None:
+        return None
+
+    url, plans = payload
+    if metrics is not None:
+        metrics["api_url"] = url
+        metrics["plans"] = len(plans)
+    print(f"🔌 {len(plans)} plans for {bakat_name_each} taken from {url}")
+    return save_insights(bakat_name_each, {"source_url": url, "plans": plans}, metrics)
+
+
+def pack_pages(page_tokens, token_budget=BATCH_TOKEN_BUDGET, small_page_tokens=SMALL_PAGE_TOKENS,
+               max_pages=MAX_BATCH_PAGES):
+    """
+    Group page indices into requests, keeping page order: consecutive small
+    pages share a request while their tokens fit in token_budget (at most
+    max_pages of them), pages larger than small_page_tokens get a request of
+    their own.
+    """
+    batches, current, used = [], [], 0
+    for i, tokens in enumerate(page_tokens):
+        if tokens > small_page_tokens:
+            batches.append([i])
+            continue
+        if current and (used + tokens > token_budget or len(current) >= max_pages):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def validate_batch_output(output, document_ids=()):
+    """Problems with a packed request's answer: it must be one JSON object with an entry per document"""
+    _, data = output
+    if not isinstance(data, dict):
+        return [f"expected an object keyed by document id, got {type(data).__name__}"]
+    missing = [document_id for document_id in document_ids if document_id not in data]
+    return [f"no entry for {', '.join(missing)}"] if missing else []
+
+
+def get_json_insights_batch(bakat_names, metrics=None, model=None, router=None, token_budget=BATCH_TOKEN_BUDGET,
+                            small_page_tokens=SMALL_PAGE_TOKENS):
+    """
+    Stage 4 for many pages: small pages are packed into shared requests
+    (pack_pages), each page between <document id="..."> delimiters, and the
+    answer, one JSON object keyed by document id, is split back into one
+    output file per page. Pages left alone in a request, and pages whose entry
+    is missing or (with a router) fails validate_tariff_output, go through
+    get_json_insights on their own.
+
+    metrics, if given, is a list with one dict per page; the time and tokens
+    of a shared request are divided between its pages by size.
+    Returns the get_json_insights message of every page, in order.
+    """
+    if model is None and router is None:
+        router = create_router()
+    metrics = metrics if metrics is not None else [{} for _ in bakat_names]
+
+    pages = []
+    for bakat_name_each in bakat_names:
+        with open(f"data/html_only_imp/{bakat_name_each}_imp_pro.html", "r", encoding="utf-8") as file:
+            pages.append(file.read())
+
+    results = [None] * len(bakat_names)
+    batches = pack_pages([estimate_tokens(page) for page in pages], token_budget, small_page_tokens)
+    for batch_index, batch in enumerate(batches):
+        if len(batch) == 1:
+            i = batch[0]
+            start = time.perf_counter()
+            results[i] = get_json_insights(bakat_names[i], metrics[i], model, router)
+            metrics[i]["wall_time_s"] = round(time.perf_counter() - start, 4)
+            continue
+
+        # One request for the whole batch
+        start = time.perf_counter()
+        document_ids = [f"page_{i}" for i in batch]
+        documents = "\n\n".join(f'<document id="{document_id}">\n{pages[i]}\n</document>'
+                                 for document_id, i in zip(document_ids, batch))
+        prompt = BATCH_PROMPT.replace("{COUNT}", str(len(batch))).replace("{DOCUMENTS}", documents)
+        responses = []
+
+        def ask(tier_model):
+            response = tier_model.invoke(prompt)
+            responses.append(response)
+            return response, parse_model_output(response.content)
+
+        try:
+            if router is not None:
+                # A stronger tier gets the batch if an entry is missing; invalid entries are redone one by one below.
+                # Its pages are counted once it is known which of them the batch resolved
+                (_, data), tier, _ = router.run(ask, validate=validate_batch_output, pages=0,
+                                                document_ids=document_ids)
+            else:
+                (_, data), tier = ask(model), None
+        except Exception as e:
+            # Unparseable answer, or a provider error (quota, timeout, blocked prompt) that
+            # may be down to the batch's size: every page of the batch is retried alone
+            print(f"⚠️ Batch of {len(batch)} pages failed ({e}), sending them one by one")
+            data, tier = {}, None
+        elapsed = time.perf_counter() - start
+
+        usages = [getattr(item, "usage_metadata", None) or {} for item in responses]
+        prompt_tokens = sum(usage.get("input_tokens", 0) for usage in usages)
+        completion_tokens = sum(usage.get("output_tokens", 0) for usage in usages)
+        batch_chars = sum(len(pages[i]) for i in batch) or 1
+
+        resolved = 0
+        for document_id, i in zip(document_ids, batch):
+            share = len(pages[i]) / batch_chars
+            page_data = data.get(document_id) if isinstance(data, dict) else None
+            if page_data is None or (router is not None and validate_tariff_output((None, page_data), pages[i])):
+                # Redo this page on its own (with its own model routing)
+                page_start = time.perf_counter()
+                results[i] = get_json_insights(bakat_names[i], metrics[i], model, router)
+                metrics[i].update(wall_time_s=round(time.perf_counter() - page_start + elapsed * share, 4),
+                                  batch_fallback=True)
+                continue
+            metrics[i].update(
+                bytes_in=len(pages[i].encode("utf-8")),
+                prompt_chars=round(len(prompt) * share),
+                prompt_tokens=round(prompt_tokens * share),
+                completion_tokens=round(completion_tokens * share),
+                wall_time_s=round(elapsed * share, 4),
+                batch_index=batch_index,
+                batch_pages=len(batch),
+            )
+            if router is not None:
+                metrics[i].update(model_tier=tier, model_calls=len(responses))
+            results[i] = save_insights(bakat_names[i], page_data, metrics[i])
+            resolved += 1
+        if router is not None and resolved:
+            # Pages redone on their own were counted by their own routing
+            router.record_pages(resolved, escalated=tier != router.tiers[0][0])
+    return results
+
 if __name__ == "__main__":
 
     # Run the function for different links
@@ -93,5 +412,7 @@ if __name__ == "__main__":
     bakat_name = get_bakat_name(link)
     # print(bakat_name)
 
+    router = create_router()
     for i in range(len(link)):
-        get_json_insights(bakat_name[i])
\ No newline at end of file
+        get_json_insights(bakat_name[i], router=router)
+    print(json.dumps(router.report(), indent=2))
\ No newline at end of file
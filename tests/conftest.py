@@ -0,0 +1,16 @@
+"""
+Test setup: the modules import each other as tools.<module> (the repository
+is the tools package of the project that uses it), so the repository root is
+registered as that package when the tests run from a plain checkout
+"""
+import os
+import sys
+import types
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "tools" not in sys.modules:
+    package = types.ModuleType("tools")
+    package.__path__ = [ROOT]
+    sys.modules["tools"] = package
@@ -0,0 +1,32 @@
+"""
+The recorded Facebook feed responses decode to the expected posts, and only
+the feed articles none of them covers are left for the LLM fallback
+"""
+import json
+
+from tools.benchmarks.replay_facebook_feed import DEFAULT_EXPECTED, DEFAULT_FIXTURE, compare, replay
+from tools.facebook_feed_capture import replay_fixture, uncovered_articles
+
+
+def _expected_posts():
+    with open(DEFAULT_EXPECTED, "r", encoding="utf-8") as f:
+        return json.load(f)["posts"]
+
+
+def test_recorded_responses_decode_to_expected_posts():
+    posts, ready_per_response, stats, _ = replay(DEFAULT_FIXTURE)
+
+    assert compare(posts, _expected_posts()) == []
+    # Posts are ready as their responses arrive; the story served twice is emitted once
+    assert ready_per_response == [1, 2, 0, 1, 0, 1]
+    assert stats["responses"] == 5 and stats["invalid_documents"] == 1
+
+
+def test_articles_missing_from_the_feed_go_to_the_fallback():
+    contents = replay_fixture(DEFAULT_FIXTURE).contents()
+    in_feed = [f'<div role="article"><h3>Telecom Egypt</h3><div>{post["content"]}</div><span>See more</span></div>'
+               for post in _expected_posts()]
+    not_in_feed = '<div role="article"><h3>Telecom Egypt</h3><div>Watch our new reel about WE Gold</div></div>'
+    placeholder = '<div role="article"><span> </span></div>'
+
+    assert uncovered_articles([*in_feed, not_in_feed, placeholder], contents) == [not_in_feed]
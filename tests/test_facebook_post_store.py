@@ -0,0 +1,52 @@
+"""
+The post store recognises a post across runs although its timestamp is
+relative and moves, and still keeps reposts of the same text apart
+"""
+from datetime import datetime
+
+from tools.facebook_post_store import FacebookPostStore
+
+
+PAGE_URL = "https://www.facebook.com/TelecomEgypt"
+
+CONTENT = "New WE Space bundles: 140 GB for 250 EGP a month. See more"
+
+
+def _post(post_time, likes):
+    return {"post_time": post_time, "content": CONTENT, "likes_number": likes,
+            "comments_number": "0", "shares_number": "0"}
+
+
+def test_relative_time_across_scrape_dates(tmp_path):
+    store = FacebookPostStore(str(tmp_path / "posts.db"))
+    first = store.upsert_posts([_post("1w", "5")], PAGE_URL, scraped_at=datetime(2026, 10, 19, 12))
+    second = store.upsert_posts([_post("1w", "6")], PAGE_URL, scraped_at=datetime(2026, 10, 22, 12))
+
+    assert len(first["new"]) == 1
+    assert second["new"] == []
+    assert [post["changes"] for post in second["updated"]] == [{"likes_number": ["5", "6"]}]
+    assert len(store.get_posts(PAGE_URL)) == 1
+
+
+def test_relative_then_absolute_time(tmp_path):
+    store = FacebookPostStore(str(tmp_path / "posts.db"))
+    store.upsert_posts([_post("6d", "5")], PAGE_URL, scraped_at=datetime(2026, 10, 18, 12))
+    second = store.upsert_posts([_post("October 12 at 2:04 PM", "7")], PAGE_URL,
+                                scraped_at=datetime(2026, 10, 25, 12))
+    third = store.upsert_posts([_post(None, "8")], PAGE_URL, scraped_at=datetime(2026, 10, 26, 12))
+
+    assert second["new"] == [] and len(second["updated"]) == 1
+    assert third["new"] == [] and len(third["updated"]) == 1
+    [stored] = store.get_posts(PAGE_URL)
+    # The absolute date replaces the one derived from "6d"
+    assert stored["published_date"] == "2026-10-12"
+    assert stored["likes_number"] == "8"
+
+
+def test_repost_on_another_date_is_new(tmp_path):
+    store = FacebookPostStore(str(tmp_path / "posts.db"))
+    store.upsert_posts([_post("September 1", "5")], PAGE_URL, scraped_at=datetime(2026, 10, 19, 12))
+    repost = store.upsert_posts([_post("October 12", "1")], PAGE_URL, scraped_at=datetime(2026, 10, 19, 12))
+
+    assert len(repost["new"]) == 1
+    assert len(store.get_posts(PAGE_URL)) == 2
@@ -0,0 +1,20 @@
+"""
+Parser Backend Equivalence
+The lxml backend (raw page_source, one parse shared by stages 1-3) must
+leave the same important HTML as the legacy path (prettified page re-parsed
+from disk with html.parser), on the committed fixture pages and a synthetic
+100 KB page per carrier. Runs offline.
+"""
+import pytest
+
+from tools.benchmarks.bench_parser_backends import run_parser_benchmark
+from tools.benchmarks.website_fixtures import load_fixtures
+
+
+FIXTURES = load_fixtures(sizes=[100_000])
+
+
+@pytest.mark.parametrize("fixture", FIXTURES, ids=[name for name, _ in FIXTURES])
+def test_lxml_backend_matches_legacy(fixture):
+    row, = run_parser_benchmark([fixture], repeats=1)
+    assert row["equivalent"], f"{row['fixture']}: lxml and legacy important HTML differ"
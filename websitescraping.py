@@ -1,10 +1,337 @@
+import glob
 import json
+import os
+from concurrent.futures import FIRST_COMPLETED, wait
 from tools.scraper_1_all_pro import get_bakat_name, get_full_html
 from tools.scraper_2_all_pro_html_only import get_specific_html
 from tools.scraper_3_imp_pro import get_imp_html
-from tools.scraper_4_gemeni_json_gen import get_json_insights
+from tools.scraper_4_gemeni_json_gen import create_router, get_api_insights, get_json_insights, get_json_insights_batch
+from tools.pipeline_metrics import RunMetrics, file_size
+from tools.html_cleaning_pool import HtmlCleaningPool
+from tools.artifact_store import ArtifactStore
+from tools.columnar_export import ColumnarExporter, tariff_plan_rows
+from tools.run_manifest import RunManifest, batch_run_name
+from tools.model_router import print_routing_report
 from langchain_core.tools import tool
 
+
+def stage_paths(bakat_name_each):
+    # Files written by stages 1-3 for one page
+    return {
+        "html_all": f"data/html_all/{bakat_name_each}_all_pro.html",
+        "html_only": f"data/html_only/{bakat_name_each}_html_only.html",
+        "html_only_imp": f"data/html_only_imp/{bakat_name_each}_imp_pro.html",
+    }
+
+
+# "lxml": page_source is saved as is and parsed once with lxml, stages 2 and 3 reuse that soup
+# "legacy": prettified page_source, re-parsed from disk with html.parser by stages 2 and 3
+PARSER_BACKEND = "lxml"
+
+# Runs kept per page in the artifact store (data/artifacts) before older ones are garbage-collected
+ARTIFACT_KEEP_RUNS = 5
+
+
+def artifact_stats(stored, stage):
+    # Sizes of ArtifactStore.put() results on a stage record
+    stage["bytes_in"] = sum(item["size"] for item in stored)
+    stage["bytes_out"] = sum(item["stored_size"] for item in stored)
+    stage["deduplicated"] = sum(1 for item in stored if item["deduplicated"])
+
+
+def store_artifacts(artifact_store, url, run_id, paths, stage):
+    # Compressed, deduplicated copies of the stage files of one run
+    stored = [
+        artifact_store.put_file(file_path, url, run_id, kind)
+        for kind, file_path in paths.items() if os.path.exists(file_path)
+    ]
+    artifact_stats(stored, stage)
+
+
+def remove_stored_files(bakat_name_each, output_file):
+    # Once a page's files are in the artifact store (read them back with ArtifactStore.latest),
+    # data/ keeps only its newest JSON, the file the tools answer with
+    older_json = glob.glob(f"data/website_scraped_data_{glob.escape(bakat_name_each)}_*.json")
+    for file_path in [*stage_paths(bakat_name_each).values(), *older_json]:
+        if os.path.exists(file_path) and not os.path.samefile(file_path, output_file):
+            os.remove(file_path)
+
+
+def _scrape_links(link, cleaning_pool=None, parser_backend=PARSER_BACKEND, artifact_store=None, exporter=None,
+                  manifest=None, fetcher=None, pack_llm_requests=False, capture_api=False):
+    # Stages 1-4 for a list of links; with a cleaning_pool stages 2 and 3 run in worker processes,
+    # with a manifest stages checkpointed by an earlier attempt of the same run are skipped,
+    # with a fetcher (ThreadedPageFetcher) the pages of stage 1 are rendered concurrently and each
+    # goes on to stages 2-4 as soon as it is rendered; a page that fails there is reported, not raised,
+    # with pack_llm_requests small pages share LLM requests in stage 4,
+    # with capture_api pages whose JSON API responses hold their plans skip stages 2-4
+    if parser_backend not in ("lxml", "legacy"):
+        raise ValueError(f"Unknown parser backend: {parser_backend}")
+    shared_parse = parser_backend == "lxml" and cleaning_pool is None
+
+    # {i: response of link i}, returned in link order
+    response = {}
+    bakat_name = get_bakat_name(link)
+    # print(bakat_name)
+
+    # One metrics record per link, appended to data/metrics/pipeline_metrics.jsonl
+    metrics = [RunMetrics("website", link[i]) for i in range(len(link))]
+    # Stages that work on all pages at once (the cleaning pool), recorded once for the run
+    batch_metrics = RunMetrics("website_batch", f"{len(link)} pages")
+    paths = [stage_paths(bakat_name[i]) for i in range(len(link))]
+
+    # Once a stage runs again for a link, its later stages must run again too
+    redo = [manifest is None] * len(link)
+
+    def _skip(i, stage_name):
+        if redo[i]:
+            return False
+        if manifest.is_done(link[i], stage_name):
+            metrics[i].record(stage_name, skipped=True)
+            return True
+        redo[i] = True
+        return False
+
+    # ArtifactStore.put() results of the checkpoints of each link
+    stored = [[] for _ in link]
+
+    def _checkpoint(i, stage_name, file_path):
+        if manifest is not None:
+            stored[i].append(manifest.record(link[i], stage_name, file_path, metrics[i].run_id))
+
+    # Pages whose JSON was taken from their API responses: {i: (result, stage)}, and those
+    # of an earlier attempt; stages 2-4 don't run for either
+    from_api = {}
+    api_done = set()
+
+    def _use_api(i, api_responses):
+        # A recognised tariff payload is the page's output; otherwise the HTML path goes on
+        if api_responses is None:
+            return
+        with metrics[i].stage("get_api_insights") as stage:
+            result = get_api_insights(bakat_name[i], api_responses, metrics=stage)
+        if result is not None:
+            from_api[i] = (result, stage)
+            _checkpoint(i, "get_api_insights", stage["output_file"])
+
+    def _api_checkpointed(i):
+        # Taken from the API by an earlier attempt of the run
+        if manifest is not None and not redo[i] and manifest.is_done(link[i], "get_api_insights"):
+            api_done.add(i)
+
+    def _resolved(i):
+        # The HTML of these pages is kept (stage 1), but not cleaned or sent to the LLM
+        return i in from_api or i in api_done
+
+    def _clean(i, soup=None):
+        # Stages 2 and 3 of one page in this process
+        if not _skip(i, "get_specific_html"):
+            with metrics[i].stage("get_specific_html") as stage:
+                get_specific_html(bakat_name[i], soup=soup)
+                stage["bytes_in"] = file_size(paths[i]["html_all"])
+                stage["bytes_out"] = file_size(paths[i]["html_only"])
+            _checkpoint(i, "get_specific_html", paths[i]["html_only"])
+
+        if not _skip(i, "get_imp_html"):
+            with metrics[i].stage("get_imp_html") as stage:
+                get_imp_html(bakat_name[i], soup=soup)
+                stage["bytes_in"] = file_size(paths[i]["html_only"])
+                stage["bytes_out"] = file_size(paths[i]["html_only_imp"])
+            _checkpoint(i, "get_imp_html", paths[i]["html_only_imp"])
+
+    def _pool_cleaning(i):
+        # Stages 2 and 3 of the page still to run in the cleaning pool
+        return not _resolved(i) and not (_skip(i, "get_specific_html") and _skip(i, "get_imp_html"))
+
+    def _cleaned(i, result):
+        # Stages 2 and 3 of one page, done by a worker of the cleaning pool
+        metrics[i].record("clean_html_worker", **result)
+        _checkpoint(i, "get_specific_html", paths[i]["html_only"])
+        _checkpoint(i, "get_imp_html", paths[i]["html_only_imp"])
+
+    # One model router for all pages, so its tier statistics cover the run
+    router = None
+
+    def _insights(i, result=None, stage=None, done=False):
+        # Stage 4 of one page (unless its result is given), then its export and storage
+        nonlocal router
+        if done or i in api_done:
+            # Exported and stored by the attempt that produced it
+            stage_name = "get_api_insights" if i in api_done else "get_json_insights"
+            output_file = manifest.output_file(link[i], stage_name)
+            if artifact_store is not None:
+                # Stage files the resume restored from the store
+                remove_stored_files(bakat_name[i], output_file)
+            return f"✅ Insightful JSON successfully saved as: {output_file}"
+        if i in from_api:
+            result, stage = from_api[i]
+        elif stage is None:
+            router = router or create_router()
+            with metrics[i].stage("get_json_insights") as stage:
+                result = get_json_insights(bakat_name[i], metrics=stage, router=router)
+
+        if exporter is not None:
+            # Tariff records for analytics (data/export/tariff_plans)
+            with open(stage["output_file"], "r", encoding="utf-8") as f:
+                exporter.add("tariff_plans", tariff_plan_rows(json.load(f), link[i], metrics[i].run_id))
+
+        if i not in from_api:
+            _checkpoint(i, "get_json_insights", stage["output_file"])
+        if artifact_store is not None:
+            with metrics[i].stage("store_artifacts") as store_stage:
+                if manifest is None:
+                    store_artifacts(artifact_store, link[i], metrics[i].run_id,
+                                    {**paths[i], "json": stage["output_file"]}, store_stage)
+                else:
+                    # Each stage file went into the store when it was checkpointed
+                    artifact_stats(stored[i], store_stage)
+            remove_stored_files(bakat_name[i], stage["output_file"])
+        return result
+
+    def _page_insights(i):
+        # Stage 4 of one page on its own
+        done = not _resolved(i) and _skip(i, "get_json_insights")
+        response[i] = _insights(i, done=done)
+
+    def _packed_insights(pages):
+        # Stage 4 for these pages, small ones packed into shared requests whose answers are split back per page
+        nonlocal router
+        todo = [i for i in pages if not _resolved(i) and not _skip(i, "get_json_insights")]
+        packed = {}
+        if todo:
+            router = router or create_router()
+            stages = [{} for _ in todo]
+            results = get_json_insights_batch([bakat_name[i] for i in todo], stages, router=router)
+            for i, result, stage in zip(todo, results, stages):
+                packed[i] = (result, metrics[i].record("get_json_insights", **stage))
+        for i in pages:
+            response[i] = _insights(i, *packed.get(i, (None, None)), done=i not in packed and not _resolved(i))
+
+    def _failed(i, e):
+        # Reported in the response; its stages from here on aren't checkpointed, so a resume retries it
+        print(f"❌ {link[i]} failed: {e}")
+        response[i] = f"❌ Failed to scrape {link[i]}: {e}"
+
+    try:
+        if fetcher is not None:
+            # Queue every page at once; the shared browser renders them side by side, and each page goes
+            # on to cleaning and the LLM as soon as it is rendered, while the others still render
+            pending = {}
+            for i in range(len(link)):
+                if _skip(i, "get_full_html"):
+                    _api_checkpointed(i)
+                    continue
+                fetch_stats, api_responses = {}, [] if capture_api else None
+                future = fetcher.submit(link[i], bakat_name[i], parser_backend == "legacy", fetch_stats, api_responses)
+                pending[future] = (i, "get_full_html", {"parser": parser_backend, "backend": "async"},
+                                   fetch_stats, api_responses)
+            # Pages whose stages 2 and 3 are done, waiting for the packed LLM requests
+            cleaned = []
+
+            def _to_llm(i):
+                if pack_llm_requests:
+                    cleaned.append(i)
+                else:
+                    _page_insights(i)
+
+            def _advance(i, soup=None):
+                # Stages 2-4 of a rendered page; with the pool its cleaning is queued like the fetches
+                if cleaning_pool is not None and _pool_cleaning(i):
+                    pending[cleaning_pool.submit_saved_page(bakat_name[i])] = i, "clean_html_worker", {}
+                    return
+                if cleaning_pool is None and not _resolved(i):
+                    _clean(i, soup)
+                _to_llm(i)
+
+            # Pages rendered by an earlier attempt go on while the browser works
+            queued = {entry[0] for entry in pending.values()}
+            for i in range(len(link)):
+                if i not in queued:
+                    try:
+                        _advance(i)
+                    except Exception as e:
+                        _failed(i, e)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, stage_name, fields, *fetch_args = pending.pop(future)
+                    try:
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            metrics[i].record(stage_name, **fields, error=str(e))
+                            raise
+                        if stage_name == "clean_html_worker":
+                            _cleaned(i, result)
+                            _to_llm(i)
+                            continue
+                        fetch_stats, api_responses = fetch_args
+                        # Timed by the fetcher: it overlapped with the other pages
+                        metrics[i].record(stage_name, **fields, bytes_out=file_size(paths[i]["html_all"]),
+                                          **fetch_stats)
+                        _checkpoint(i, "get_full_html", paths[i]["html_all"])
+                        _use_api(i, api_responses)
+                        _advance(i, result if shared_parse else None)
+                    except Exception as e:
+                        _failed(i, e)
+
+            if pack_llm_requests:
+                _packed_insights(sorted(cleaned))
+        else:
+            # Run the function for different links to get full HTML
+            soups = [None] * len(link)
+            for i in range(len(link)):
+                if _skip(i, "get_full_html"):
+                    _api_checkpointed(i)
+                    continue
+                api_responses = [] if capture_api else None
+                with metrics[i].stage("get_full_html", parser=parser_backend) as stage:
+                    soup = get_full_html(link[i], bakat_name[i], prettify=parser_backend == "legacy",
+                                         api_responses=api_responses)
+                    stage["bytes_out"] = file_size(paths[i]["html_all"])
+                _checkpoint(i, "get_full_html", paths[i]["html_all"])
+                _use_api(i, api_responses)
+                if shared_parse and i not in from_api:
+                    soups[i] = soup
+
+            if cleaning_pool is not None:
+                # Stages 2 and 3 for all pages at once, spread over the worker processes
+                todo = [i for i in range(len(link)) if _pool_cleaning(i)]
+                cleaned = []
+                if todo:
+                    with batch_metrics.stage("clean_html_pool", pages=len(todo)):
+                        cleaned = cleaning_pool.clean_saved_pages([bakat_name[i] for i in todo])
+                for i, result in zip(todo, cleaned):
+                    _cleaned(i, result)
+            else:
+                # Run the functions for different links to get specific HTML (with no css or js),
+                # then important HTML only
+                for i in range(len(link)):
+                    if not _resolved(i):
+                        _clean(i, soups[i])
+                    soups[i] = None
+
+            # Run the function for different links to get full page insights
+            if pack_llm_requests:
+                _packed_insights(range(len(link)))
+            else:
+                for i in range(len(link)):
+                    _page_insights(i)
+    finally:
+        for i in range(len(link)):
+            metrics[i].export_jsonl()
+            print(f"\n📊 Stage timings for {link[i]}:")
+            print(metrics[i].summary())
+        if batch_metrics.stages:
+            batch_metrics.export_jsonl()
+            print("\n📊 Stage timings for the whole batch:")
+            print(batch_metrics.summary())
+        if router is not None:
+            print_routing_report(router.report())
+    return [response[i] for i in sorted(response)]
+
+
 @tool
 def website_scraper(url: str) -> str:
     """
@@ -15,24 +342,64 @@ def website_scraper(url: str) -> str:
         url,
     ]
 
-    response = []
-    bakat_name = get_bakat_name(link)
-    # print(bakat_name)
+    artifact_store = ArtifactStore()
+    with ColumnarExporter() as exporter:
+        response = _scrape_links(link, artifact_store=artifact_store, exporter=exporter)
+    artifact_store.gc(keep_runs=ARTIFACT_KEEP_RUNS)
+    return "dataDir : " + json.dumps({"dir": response})
+
+
+def website_scraper_batch(urls, workers=None, parser_backend=PARSER_BACKEND, run_name=None, fetch_backend="selenium",
+                          fetch_concurrency=4, pack_llm_requests=False, capture_api=False):
+    """
+    Scrape many websites in one run. Pages are sent to the LLM one by one,
+    but the CPU-bound cleaning stages run in a process pool (`workers`
+    processes, default one per core).
+
+    With fetch_backend="async" the pages are rendered by crawl4ai's
+    AsyncWebCrawler, up to fetch_concurrency at once in one shared browser,
+    instead of one Selenium Chrome after the other.
+
+    With pack_llm_requests=True, small cleaned pages are packed into shared
+    LLM requests (get_json_insights_batch) instead of one request per page.
+
+    With capture_api=True, the same-origin JSON responses each page loads
+    (the Angular tariff pages fetch their plans after load) are recorded.
+    A page whose responses hold a recognised tariff payload is saved from
+    it directly and skips cleaning and the LLM; other pages take the HTML path.
+
+    Every finished stage is checkpointed in a run manifest (named run_name,
+    default derived from the URL list). If the run dies, calling it again
+    with the same URLs resumes each URL after its last completed stage.
+    """
+    urls = list(urls)
+    parser = "lxml" if parser_backend == "lxml" else "html.parser"
+    artifact_store = ArtifactStore()
+    manifest = RunManifest(run_name or batch_run_name(urls), artifact_store=artifact_store)
+    progress = manifest.progress()
+    if progress:
+        print(f"🔁 Resuming {manifest.run_name}: {progress}")
+
+    if fetch_backend not in ("selenium", "async"):
+        raise ValueError(f"Unknown fetch backend: {fetch_backend}")
+    fetcher = None
+    if fetch_backend == "async":
+        # Imported here so the Selenium backend doesn't need crawl4ai
+        from tools.async_fetch import ThreadedPageFetcher
+        fetcher = ThreadedPageFetcher(concurrency=fetch_concurrency)
 
-    # Run the function for different links to get full HTML
-    for i in range(len(link)):
-        get_full_html(link[i], bakat_name[i])
-    
-    # Run the function for different links to get specific HTML (with no css or js)
-    for i in range(len(bakat_name)):
-        get_specific_html(bakat_name[i])
-    
-    # Run the function for different links to get important HTML only
-    for i in range(len(bakat_name)):
-        get_imp_html(bakat_name[i])
-    
-    # Run the function for different links to get full page insights
-    for i in range(len(link)):
-        result = get_json_insights(bakat_name[i])
-        response.append(result)
+    try:
+        with HtmlCleaningPool(workers, parser=parser) as cleaning_pool, ColumnarExporter() as exporter:
+            response = _scrape_links(urls, cleaning_pool, parser_backend, artifact_store, exporter, manifest, fetcher,
+                                     pack_llm_requests, capture_api)
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+    # Completed: the next run of this batch starts fresh; pages that failed keep it for a resume
+    if all(manifest.output_file(url, "get_json_insights") or manifest.output_file(url, "get_api_insights")
+           for url in urls):
+        manifest.clear()
+    else:
+        print(f"🔁 Some pages failed; run the batch again to resume {manifest.run_name}")
+    artifact_store.gc(keep_runs=ARTIFACT_KEEP_RUNS)
     return "dataDir : " + json.dumps({"dir": response})